@@ -0,0 +1,133 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+
+   Copyright 2021 Recurve Analytics, Inc.
+
+   Licensed under the Apache License, Version 2.0 (the "License");
+   you may not use this file except in compliance with the License.
+   You may obtain a copy of the License at
+
+       http://www.apache.org/licenses/LICENSE-2.0
+
+   Unless required by applicable law or agreed to in writing, software
+   distributed under the License is distributed on an "AS IS" BASIS,
+   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+   See the License for the specific language governing permissions and
+   limitations under the License.
+
+"""
+# Compares text COPY with binary COPY when loading a synthetic electric avoided
+# costs file into PostgreSQL. Both load into a scratch copy of elec_av_costs
+# that is dropped afterwards. For example, against the docker-compose service:
+#
+#   python benchmarks/copy_elec_av_costs.py --rows 10000000 --host postgresql
+import csv
+import os
+import random
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+import click
+from sqlalchemy import text
+
+from flexvalue.config import FLEXValueConfig
+from flexvalue.db import (
+    DBManager,
+    ELEC_AVOIDED_COSTS_FIELDS,
+    ELEC_AV_COSTS_COPY_TYPES,
+)
+
+NUM_COMPONENTS = 13  # energy through ghg_adder_rebalancing
+BENCHMARK_TABLE = "elec_av_costs_copy_benchmark"
+
+
+def write_synthetic_elec_av_costs(path, num_rows):
+    """Writes num_rows rows of random avoided costs, cycling through the hours
+    of consecutive years for a handful of utility/region pairs."""
+    regions = [("PGE", "1A"), ("PGE", "3A"), ("SCE", "9"), ("SDGE", "7")]
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(ELEC_AVOIDED_COSTS_FIELDS)
+        for i in range(num_rows):
+            utility, region = regions[(i // 8760) % len(regions)]
+            year = 2020 + (i // (8760 * len(regions)))
+            hour_of_year = i % 8760
+            dt = datetime(year, 1, 1) + timedelta(hours=hour_of_year)
+            components = [random.random() for _ in range(NUM_COMPONENTS)]
+            writer.writerow(
+                [
+                    "CA",
+                    utility,
+                    region,
+                    dt.strftime("%Y-%m-%d %H:%M:%S UTC"),
+                    year,
+                    (dt.month - 1) // 3 + 1,
+                    dt.month,
+                    dt.hour,
+                    hour_of_year,
+                ]
+                + components
+                + ["ACC_BENCH"]
+            )
+
+
+def text_rows(dbm, path):
+    """The rows as the strings read from the file, for the server to parse."""
+    for r in dbm._csv_file_to_dict_iter(path):
+        yield [r[field] for field in ELEC_AVOIDED_COSTS_FIELDS]
+
+
+def time_copy(dbm, rows, types=None):
+    with dbm.engine.begin() as conn:
+        conn.execute(text(f"TRUNCATE TABLE {BENCHMARK_TABLE}"))
+    start = time.perf_counter()
+    dbm._copy_rows(BENCHMARK_TABLE, ELEC_AVOIDED_COSTS_FIELDS, rows, types=types)
+    return time.perf_counter() - start
+
+
+@click.command()
+@click.option("--rows", default=10_000_000, help="Number of rows to generate.")
+@click.option("--host", default="postgresql")
+@click.option("--port", default=5432)
+@click.option("--user", default="postgres")
+@click.option("--password", default="example")
+@click.option("--database", default="postgres")
+def main(rows, host, port, user, password, database):
+    config = FLEXValueConfig(
+        database_type="postgresql",
+        host=host,
+        port=port,
+        user=user,
+        password=password,
+        database=database,
+    )
+    dbm = DBManager.get_db_manager(config)
+    dbm._prepare_table("elec_av_costs", "flexvalue/sql/create_elec_av_cost.sql")
+    with dbm.engine.begin() as conn:
+        conn.execute(
+            text(
+                f"CREATE TABLE IF NOT EXISTS {BENCHMARK_TABLE} (LIKE elec_av_costs INCLUDING ALL)"
+            )
+        )
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, "synthetic_elec_av_costs.csv")
+        print(f"Writing {rows} rows to {path}")
+        write_synthetic_elec_av_costs(path, rows)
+        text_seconds = time_copy(dbm, text_rows(dbm, path))
+        print(f"text COPY:   {text_seconds:.1f}s ({rows / text_seconds:,.0f} rows/s)")
+        binary_seconds = time_copy(
+            dbm,
+            dbm._typed_elec_av_costs_rows(path),
+            types=ELEC_AV_COSTS_COPY_TYPES,
+        )
+        print(
+            f"binary COPY: {binary_seconds:.1f}s ({rows / binary_seconds:,.0f} rows/s)"
+        )
+    with dbm.engine.begin() as conn:
+        conn.execute(text(f"DROP TABLE {BENCHMARK_TABLE}"))
+
+
+if __name__ == "__main__":
+    main()
@@ -20,7 +20,13 @@
 import click
 
 from flexvalue.flexvalue import FlexValueRun
-from flexvalue.config import FLEXValueException
+from flexvalue.config import (
+    FLEXValueException,
+    SUPPORTED_CALCULATION_ENGINES,
+    SUPPORTED_CSV_PARSERS,
+    SUPPORTED_OUTPUT_FORMATS,
+    SUPPORTED_PARTITION_KEYS,
+)
 
 __all__ = ("get_results",)
 
@@ -33,9 +39,9 @@ def cli():
 @cli.command()
 @click.option(
     "--project-info-file",
-    help="Filepath to the project information file that is used to calculate results",
+    help="Filepath to the project information file that is used to calculate results. When --database-type is bigquery, the file is loaded into --project-info-table, replacing its contents.",
 )
-@click.option("--database-type", help="One of 'postgresql', 'bigquery', or 'sqlite'")
+@click.option("--database-type", help="One of 'postgresql', 'bigquery', 'sqlite', or 'duckdb'")
 @click.option(
     "--host", help="The host for the postgresql database to which you are connecting."
 )
@@ -101,23 +107,23 @@ def cli():
 @click.option("--config-file", help="Path to the toml configuration file.")
 @click.option(
     "--elec-av-costs-file",
-    help="Filepath to the electric avoided costs. Used when --database-type is not BigQuery to load this data into the database from a file.",
+    help="Filepath to the electric avoided costs. The data is loaded into the database from this file. When --database-type is bigquery, the file is loaded into --elec-av-costs-table, replacing its contents.",
 )
 @click.option(
     "--gas-av-costs-file",
-    help="Filepath to the gas avoided costs. Used when --database-type is not BigQuery to load this data into the database from a file.",
+    help="Filepath to the gas avoided costs. The data is loaded into the database from this file. When --database-type is bigquery, the file is loaded into --gas-av-costs-table, replacing its contents.",
 )
 @click.option(
     "--elec-load-shape-file",
-    help="Filepath to the hourly electric load shape file. Used when --database-type is not BigQuery to load this data into the database from a file.",
+    help="Filepath to the hourly electric load shape file. The data is loaded into the database from this file. When --database-type is bigquery, the file is loaded into --elec-load-shape-table, replacing its contents.",
 )
 @click.option(
     "--therms-profiles-file",
-    help="Filepath to the therms profiles file. Used when --database-type is not BigQuery to load this data into the database from a file.",
+    help="Filepath to the therms profiles file. The data is loaded into the database from this file. When --database-type is bigquery, the file is loaded into --therms-profiles-table, replacing its contents.",
 )
 @click.option(
     "--metered-load-shape-file",
-    help="Filepath to the hourly metered load shape file. Used when --database-type is not BigQuery to load this data into the database from a file.",
+    help="Filepath to the hourly metered load shape file. The data is loaded into the database from this file. When --database-type is bigquery, the file is loaded into --metered-load-shape-table, replacing its contents.",
 )
 @click.option(
     "--aggregation-columns",
@@ -193,6 +199,94 @@ def cli():
     help="Specifies that the ACC and project info tables you are using have multiple curves in them, and that FLEXvalue should join based on the curve names.",
     is_flag=True,
 )
+@click.option(
+    "--load-chunk-size",
+    help="The number of rows to send to the database at once when loading files. Defaults to 100000; on BigQuery, it's the number of rows in each load job, and defaults to 1000000.",
+    type=int,
+)
+@click.option(
+    "--csv-parser",
+    help="How to parse the input csv files: stdlib (the csv module, row by row) or pyarrow (vectorized, a record batch at a time; requires pyarrow). Defaults to stdlib.",
+    type=click.Choice(SUPPORTED_CSV_PARSERS),
+    default="stdlib",
+)
+@click.option(
+    "--load-workers",
+    help="The number of table loads to run at the same time, each on its own database connection. Metered load shapes still load after project info. Defaults to 1; sqlite always loads one table at a time.",
+    type=int,
+)
+@click.option(
+    "--copy-partitions",
+    help="PostgreSQL only: split each avoided costs file into this many parts, which are parsed and COPYed in parallel, each by its own process and connection. The load is all-or-nothing. Defaults to 1.",
+    type=int,
+)
+@click.option(
+    "--bulk-load",
+    help="Drop each loaded table's secondary indexes before loading it, then build them and analyze the table once the data is in.",
+    is_flag=True,
+)
+@click.option(
+    "--create-indexes-concurrently",
+    help="PostgreSQL only: with --bulk-load, build the indexes with CREATE INDEX CONCURRENTLY.",
+    is_flag=True,
+)
+@click.option(
+    "--staged-refresh",
+    help="Load each table into a staging table (UNLOGGED on PostgreSQL) and, once it's loaded and indexed, swap it in for the live table in one transaction.",
+    is_flag=True,
+)
+@click.option(
+    "--skip-unchanged-loads",
+    help="Record a hash of each loaded file in a load_manifest table, and skip loading files whose content is the same as what was last loaded into their table.",
+    is_flag=True,
+)
+@click.option(
+    "--incremental-av-costs",
+    help="Add the avoided cost curves in the avoided cost files to the avoided cost tables, replacing the rows of any curve (by value_curve_name) that's already loaded and keeping the others.",
+    is_flag=True,
+)
+@click.option(
+    "--partition-by",
+    help="PostgreSQL only. Create elec_av_costs as a table partitioned by this column (utility or value_curve_name) and then by year, and elec_load_shape as a table partitioned by utility, so calculations can skip the partitions they don't need.",
+    type=click.Choice(SUPPORTED_PARTITION_KEYS),
+    default=None,
+)
+@click.option(
+    "--compact-schema",
+    help="PostgreSQL only. Create elec_av_costs and elec_load_shape without their unused primary keys, with SMALLINT hours, months and quarters, and with utility, region and load shape names stored as SMALLINT codes from lookup tables.",
+    is_flag=True,
+)
+@click.option(
+    "--calculation-indexes/--no-calculation-indexes",
+    help="Build the indexes that match the calculations' joins on the avoided cost, load shape and therms profile tables after loading them (covering indexes on PostgreSQL). Defaults to on.",
+    default=True,
+)
+@click.option(
+    "--quarterly-elec-aggregation",
+    help="Compute the electric results in two stages: first sum the load shape times the avoided costs by quarter for each load shape, utility and region the projects use, then scale those sums by each project's savings and discount factors. Requires --separate-output-tables, and can't be combined with elec_addl_fields or hourly or monthly aggregation_columns.",
+    is_flag=True,
+)
+@click.option(
+    "--shape-cost-cube",
+    help="With --quarterly-elec-aggregation, keep the quarterly sums of the load shapes times the avoided costs in a shape_cost_cube table, for every load shape, utility, region and value curve, and read them from there. The table is built by the first calculation that needs it and is rebuilt after the avoided costs or load shapes are reloaded.",
+    is_flag=True,
+)
+@click.option(
+    "--calculation-engine",
+    help="How to compute the results: sql (the calculation queries, run by the database) or numpy (read the loaded tables and compute the results in memory with numpy; requires numpy). The numpy engine writes to the output file or stdout, doesn't support elec_addl_fields or gas_addl_fields, and only supports the region, year, quarter and month aggregation_columns, with --separate-output-tables. Defaults to sql.",
+    type=click.Choice(SUPPORTED_CALCULATION_ENGINES),
+    default="sql",
+)
+@click.option(
+    "--output-format",
+    help="The format to write the results to the output file in: csv, parquet (snappy-compressed, a row group at a time) or arrow (an Arrow IPC file). parquet and arrow require pyarrow. Defaults to the format the output file's extension implies (.parquet, or .arrow, .feather or .ipc), or else csv.",
+    type=click.Choice(SUPPORTED_OUTPUT_FORMATS),
+)
+@click.option(
+    "--bigquery-storage-api",
+    help="Used when --database-type is bigquery. Download the results with the BigQuery Storage Read API, in parallel streams of arrow record batches, and write them straight to the output file or stdout. Requires google-cloud-bigquery-storage and pyarrow.",
+    is_flag=True,
+)
 def get_results(
     config_file,
     project_info_file,
@@ -233,6 +327,23 @@ def get_results(
     elec_addl_fields,
     gas_addl_fields,
     use_value_curve_name_for_join,
+    load_chunk_size,
+    csv_parser,
+    load_workers,
+    copy_partitions,
+    bulk_load,
+    create_indexes_concurrently,
+    staged_refresh,
+    skip_unchanged_loads,
+    incremental_av_costs,
+    partition_by,
+    compact_schema,
+    calculation_indexes,
+    quarterly_elec_aggregation,
+    shape_cost_cube,
+    calculation_engine,
+    output_format,
+    bigquery_storage_api,
 ):
     try:
         fv_run = FlexValueRun(
@@ -277,6 +388,23 @@ def get_results(
             elec_addl_fields=elec_addl_fields.split(",") if elec_addl_fields else [],
             gas_addl_fields=gas_addl_fields.split(",") if gas_addl_fields else [],
             use_value_curve_name_for_join=use_value_curve_name_for_join,
+            load_chunk_size=load_chunk_size,
+            csv_parser=csv_parser,
+            load_workers=load_workers,
+            copy_partitions=copy_partitions,
+            bulk_load=bulk_load,
+            create_indexes_concurrently=create_indexes_concurrently,
+            staged_refresh=staged_refresh,
+            skip_unchanged_loads=skip_unchanged_loads,
+            incremental_av_costs=incremental_av_costs,
+            partition_by=partition_by,
+            compact_schema=compact_schema,
+            calculation_indexes=calculation_indexes,
+            quarterly_elec_aggregation=quarterly_elec_aggregation,
+            shape_cost_cube=shape_cost_cube,
+            calculation_engine=calculation_engine,
+            output_format=output_format,
+            bigquery_storage_api=bigquery_storage_api,
         )
         fv_run.run()
     except FLEXValueException as e:
@@ -0,0 +1,184 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+
+   Copyright 2021 Recurve Analytics, Inc.
+
+   Licensed under the Apache License, Version 2.0 (the "License");
+   you may not use this file except in compliance with the License.
+   You may obtain a copy of the License at
+
+       http://www.apache.org/licenses/LICENSE-2.0
+
+   Unless required by applicable law or agreed to in writing, software
+   distributed under the License is distributed on an "AS IS" BASIS,
+   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+   See the License for the specific language governing permissions and
+   limitations under the License.
+
+"""
+import csv
+
+from flexvalue import partitions
+from flexvalue.config import FLEXValueException
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    from pyarrow import csv as pa_csv
+except ImportError:
+    pa = None
+
+__all__ = ("typed_rows", "wide_typed_rows")
+
+# The number of bytes pyarrow reads (and converts) at a time. Each block
+# becomes one record batch, which bounds memory use.
+BLOCK_SIZE = 4 * 1024 * 1024
+
+# Timestamps in the avoided cost files look like "2021-01-01 00:00:00 UTC";
+# only the first 19 characters are parsed.
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+
+def _arrow_type(type_name):
+    """The arrow type to read a column of the given postgres type as.
+    Timestamps are read as strings and parsed afterwards."""
+    _require_pyarrow()
+    return {
+        "text": pa.string(),
+        "int4": pa.int32(),
+        "float8": pa.float64(),
+        "timestamp": pa.string(),
+    }[type_name]
+
+
+def _require_pyarrow():
+    if pa is None:
+        raise FLEXValueException(
+            "The pyarrow csv_parser requires pyarrow. Install it with `pip install flexvalue[pyarrow]`, or use csv_parser = 'stdlib'."
+        )
+
+
+def _read_header(csv_file_path):
+    """The first row of the csv file at csv_file_path; empty if it's empty."""
+    with open(csv_file_path, newline="") as f:
+        return next(csv.reader(f), [])
+
+
+def _record_batches(
+    csv_file_path,
+    column_types,
+    include_columns,
+    byte_range=None,
+    column_names=None,
+    skip_rows=0,
+):
+    """Streams the csv file at csv_file_path (only the rows in byte_range, if
+    given) as arrow record batches, converting each column with column_types
+    and reading only include_columns. If column_names is given, the columns
+    get those names, and the first skip_rows rows are skipped; otherwise
+    they're named by the header row."""
+    read_options = pa_csv.ReadOptions(
+        block_size=BLOCK_SIZE, column_names=column_names, skip_rows=skip_rows
+    )
+    convert_options = pa_csv.ConvertOptions(
+        column_types=column_types, include_columns=include_columns
+    )
+    with partitions.open_binary(csv_file_path, byte_range) as source:
+        with pa_csv.open_csv(
+            source, read_options=read_options, convert_options=convert_options
+        ) as reader:
+            for batch in reader:
+                yield batch
+
+
+def _finish_column(column, type_name, upper):
+    """Applies the vectorized post-processing for one column."""
+    if upper:
+        column = pc.utf8_upper(column)
+    if type_name == "timestamp":
+        column = pc.strptime(
+            pc.utf8_slice_codeunits(column, 0, 19), format=TIMESTAMP_FORMAT, unit="s"
+        )
+    return column
+
+
+def typed_rows(
+    csv_file_path,
+    fieldnames,
+    types,
+    fields_to_upper=None,
+    byte_range=None,
+    header=True,
+):
+    """Generator that yields the first len(fieldnames) columns of the csv file
+    at csv_file_path as tuples, one per row. The columns are positional; the
+    first row is skipped if header is True. types holds the postgres type of
+    each field ("text", "int4", "float8" or "timestamp"); casting, upper-casing
+    the fields in fields_to_upper and timestamp parsing are done a record batch
+    at a time. If byte_range (a partitions.ByteRange) is given, only the rows
+    in it are read."""
+    _require_pyarrow()
+    fields_to_upper = fields_to_upper or []
+    num_columns = len(_read_header(csv_file_path))
+    if not num_columns:
+        return
+    column_types = {
+        name: _arrow_type(type_name) for name, type_name in zip(fieldnames, types)
+    }
+    # any columns after the fieldnames ones are given names, but not read
+    column_names = list(fieldnames) + [
+        f"unused_column_{i}" for i in range(len(fieldnames), num_columns)
+    ]
+    for batch in _record_batches(
+        csv_file_path,
+        column_types,
+        list(fieldnames),
+        byte_range,
+        column_names=column_names,
+        skip_rows=1 if header else 0,
+    ):
+        columns = [
+            _finish_column(
+                batch.column(name), type_name, name in fields_to_upper
+            ).to_pylist()
+            for name, type_name in zip(fieldnames, types)
+        ]
+        yield from zip(*columns)
+
+
+def wide_typed_rows(
+    csv_file_path, fixed_fieldnames, name_field, types, fields_to_upper=None
+):
+    """Generator that unpivots a "wide" csv file (fixed columns followed by one
+    column per named shape) into "long" tuples of the fixed values, the shape
+    name and its value, like DBManager._wide_csv_file_to_long_tuples.
+    types holds the postgres type of each fixed field, then of name_field and
+    of the value. The unpivot is done a record batch at a time."""
+    _require_pyarrow()
+    fields_to_upper = fields_to_upper or []
+    header = _read_header(csv_file_path)
+    num_fixed = len(fixed_fieldnames)
+    fixed_columns, names = header[:num_fixed], header[num_fixed:]
+    column_types = {
+        column: _arrow_type(type_name)
+        for column, type_name in zip(fixed_columns, types[:num_fixed])
+    }
+    column_types.update({name: _arrow_type(types[-1]) for name in names})
+    shape_names = [
+        name.upper() if name_field in fields_to_upper else name for name in names
+    ]
+    for batch in _record_batches(csv_file_path, column_types, header):
+        fixed = [
+            _finish_column(
+                batch.column(column), type_name, fieldname in fields_to_upper
+            ).to_pylist()
+            for column, fieldname, type_name in zip(
+                fixed_columns, fixed_fieldnames, types[:num_fixed]
+            )
+        ]
+        fixed_rows = list(zip(*fixed))
+        for name, shape_name in zip(names, shape_names):
+            values = batch.column(name).to_pylist()
+            for fixed_row, value in zip(fixed_rows, values):
+                yield (*fixed_row, shape_name, value)
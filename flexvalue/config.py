@@ -1,8 +1,36 @@
+import os
 import toml
 
 from dataclasses import dataclass, field
 from typing import List
 
+SUPPORTED_CSV_PARSERS = ("stdlib", "pyarrow")
+SUPPORTED_PARTITION_KEYS = ("utility", "value_curve_name")
+# The aggregation columns finer than a quarter, which quarterly_elec_aggregation
+# can't produce
+HOURLY_AGGREGATION_COLUMNS = ("hour_of_year", "month", "hour_of_day", "datetime")
+SUPPORTED_CALCULATION_ENGINES = ("sql", "numpy")
+AGGREGATION_COLUMNS = (
+    "hour_of_year",
+    "year",
+    "region",
+    "month",
+    "quarter",
+    "hour_of_day",
+    "datetime",
+)
+# The aggregation columns the numpy calculation_engine supports, which it only
+# supports with separate_output_tables
+NUMPY_ENGINE_AGGREGATION_COLUMNS = ("region", "year", "quarter", "month")
+SUPPORTED_OUTPUT_FORMATS = ("csv", "parquet", "arrow")
+# The output_format implied by output_file's extension, without output_format
+OUTPUT_FORMAT_EXTENSIONS = {
+    ".parquet": "parquet",
+    ".arrow": "arrow",
+    ".feather": "arrow",
+    ".ipc": "arrow",
+}
+
 
 class FLEXValueException(Exception):
     pass
@@ -49,6 +77,23 @@ class FLEXValueConfig:
     gas_addl_fields: List[str] = field(default_factory=list)
     separate_output_tables: bool = False
     use_value_curve_name_for_join: bool = False
+    load_chunk_size: int = None
+    csv_parser: str = "stdlib"
+    load_workers: int = None
+    copy_partitions: int = None
+    bulk_load: bool = False
+    create_indexes_concurrently: bool = False
+    staged_refresh: bool = False
+    skip_unchanged_loads: bool = False
+    incremental_av_costs: bool = False
+    partition_by: str = None
+    compact_schema: bool = False
+    calculation_indexes: bool = True
+    quarterly_elec_aggregation: bool = False
+    shape_cost_cube: bool = False
+    calculation_engine: str = "sql"
+    output_format: str = None
+    bigquery_storage_api: bool = False
 
     @staticmethod
     def from_file(config_file):
@@ -96,9 +141,107 @@ class FLEXValueConfig:
             use_value_curve_name_for_join=run_info.get(
                 "use_value_curve_name_for_join", None
             ),
+            load_chunk_size=run_info.get("load_chunk_size", None),
+            csv_parser=run_info.get("csv_parser", "stdlib"),
+            load_workers=run_info.get("load_workers", None),
+            copy_partitions=run_info.get("copy_partitions", None),
+            bulk_load=run_info.get("bulk_load", False),
+            create_indexes_concurrently=run_info.get(
+                "create_indexes_concurrently", False
+            ),
+            staged_refresh=run_info.get("staged_refresh", False),
+            skip_unchanged_loads=run_info.get("skip_unchanged_loads", False),
+            incremental_av_costs=run_info.get("incremental_av_costs", False),
+            partition_by=run_info.get("partition_by", None),
+            compact_schema=run_info.get("compact_schema", False),
+            calculation_indexes=run_info.get("calculation_indexes", True),
+            quarterly_elec_aggregation=run_info.get(
+                "quarterly_elec_aggregation", False
+            ),
+            shape_cost_cube=run_info.get("shape_cost_cube", False),
+            calculation_engine=run_info.get("calculation_engine", "sql"),
+            output_format=run_info.get("output_format", None),
+            bigquery_storage_api=run_info.get("bigquery_storage_api", False),
         )
 
     def validate(self):
+        if self.csv_parser not in SUPPORTED_CSV_PARSERS:
+            raise FLEXValueException(
+                f"csv_parser must be one of {', '.join(SUPPORTED_CSV_PARSERS)}, not {self.csv_parser}."
+            )
+        if self.partition_by:
+            if self.partition_by not in SUPPORTED_PARTITION_KEYS:
+                raise FLEXValueException(
+                    f"partition_by must be one of {', '.join(SUPPORTED_PARTITION_KEYS)}, not {self.partition_by}."
+                )
+            if self.database_type != "postgresql":
+                raise FLEXValueException(
+                    "partition_by is only supported when using postgresql."
+                )
+        if self.compact_schema and self.database_type != "postgresql":
+            raise FLEXValueException(
+                "compact_schema is only supported when using postgresql."
+            )
+        if self.database_type == "duckdb" and not self.database:
+            raise FLEXValueException(
+                "When using duckdb, you must provide the path of the database file as database in the config file."
+            )
+        if self.quarterly_elec_aggregation:
+            if not self.separate_output_tables:
+                raise FLEXValueException(
+                    "quarterly_elec_aggregation requires separate_output_tables, since the combined output matches electric and gas results hour by hour."
+                )
+            hourly_columns = set(self.aggregation_columns) & set(
+                HOURLY_AGGREGATION_COLUMNS
+            )
+            if hourly_columns or self.elec_addl_fields:
+                raise FLEXValueException(
+                    f"quarterly_elec_aggregation can't be used with elec_addl_fields or with these aggregation_columns: {', '.join(HOURLY_AGGREGATION_COLUMNS)}."
+                )
+        if self.shape_cost_cube:
+            if not self.quarterly_elec_aggregation:
+                raise FLEXValueException(
+                    "shape_cost_cube requires quarterly_elec_aggregation."
+                )
+            if self.database_type == "bigquery":
+                raise FLEXValueException(
+                    "shape_cost_cube isn't supported when using bigquery."
+                )
+        if self.calculation_engine not in SUPPORTED_CALCULATION_ENGINES:
+            raise FLEXValueException(
+                f"calculation_engine must be one of {', '.join(SUPPORTED_CALCULATION_ENGINES)}, not {self.calculation_engine}."
+            )
+        if self.calculation_engine == "numpy":
+            if self.output_table or self.electric_output_table or self.gas_output_table:
+                raise FLEXValueException(
+                    "The numpy calculation_engine writes to output_file or stdout, so it can't be used with output tables."
+                )
+            if self.elec_addl_fields or set(self.gas_addl_fields) - set(["total"]):
+                raise FLEXValueException(
+                    "The numpy calculation_engine can't be used with elec_addl_fields or gas_addl_fields."
+                )
+            supported_columns = (
+                NUMPY_ENGINE_AGGREGATION_COLUMNS if self.separate_output_tables else ()
+            )
+            if set(self.aggregation_columns) & (
+                set(AGGREGATION_COLUMNS) - set(supported_columns)
+            ):
+                raise FLEXValueException(
+                    f"The numpy calculation_engine only supports these aggregation_columns, with separate_output_tables: {', '.join(NUMPY_ENGINE_AGGREGATION_COLUMNS)}."
+                )
+        if self.output_format:
+            if self.output_format not in SUPPORTED_OUTPUT_FORMATS:
+                raise FLEXValueException(
+                    f"output_format must be one of {', '.join(SUPPORTED_OUTPUT_FORMATS)}, not {self.output_format}."
+                )
+            if self.output_format != "csv" and not self.output_file:
+                raise FLEXValueException(
+                    f"The {self.output_format} output_format requires an output_file."
+                )
+        if self.bigquery_storage_api and self.database_type != "bigquery":
+            raise FLEXValueException(
+                "bigquery_storage_api is only supported when using bigquery."
+            )
         if not self.database_type:
             return
         if self.database_type == "postgresql":
@@ -129,14 +272,29 @@ class FLEXValueConfig:
                 raise FLEXValueException(
                     "When using bigquery, you must provide all of the following values in the config file: project, project_info_table, elec_load_shape_table, therms_profiles_table, elec_av_costs_table, gas_av_costs_table."
                 )
+            if self.metered_load_shape_file and not self.metered_load_shape_table:
+                raise FLEXValueException(
+                    "When using bigquery, a metered_load_shape_file is loaded into the metered_load_shape_table, which you must provide."
+                )
             if self.separate_output_tables == True:
                 if not self.electric_output_table or not self.gas_output_table:
                     raise FLEXValueException(
                         "When you specify separate_output_tables, you must specify both electric_output_table and gas_output_table."
                     )
 
+    def result_format(self):
+        """The format the results are written to output_file in: output_format,
+        or else the one output_file's extension implies, or else csv."""
+        if self.output_format:
+            return self.output_format
+        extension = os.path.splitext(self.output_file or "")[1].lower()
+        return OUTPUT_FORMAT_EXTENSIONS.get(extension, "csv")
+
     def float_type(self):
         if self.database_type == "bigquery":
             return "FLOAT64"
+        elif self.database_type == "duckdb":
+            # DuckDB's FLOAT is single precision
+            return "DOUBLE"
         else:
             return "FLOAT"
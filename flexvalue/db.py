@@ -20,22 +20,42 @@
 from collections import defaultdict
 import sys
 import csv
+import hashlib
+import io
 import logging
+import multiprocessing
+import os
+import re
+import tempfile
+import time
 import sqlalchemy
 import psycopg
 
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+    wait,
+)
 from datetime import datetime
+from itertools import chain, islice
+from psycopg import sql as pg_sql
+from flexvalue import columnar, numpy_engine, partitions, results
 from flexvalue.config import FLEXValueConfig, FLEXValueException
 from jinja2 import Environment, PackageLoader, select_autoescape
-from sqlalchemy import create_engine, text, inspect
+from sqlalchemy import bindparam, create_engine, text, inspect
 from sqlalchemy.engine import Engine
-from sqlalchemy.exc import ResourceClosedError
 from google.cloud import bigquery
 from google.cloud.exceptions import NotFound
 from google import api_core
 
+try:
+    from google.cloud import bigquery_storage
+except ImportError:
+    bigquery_storage = None
+
 
-SUPPORTED_DBS = ("postgresql", "sqlite", "bigquery")
+SUPPORTED_DBS = ("postgresql", "sqlite", "bigquery", "duckdb")
 
 __all__ = (
     "get_db_connection",
@@ -89,6 +109,24 @@ GAS_AV_COSTS_FIELDS = [
     "marginal_ghg",
     "value_curve_name",
 ]
+# The fixed columns at the start of the "wide" load shape and therms profile
+# files; every column after these holds the values for one named shape.
+ELEC_LOAD_SHAPE_FIXED_FIELDS = [
+    "state",
+    "utility",
+    "region",
+    "quarter",
+    "month",
+    "hour_of_day",
+    "hour_of_year",
+]
+THERMS_PROFILE_FIXED_FIELDS = [
+    "state",
+    "utility",
+    "region",
+    "quarter",
+    "month",
+]
 ELEC_AVOIDED_COSTS_FIELDS = [
     "state",
     "utility",
@@ -114,6 +152,120 @@ ELEC_AVOIDED_COSTS_FIELDS = [
     "ghg_adder_rebalancing",
     "value_curve_name",
 ]
+# The postgres types of the columns read from each input file, in field
+# order. They drive the typed csv parsing (see _csv_file_to_typed_tuples)
+# as well as binary COPY.
+ELEC_AV_COSTS_COPY_TYPES = (
+    ["text"] * 3 + ["timestamp"] + ["int4"] * 5 + ["float8"] * 13 + ["text"]
+)
+GAS_AV_COSTS_COPY_TYPES = ["text"] * 3 + ["int4"] * 3 + ["float8"] * 7 + ["text"]
+PROJECT_INFO_TYPES = (
+    ["text"] * 4
+    + ["float8"] * 2
+    + ["text"] * 2
+    + ["int4"] * 4
+    + ["float8"] * 5
+    + ["text"]
+)
+# The fixed fields, then the shape name, then the value
+ELEC_LOAD_SHAPE_COPY_TYPES = ["text"] * 3 + ["int4"] * 4 + ["text", "float8"]
+THERMS_PROFILE_COPY_TYPES = ["text"] * 3 + ["int4"] * 2 + ["text", "float8"]
+
+# The secondary indexes of each table, by name, with the files that create
+# them. In bulk_load mode they're dropped before the table is loaded and built
+# once it has been (see DBManager._load_table).
+TABLE_INDEXES = {
+    "project_info": {
+        "project_info_index": "flexvalue/sql/project_info_index.sql",
+        "project_info_dates_index": "flexvalue/sql/project_info_dates_index.sql",
+    },
+}
+
+# The indexes that match the join predicates of the calculation templates
+# (utility, region, value_curve_name and datetime for the avoided costs, and
+# utility, shape name and hour or month for the shapes), which are built after
+# each load unless calculation_indexes is off. These files work on any
+# database; on PostgreSQL each is replaced by its POSTGRES_CALCULATION_INDEXES
+# file, which also INCLUDEs the columns the calculations read, so the joins
+# can be answered from the index alone.
+CALCULATION_INDEXES = {
+    "elec_av_costs": {
+        "elec_av_costs_calculation_index": "flexvalue/sql/elec_av_costs_calculation_index.sql"
+    },
+    "elec_load_shape": {
+        "elec_load_shape_calculation_index": "flexvalue/sql/elec_load_shape_calculation_index.sql"
+    },
+    "gas_av_costs": {
+        "gas_av_costs_calculation_index": "flexvalue/sql/gas_av_costs_calculation_index.sql"
+    },
+    "therms_profile": {
+        "therms_profile_calculation_index": "flexvalue/sql/therms_profile_calculation_index.sql"
+    },
+}
+POSTGRES_CALCULATION_INDEXES = {
+    "flexvalue/sql/elec_av_costs_calculation_index.sql": "flexvalue/sql/elec_av_costs_calculation_index_postgres.sql",
+    "flexvalue/sql/elec_load_shape_calculation_index.sql": "flexvalue/sql/elec_load_shape_calculation_index_postgres.sql",
+    "flexvalue/sql/gas_av_costs_calculation_index.sql": "flexvalue/sql/gas_av_costs_calculation_index_postgres.sql",
+    "flexvalue/sql/therms_profile_calculation_index.sql": "flexvalue/sql/therms_profile_calculation_index_postgres.sql",
+}
+
+# In the compact schema (see compact_schema), the tables that are created
+# without their serial pk and with SMALLINT codes and small integers, and
+# their indexes, by the name of the CALCULATION_INDEXES file they replace
+COMPACT_TABLES = {
+    "elec_av_costs": "flexvalue/sql/create_elec_av_cost_compact.sql",
+    "elec_load_shape": "flexvalue/sql/create_elec_load_shape_compact.sql",
+}
+COMPACT_INDEXES = {
+    "flexvalue/sql/elec_av_costs_calculation_index.sql": "flexvalue/sql/elec_av_costs_calculation_index_compact.sql",
+    "flexvalue/sql/elec_load_shape_calculation_index.sql": "flexvalue/sql/elec_load_shape_calculation_index_compact.sql",
+}
+# The text columns that the compact schema stores as a SMALLINT {column}_code,
+# looked up in a {column}_codes table
+DICTIONARY_COLUMNS = ("utility", "region", "load_shape_name")
+
+# The tables that hold several avoided cost curves, which incremental_av_costs
+# loads replace a curve at a time, and the index on their value_curve_name
+VALUE_CURVE_INDEXES = {
+    "elec_av_costs": "flexvalue/sql/elec_av_costs_curve_index.sql",
+    "gas_av_costs": "flexvalue/sql/gas_av_costs_curve_index.sql",
+}
+
+# The electric avoided cost components that shape_cost_cube holds the load
+# shape weighted quarterly sums of, the tables it's computed from, and its index
+SHAPE_COST_CUBE_COMPONENTS = ELEC_AVOIDED_COSTS_FIELDS[
+    ELEC_AVOIDED_COSTS_FIELDS.index("energy") : ELEC_AVOIDED_COSTS_FIELDS.index(
+        "value_curve_name"
+    )
+]
+SHAPE_COST_CUBE_SOURCES = ("elec_av_costs", "elec_load_shape")
+SHAPE_COST_CUBE_INDEX = "flexvalue/sql/shape_cost_cube_index.sql"
+
+# The partitioning of the tables that can be partitioned (see partition_by),
+# as (strategy, column) levels, outermost first; a column of None stands for
+# the partition_by column.
+PARTITION_LEVELS = {
+    "elec_av_costs": [("LIST", None), ("RANGE", "year")],
+    "elec_load_shape": [("LIST", "utility")],
+}
+
+# The longest identifier postgres keeps, in bytes; longer partition names
+# would be silently truncated
+MAX_IDENTIFIER_LENGTH = 63
+
+# A value in a partition bound as pg_get_expr shows it: a quoted literal,
+# possibly with a cast, or a bare number
+PARTITION_BOUND_VALUE = re.compile(r"'((?:[^']|'')*)'(?:::[\w ]+)?|([^\s,()]+)")
+
+# How the stdlib csv parser converts a value of each postgres type; None
+# means the string is kept as is.
+CSV_VALUE_CONVERTERS = {
+    "text": None,
+    "int4": int,
+    "float8": float,
+    # drop the timezone name, as in "2021-01-01 00:00:00 UTC"
+    "timestamp": lambda value: datetime.fromisoformat(value[:19]),
+}
 
 logging.basicConfig(
     stream=sys.stderr, format="%(levelname)s:%(message)s", level=logging.INFO
@@ -127,8 +279,55 @@ HEADER_READ_SIZE = 4096
 # The number of rows to read from csv files when chunking
 INSERT_ROW_COUNT = 100000
 
-# Number of rows to insert into BigQuery at once
-BIG_QUERY_CHUNK_SIZE = 10000
+# The number of bytes read at a time when hashing input files
+HASH_BLOCK_SIZE = 1024 * 1024
+
+# The number of calculation result rows fetched, and written, at a time
+RESULT_FETCH_SIZE = 10000
+
+# How DuckDBManager casts the text it reads from csv files to each postgres
+# type; timestamps are parsed from their first 19 characters instead
+DUCKDB_TYPES = {"text": "VARCHAR", "int4": "INTEGER", "float8": "DOUBLE"}
+
+# The postgres type name of each DuckDB type a calculation result column can
+# have (see results.ARROW_TYPES)
+DUCKDB_RESULT_TYPES = {
+    **{duckdb_type: type_name for type_name, duckdb_type in DUCKDB_TYPES.items()},
+    "SMALLINT": "int2",
+    "BIGINT": "int8",
+    "FLOAT": "float4",
+    "BOOLEAN": "bool",
+    "TIMESTAMP": "timestamp",
+}
+
+# The postgres type name of the columns of each SQLite type affinity, found,
+# as SQLite does, from the substrings of the declared type, in this order
+SQLITE_AFFINITY_TYPES = [
+    (("INT",), "int8"),
+    (("CHAR", "CLOB", "TEXT"), "text"),
+    (("REAL", "FLOA", "DOUB"), "float8"),
+]
+
+# Binary COPY needs Copy.set_types to send each value with the right wire type
+BINARY_COPY_SUPPORTED = hasattr(psycopg.Copy, "set_types")
+
+# Number of rows to insert into BigQuery at once, in each load job when
+# loading files. Load jobs count against a daily per-table quota, so they
+# shouldn't be much smaller than this.
+BIG_QUERY_CHUNK_SIZE = 1000000
+
+# The number of load jobs to run at the same time when loading a file into
+# BigQuery
+BIG_QUERY_LOAD_JOBS = 4
+
+# The BigQuery type of the columns of each postgres type in the
+# *_COPY_TYPES lists, for loading files into BigQuery
+BIG_QUERY_TYPES = {
+    "text": "STRING",
+    "int4": "INT64",
+    "float8": "FLOAT64",
+    "timestamp": "DATETIME",
+}
 
 
 class DBManager:
@@ -145,6 +344,8 @@ class DBManager:
             return PostgresqlManager(fv_config)
         elif fv_config.database_type == "bigquery":
             return BigQueryManager(fv_config)
+        elif fv_config.database_type == "duckdb":
+            return DuckDBManager(fv_config)
         else:
             raise FLEXValueException(
                 f"Unsupported database_type. Please choose one of {SUPPORTED_DBS}"
@@ -158,6 +359,10 @@ class DBManager:
         )
         self.config = fv_config
         self.engine = self._get_db_engine(fv_config)
+        # the staging table each table is being loaded into, in staged_refresh mode
+        self._staging_tables = {}
+        # the tables whose current load failed and was rolled back
+        self._failed_loads = set()
 
     def _get_db_connection_string(self, config: FLEXValueConfig) -> str:
         """Get the sqlalchemy db connection string for the given settings."""
@@ -178,45 +383,32 @@ class DBManager:
     def process_elec_load_shape(self, elec_load_shapes_path: str, truncate=False):
         """Load the hourly electric load shapes (csv) file. The first 7 columns
         are fixed. Then there are a variable number of columns, one for each
-        load shape. This function parses that file to construct a SQL INSERT
-        statement with the data, then inserts the data into the elec_load_shape
-        table.
+        load shape. This function streams that file row by row, unpivots each
+        row into one row per load shape, and inserts the data into the
+        elec_load_shape table in chunks (see _load_chunk_size), so memory use
+        doesn't depend on the size of the file.
         """
         self._prepare_table(
             "elec_load_shape",
             "flexvalue/sql/create_elec_load_shape.sql",
-            # index_filepaths=["flexvalue/sql/elec_load_shape_index.sql"],
             truncate=truncate,
         )
-        rows = self._csv_file_to_rows(elec_load_shapes_path)
-        num_columns = len(rows[0])
-        buffer = []
-        for col in range(7, num_columns):
-            for row in range(1, len(rows)):
-                buffer.append(
-                    {
-                        "state": rows[row][0].upper(),
-                        "utility": rows[row][1].upper(),
-                        "region": rows[row][2].upper(),
-                        "quarter": rows[row][3],
-                        "month": rows[row][4],
-                        "hour_of_day": rows[row][5],
-                        "hour_of_year": rows[row][6],
-                        "load_shape_name": rows[0][col].upper(),
-                        "value": rows[row][col],
-                    }
-                )
-        insert_text = self._file_to_string(
-            "flexvalue/templates/load_elec_load_shape.sql"
+        rows = self._wide_csv_file_to_long_dicts(
+            elec_load_shapes_path,
+            ELEC_LOAD_SHAPE_FIXED_FIELDS,
+            "load_shape_name",
+            fields_to_upper=["state", "utility", "region", "load_shape_name"],
+            types=ELEC_LOAD_SHAPE_COPY_TYPES,
         )
-        with self.engine.begin() as conn:
-            conn.execute(text(insert_text), buffer)
+        insert_text = self._load_sql(
+            "flexvalue/templates/load_elec_load_shape.sql", "elec_load_shape"
+        )
+        self._insert_rows_in_chunks(insert_text, rows)
 
     def process_elec_av_costs(self, elec_av_costs_path: str, truncate=False):
         self._prepare_table(
             "elec_av_costs",
             "flexvalue/sql/create_elec_av_cost.sql",
-            # index_filepaths=["flexvalue/sql/elec_av_costs_index.sql"],
             truncate=truncate,
         )
         logging.debug("about to load elec av costs")
@@ -226,39 +418,31 @@ class DBManager:
             ELEC_AVOIDED_COSTS_FIELDS,
             "flexvalue/templates/load_elec_av_costs.sql",
             dict_processor=self._eac_dict_mapper,
+            types=ELEC_AV_COSTS_COPY_TYPES,
         )
 
     def process_therms_profile(self, therms_profiles_path: str, truncate: bool = False):
         """Loads the therms profiles csv file. This file has 5 fixed columns and then
         a variable number of columns after that, each of which represents a therms
-        profile. This method parses that file to construct a SQL INSERT statement, then
-        inserts the data into the therms_profile table."""
+        profile. This method streams that file, unpivoting each row into one row per
+        therms profile, and inserts the data into the therms_profile table in chunks
+        (see _load_chunk_size)."""
         self._prepare_table(
             "therms_profile",
             "flexvalue/sql/create_therms_profile.sql",
             truncate=truncate,
         )
-        rows = self._csv_file_to_rows(therms_profiles_path)
-        num_columns = len(rows[0])
-        buffer = []
-        for col in range(5, num_columns):
-            for row in range(1, len(rows)):
-                buffer.append(
-                    {
-                        "state": rows[row][0],
-                        "utility": rows[row][1],
-                        "region": rows[row][2],
-                        "quarter": rows[row][3],
-                        "month": rows[row][4],
-                        "profile_name": rows[0][col],
-                        "value": rows[row][col],
-                    }
-                )
-        insert_text = self._file_to_string(
-            "flexvalue/templates/load_therms_profiles.sql"
+        rows = self._wide_csv_file_to_long_dicts(
+            therms_profiles_path,
+            THERMS_PROFILE_FIXED_FIELDS,
+            "profile_name",
+            fields_to_upper=["state", "utility", "region", "profile_name"],
+            types=THERMS_PROFILE_COPY_TYPES,
         )
-        with self.engine.begin() as conn:
-            conn.execute(text(insert_text), buffer)
+        insert_text = self._load_sql(
+            "flexvalue/templates/load_therms_profiles.sql", "therms_profile"
+        )
+        self._insert_rows_in_chunks(insert_text, rows)
 
     def process_gas_av_costs(self, gas_av_costs_path: str, truncate=False):
         self._prepare_table(
@@ -269,10 +453,11 @@ class DBManager:
             "gas_av_costs",
             GAS_AV_COSTS_FIELDS,
             "flexvalue/templates/load_gas_av_costs.sql",
+            types=GAS_AV_COSTS_COPY_TYPES,
         )
 
     def _eac_dict_mapper(self, dict_to_process):
-        dict_to_process["date_str"] = dict_to_process["datetime"][
+        dict_to_process["date_str"] = str(dict_to_process["datetime"])[
             :10
         ]  # just the 'yyyy-mm-dd'
         return dict_to_process
@@ -283,6 +468,26 @@ class DBManager:
             ret = f.read()
         return ret
 
+    def _target_table(self, table_name: str):
+        """The table that loads into table_name write to: its staging table
+        during a staged refresh (see _staged_load), otherwise table_name."""
+        return self._staging_tables.get(table_name, table_name)
+
+    def _retarget_sql(self, sql: str, renames):
+        """Returns sql with each table or index name that's a key of renames
+        replaced, as a whole word, by its value."""
+        for old_name, new_name in renames.items():
+            sql = re.sub(rf"\b{old_name}\b", new_name, sql)
+        return sql
+
+    def _load_sql(self, load_sql_file_path: str, table_name: str):
+        """The insert statement in load_sql_file_path, which loads table_name,
+        pointed at _target_table(table_name)."""
+        return self._retarget_sql(
+            self._file_to_string(load_sql_file_path),
+            {table_name: self._target_table(table_name)},
+        )
+
     def reset_elec_load_shape(self):
         logging.debug("Resetting elec load shape")
         self._reset_table("elec_load_shape")
@@ -308,6 +513,9 @@ class DBManager:
         except sqlalchemy.exc.ProgrammingError:
             # in case this is called before the table is created
             pass
+        self._forget_loads(table_name)
+        if table_name in SHAPE_COST_CUBE_SOURCES:
+            self._drop_table("shape_cost_cube")
 
     def _get_truncate_prefix(self):
         raise FLEXValueException(
@@ -321,17 +529,29 @@ class DBManager:
         index_filepaths=[],
         truncate: bool = False,
     ):
+        if table_name in self._staging_tables:
+            self._create_staging_table(
+                table_name,
+                self._staging_tables[table_name],
+                self._create_table_sql(table_name, sql_filepath),
+            )
+            return
         # if the table doesn't exist, create it and all related indexes
         with self.engine.begin() as conn:
             if not self._table_exists(table_name):
-                sql = self._file_to_string(sql_filepath)
+                sql = self._create_table_sql(table_name, sql_filepath)
                 _ = conn.execute(text(sql))
-            for index_filepath in index_filepaths:
+            # in bulk_load mode, indexes are built after the data is loaded
+            for index_filepath in [] if self.config.bulk_load else index_filepaths:
                 sql = self._file_to_string(index_filepath)
                 _ = conn.execute(text(sql))
         if truncate:
             self._reset_table(table_name)
 
+    def _create_table_sql(self, table_name: str, sql_filepath: str):
+        """The CREATE TABLE statement for table_name, from sql_filepath."""
+        return self._file_to_string(sql_filepath)
+
     def _prepare_table_from_str(
         self,
         table_name: str,
@@ -343,7 +563,8 @@ class DBManager:
         with self.engine.begin() as conn:
             if not self._table_exists(table_name):
                 _ = conn.execute(text(create_table_sql))
-            for index_filepath in index_filepaths:
+            # in bulk_load mode, indexes are built after the data is loaded
+            for index_filepath in [] if self.config.bulk_load else index_filepaths:
                 sql = self._file_to_string(index_filepath)
                 _ = conn.execute(text(sql))
         if truncate:
@@ -354,6 +575,408 @@ class DBManager:
         table_exists = inspection.has_table(table_name)
         return table_exists
 
+    def _load_table(
+        self, table_name: str, process_method: str, path: str, append=False
+    ):
+        """Loads path into table_name with process_method, the name of one of the
+        process_* methods. append is True for loads that add to a table another
+        load fills, rather than refreshing it.
+        With skip_unchanged_loads, the load is skipped if the load manifest
+        shows that the same content was the last thing process_method loaded
+        into table_name and the table still has rows, and the manifest is
+        updated after each load. If the table has been dropped or emptied
+        since, what the manifest says about it is forgotten and it's loaded
+        again."""
+        fingerprint = None
+        if self.config.skip_unchanged_loads:
+            manifest_row = self._manifest_row(table_name, process_method)
+            fingerprint = self._source_fingerprint(path, manifest_row)
+            if (
+                manifest_row is not None
+                and manifest_row["content_hash"] == fingerprint["content_hash"]
+            ):
+                if self._has_loaded_rows(table_name):
+                    logging.info(
+                        f"Skipped loading {path} into {table_name}; the same content was loaded at {manifest_row['loaded_at']}."
+                    )
+                    return
+                logging.info(
+                    f"{table_name} is missing or empty, so {path} is loaded again."
+                )
+                self._forget_loads(table_name)
+        self._failed_loads.discard(table_name)
+        try:
+            self._load_table_data(table_name, process_method, path, append)
+        except Exception:
+            # the table may be partly loaded, so nothing can be skipped next time
+            self._update_manifest(table_name, process_method, None, append)
+            if table_name in SHAPE_COST_CUBE_SOURCES:
+                self._drop_table("shape_cost_cube")
+            raise
+        if table_name in self._failed_loads:
+            # the load was rolled back, so the table is as the manifest says
+            return
+        self._update_manifest(table_name, process_method, fingerprint, append)
+        self._update_shape_cost_cube(table_name, append)
+
+    def _load_table_data(
+        self, table_name: str, process_method: str, path: str, append=False
+    ):
+        """Runs process_method on path for _load_table.
+        With incremental_av_costs, the avoided cost tables are loaded with
+        _incremental_load. In staged_refresh mode, tables that aren't appended
+        to are refreshed with _staged_load. Otherwise, in bulk_load mode, the
+        table's secondary indexes (see _table_indexes) are dropped before the
+        load and built once it's done, and then the table is analyzed, so the
+        rows aren't indexed one at a time as they arrive. Without bulk_load,
+        the indexes are built after the load if they don't exist yet, and the
+        table is analyzed."""
+        if (
+            self.config.incremental_av_costs
+            and table_name in VALUE_CURVE_INDEXES
+            and not append
+        ):
+            self._incremental_load(table_name, process_method, path)
+            return
+        if self.config.staged_refresh and not append:
+            self._staged_load(table_name, process_method, path)
+            return
+        if not self.config.bulk_load:
+            getattr(self, process_method)(path)
+            if self.config.calculation_indexes:
+                # a no-op once the indexes exist; the planner needs fresh
+                # statistics to choose between them and a scan
+                self._build_indexes(table_name)
+                self._analyze_table(table_name)
+            return
+        self._drop_indexes(table_name)
+        getattr(self, process_method)(path)
+        self._build_indexes(table_name)
+        self._analyze_table(table_name)
+
+    def _table_indexes(self, table_name: str):
+        """The secondary indexes of table_name, as {index name: sql file},
+        including its CALCULATION_INDEXES unless calculation_indexes is off."""
+        indexes = dict(TABLE_INDEXES.get(table_name, {}))
+        if self.config.calculation_indexes:
+            indexes.update(CALCULATION_INDEXES.get(table_name, {}))
+        return indexes
+
+    def _drop_indexes(self, table_name: str):
+        with self.engine.begin() as conn:
+            for index_name in self._table_indexes(table_name):
+                conn.execute(text(f"DROP INDEX IF EXISTS {index_name}"))
+
+    def _build_indexes(self, table_name: str):
+        with self.engine.begin() as conn:
+            for index_filepath in self._table_indexes(table_name).values():
+                conn.execute(text(self._file_to_string(index_filepath)))
+
+    def _analyze_table(self, table_name: str):
+        with self.engine.begin() as conn:
+            conn.execute(text(f"ANALYZE {table_name}"))
+
+    def _staged_load(self, table_name: str, process_method: str, path: str):
+        """Refreshes table_name without readers ever seeing it empty or half
+        loaded: process_method loads path into a new staging table, which then
+        replaces table_name in a single transaction (see
+        _swap_in_staging_table). If nothing was loaded, for example because the
+        load failed and the error was logged, table_name is left as it was."""
+        staging_table = f"{table_name}_staging"
+        if self._load_into_staging_table(
+            table_name, process_method, path, staging_table
+        ):
+            self._swap_in_staging_table(table_name, staging_table)
+
+    def _load_into_staging_table(
+        self, table_name: str, process_method: str, path: str, staging_table: str
+    ):
+        """Runs process_method on path with staging_table standing in for
+        table_name (see _target_table). Returns True if any rows were loaded;
+        otherwise staging_table is dropped, the load is counted as failed and a
+        warning is logged."""
+        self._staging_tables[table_name] = staging_table
+        try:
+            getattr(self, process_method)(path)
+        except Exception:
+            self._drop_table(staging_table)
+            raise
+        finally:
+            del self._staging_tables[table_name]
+        if not self._table_exists(staging_table) or not self._exec_select_sql(
+            f"SELECT 1 FROM {staging_table} LIMIT 1"
+        ):
+            logging.warning(
+                f"Nothing was loaded into {table_name}, so it was left as it was."
+            )
+            self._drop_table(staging_table)
+            self._failed_loads.add(table_name)
+            return False
+        return True
+
+    def _incremental_load(self, table_name: str, process_method: str, path: str):
+        """Adds the avoided cost curves in path to table_name, replacing the
+        rows of any curve (value_curve_name) that's already there and keeping
+        the other curves, so loading a new vintage takes time in proportion to
+        its own size. The file is loaded into a staging table first, and the
+        old rows of its curves are deleted and the new ones inserted in one
+        transaction, using the index on value_curve_name."""
+        incoming_table = f"{table_name}_incoming"
+        if not self._load_into_staging_table(
+            table_name, process_method, path, incoming_table
+        ):
+            return
+        if self._table_exists(table_name):
+            self._replace_curves(table_name, incoming_table)
+            return
+        self._swap_in_staging_table(table_name, incoming_table)
+        with self.engine.begin() as conn:
+            conn.execute(text(self._file_to_string(VALUE_CURVE_INDEXES[table_name])))
+        if table_name in SHAPE_COST_CUBE_SOURCES:
+            self._drop_table("shape_cost_cube")
+
+    def _replace_curves(self, table_name: str, incoming_table: str):
+        """Replaces the rows of table_name for each value_curve_name in
+        incoming_table with the rows of incoming_table, which is dropped.
+        If shape_cost_cube exists and table_name is one of its sources, the
+        cube's rows for those curves are recomputed in the same transaction."""
+        curves = [
+            curve
+            for (curve,) in self._exec_select_sql(
+                f"SELECT DISTINCT value_curve_name FROM {incoming_table}"
+            )
+        ]
+
+        def in_curves(column):
+            return f"{column} IN (SELECT value_curve_name FROM {incoming_table})" + (
+                f" OR {column} IS NULL" if None in curves else ""
+            )
+
+        refresh_cube = table_name in SHAPE_COST_CUBE_SOURCES and self._table_exists(
+            "shape_cost_cube"
+        )
+        # serial primary keys are left for table_name to assign
+        columns = ", ".join(
+            column["name"]
+            for column in inspect(self.engine).get_columns(incoming_table)
+            if column["name"] != "pk"
+        )
+        with self.engine.begin() as conn:
+            conn.execute(text(self._file_to_string(VALUE_CURVE_INDEXES[table_name])))
+            self._prepare_partitions(conn, table_name, incoming_table)
+            deleted = conn.execute(
+                text(f"DELETE FROM {table_name} WHERE {in_curves('value_curve_name')}")
+            ).rowcount
+            inserted = conn.execute(
+                text(
+                    f"INSERT INTO {table_name} ({columns}) SELECT {columns} FROM {incoming_table}"
+                )
+            ).rowcount
+            if refresh_cube:
+                conn.execute(
+                    text(
+                        f"DELETE FROM shape_cost_cube WHERE {in_curves('value_curve_name')}"
+                    )
+                )
+                conn.execute(
+                    text(
+                        "INSERT INTO shape_cost_cube "
+                        + self._get_shape_cost_cube_sql(
+                            in_curves("elec_av_costs.value_curve_name")
+                        )
+                    )
+                )
+            conn.execute(text(f"DROP TABLE {incoming_table}"))
+        logging.info(
+            f"Replaced {deleted} rows of {table_name} with {inserted} rows for the curves {', '.join(str(curve) for curve in curves)}."
+        )
+        self._analyze_table(table_name)
+
+    def _create_staging_table(
+        self, table_name: str, staging_table: str, create_table_sql: str
+    ):
+        """Creates staging_table, empty, from the CREATE TABLE statement for
+        table_name."""
+        self._drop_table(staging_table)
+        with self.engine.begin() as conn:
+            conn.execute(
+                text(
+                    self._retarget_sql(create_table_sql, {table_name: staging_table})
+                )
+            )
+
+    def _swap_in_staging_table(self, table_name: str, staging_table: str):
+        """Replaces table_name with staging_table, and builds its indexes, in
+        one transaction."""
+        with self.engine.begin() as conn:
+            conn.execute(text(f"DROP TABLE IF EXISTS {table_name}"))
+            conn.execute(text(f"ALTER TABLE {staging_table} RENAME TO {table_name}"))
+            for index_filepath in self._table_indexes(table_name).values():
+                conn.execute(text(self._file_to_string(index_filepath)))
+        self._analyze_table(table_name)
+
+    def _prepare_partitions(self, conn, table_name: str, source_table: str):
+        """Called on conn before the rows of source_table are inserted into
+        table_name. Databases with partitioned tables create the partitions
+        that the rows need."""
+        pass
+
+    def _drop_table(self, table_name: str):
+        """Drops table_name, if it exists, and forgets its loads."""
+        with self.engine.begin() as conn:
+            conn.execute(text(f"DROP TABLE IF EXISTS {table_name}"))
+        self._forget_loads(table_name)
+
+    def _has_loaded_rows(self, table_name: str):
+        """Whether the table that loads of table_name fill exists and has any
+        rows."""
+        return self._table_exists(table_name) and bool(
+            self._exec_select_sql(f"SELECT 1 FROM {table_name} LIMIT 1")
+        )
+
+    def _source_fingerprint(self, path: str, manifest_row=None):
+        """The source, content_hash (sha256), size and mtime of the file at
+        path, for the load manifest. If manifest_row has the same source, size
+        and mtime, its content_hash is reused instead of reading the file."""
+        stat = os.stat(path)
+        if manifest_row is not None and (
+            manifest_row["source"],
+            manifest_row["size"],
+            manifest_row["mtime"],
+        ) == (path, stat.st_size, stat.st_mtime):
+            content_hash = manifest_row["content_hash"]
+        else:
+            content_hash = self._file_content_hash(path)
+        return {
+            "source": path,
+            "content_hash": content_hash,
+            "size": stat.st_size,
+            "mtime": stat.st_mtime,
+        }
+
+    def _file_content_hash(self, path: str):
+        content_hash = hashlib.sha256()
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(HASH_BLOCK_SIZE), b""):
+                content_hash.update(block)
+        return content_hash.hexdigest()
+
+    def _manifest_row(self, table_name: str, load_name: str):
+        """The load_manifest row, as a dict, recording what load_name last
+        loaded into table_name, or None."""
+        if not self._table_exists("load_manifest"):
+            return None
+        with self.engine.begin() as conn:
+            row = conn.execute(
+                text(
+                    "SELECT * FROM load_manifest WHERE table_name = :table_name AND load_name = :load_name"
+                ),
+                {"table_name": table_name, "load_name": load_name},
+            ).first()
+        return dict(row._mapping) if row is not None else None
+
+    def _update_manifest(
+        self, table_name: str, load_name: str, fingerprint, append: bool
+    ):
+        """Records in load_manifest that load_name has loaded the source
+        described by fingerprint into table_name. A load that isn't an append
+        replaced what the other loads put in the table, so their rows are
+        removed. With no fingerprint (skip_unchanged_loads is off), the load
+        is just forgotten, so a later run can't skip it based on older
+        content."""
+        if fingerprint is None and not self._table_exists("load_manifest"):
+            return
+        self._prepare_load_manifest()
+        with self.engine.begin() as conn:
+            if append:
+                conn.execute(
+                    text(
+                        "DELETE FROM load_manifest WHERE table_name = :table_name AND load_name = :load_name"
+                    ),
+                    {"table_name": table_name, "load_name": load_name},
+                )
+            else:
+                conn.execute(
+                    text("DELETE FROM load_manifest WHERE table_name = :table_name"),
+                    {"table_name": table_name},
+                )
+            if fingerprint is not None:
+                conn.execute(
+                    text(
+                        "INSERT INTO load_manifest (table_name, load_name, source, content_hash, size, mtime, loaded_at) VALUES (:table_name, :load_name, :source, :content_hash, :size, :mtime, :loaded_at)"
+                    ),
+                    {
+                        "table_name": table_name,
+                        "load_name": load_name,
+                        "loaded_at": datetime.now(),
+                        **fingerprint,
+                    },
+                )
+
+    def _prepare_shared_tables(self):
+        """Creates the tables that more than one load writes to, like
+        load_manifest. FlexValueRun does this before starting the loads, so
+        parallel loads don't race to create them."""
+        if self.config.skip_unchanged_loads:
+            self._prepare_load_manifest()
+
+    def _prepare_load_manifest(self):
+        self._prepare_table("load_manifest", "flexvalue/sql/create_load_manifest.sql")
+
+    def _forget_loads(self, table_name: str):
+        """Removes table_name's rows from load_manifest, e.g. when it's reset."""
+        if not self._table_exists("load_manifest"):
+            return
+        with self.engine.begin() as conn:
+            conn.execute(
+                text("DELETE FROM load_manifest WHERE table_name = :table_name"),
+                {"table_name": table_name},
+            )
+
+    def _normalize_name_case(self):
+        """Upper-cases the profile names of a therms_profile table loaded
+        before process_therms_profile did that itself, so the calculation can
+        join on them with plain equality (and use the table's index). The load
+        shape names have always been upper-cased when loaded. This is a
+        one-time migration: once it has run, schema_migrations records that,
+        and later runs only look that up."""
+        migration = "upper_case_therms_profile_names"
+        if not self._table_exists("therms_profile") or self._migration_applied(
+            migration
+        ):
+            return
+        self._prepare_table(
+            "schema_migrations", "flexvalue/sql/create_schema_migrations.sql"
+        )
+        with self.engine.begin() as conn:
+            result = conn.execute(
+                text(
+                    "UPDATE therms_profile SET profile_name = UPPER(profile_name) WHERE profile_name <> UPPER(profile_name)"
+                )
+            )
+            conn.execute(
+                text(
+                    "INSERT INTO schema_migrations (name, applied_at) VALUES (:name, :applied_at)"
+                ),
+                {"name": migration, "applied_at": datetime.now()},
+            )
+        if result.rowcount:
+            logging.info(
+                f"Upper-cased the profile_name of {result.rowcount} therms_profile rows"
+            )
+
+    def _migration_applied(self, name: str):
+        if not self._table_exists("schema_migrations"):
+            return False
+        with self.engine.begin() as conn:
+            return (
+                conn.execute(
+                    text("SELECT name FROM schema_migrations WHERE name = :name"),
+                    {"name": name},
+                ).first()
+                is not None
+            )
+
     def run(self):
         logging.debug(f"About to start calculation, it is {datetime.now()}")
         self._perform_calculation()
@@ -372,7 +995,13 @@ class DBManager:
         dicts = self._csv_file_to_dicts(
             project_info_path,
             fieldnames=PROJECT_INFO_FIELDS,
-            fields_to_upper=["load_shape", "state", "region", "utility"],
+            fields_to_upper=[
+                "load_shape",
+                "therms_profile",
+                "state",
+                "region",
+                "utility",
+            ],
         )
         for d in dicts:
             start_year = int(d["start_year"])
@@ -382,7 +1011,9 @@ class DBManager:
             d["start_date"] = f"{start_year}-{month}-01"
             d["end_date"] = f"{start_year + eul}-{month}-01"
 
-        insert_text = self._file_to_string("flexvalue/templates/load_project_info.sql")
+        insert_text = self._load_sql(
+            "flexvalue/templates/load_project_info.sql", "project_info"
+        )
         self._load_project_info_data(insert_text, dicts)
 
     def _load_project_info_data(self, insert_text, project_info_dicts):
@@ -421,6 +1052,11 @@ class DBManager:
             raise FLEXValueException(
                 f"Not all data has been loaded. Please provide data for the following tables: {', '.join(empty_tables)}"
             )
+        if self.config.calculation_engine == "numpy":
+            self._run_numpy_calculation()
+            return
+        if self.config.shape_cost_cube:
+            self._prepare_shape_cost_cube()
         if self.config.separate_output_tables:
             sql = self._get_calculation_sql(mode="electric")
             logging.info(f"electric sql =\n{sql}")
@@ -435,26 +1071,257 @@ class DBManager:
 
     def _run_calc(self, sql):
         with self.engine.begin() as conn:
-            result = conn.execute(text(sql))
+            self._create_discount_factors(conn)
             if (
-                not self.config.output_table
-                and not self.config.electric_output_table
-                and not self.config.gas_output_table
+                self.config.output_table
+                or self.config.electric_output_table
+                or self.config.gas_output_table
             ):
-                if self.config.output_file:
-                    with open(self.config.output_file, "w") as outfile:
-                        outfile.write(", ".join(result.keys()) + "\n")
-                        for row in result:
-                            outfile.write(", ".join([str(col) for col in row]) + "\n")
-                else:
-                    try:
-                        print(", ".join(result.keys()))
-                        for row in result:
-                            print(", ".join([str(col) for col in row]))
-                    except ResourceClosedError:
-                        # If the query doesn't return rows (e.g. we are writing to
-                        # an output table), don't error out.
-                        pass
+                conn.execute(text(sql))
+                return
+            types = (
+                self._result_types(conn, sql)
+                if self.config.result_format() != "csv"
+                else None
+            )
+            # Stream the rows RESULT_FETCH_SIZE at a time, through a
+            # server-side cursor where the database supports one, so they're
+            # written as they arrive instead of all being buffered first.
+            result = conn.execute(
+                text(sql),
+                execution_options={
+                    "stream_results": True,
+                    "yield_per": RESULT_FETCH_SIZE,
+                },
+            )
+            self._write_results(result.keys(), result, types)
+
+    def _result_types(self, conn, sql):
+        """The postgres type names of the columns of sql's result, where the
+        database reports them, so the parquet and arrow outputs can type
+        columns whose first rows are all NULL. None where it doesn't."""
+        return None
+
+    def _write_results(self, columns, rows, types=None):
+        """Writes the calculation's result as csv, its column names (unless
+        columns is None) and then its rows, to output_file, or prints it. The
+        rows are written RESULT_FETCH_SIZE at a time, so only one batch of them
+        needs to be in memory. With the parquet and arrow output formats, they
+        are written to output_file a record batch at a time instead, with the
+        column types (see results.record_batches) if they're known."""
+        output_format = self.config.result_format()
+        if output_format != "csv":
+            results.write_record_batches(
+                self.config.output_file,
+                results.record_batches(columns, rows, output_format, types),
+                output_format,
+                columns=columns,
+            )
+        elif self.config.output_file:
+            with open(self.config.output_file, "w", newline="") as outfile:
+                self._write_csv(outfile, columns, rows)
+        else:
+            self._write_csv(sys.stdout, columns, rows)
+
+    def _write_csv(self, outfile, columns, rows):
+        writer = csv.writer(outfile, lineterminator="\n")
+        if columns is not None:
+            writer.writerow(columns)
+        for chunk in self._chunk_rows(rows, RESULT_FETCH_SIZE):
+            writer.writerows(chunk)
+
+    def _create_discount_factors(self, conn):
+        """Creates the discount_factors temporary table the calculation joins
+        the avoided costs on: one row per quarter of each project's EUL, with
+        its discount factor, so that's computed once per quarter instead of
+        once per hourly row. It's analyzed so the planner knows how many rows
+        each project expands to."""
+        conn.execute(text("DROP TABLE IF EXISTS temp.discount_factors"))
+        conn.execute(
+            text(
+                f"CREATE TEMPORARY TABLE discount_factors AS {self._get_discount_factors_sql()}"
+            )
+        )
+        conn.execute(text("ANALYZE discount_factors"))
+
+    def _get_discount_factors_sql(self):
+        template = self.template_env.get_template("discount_factors.sql")
+        return template.render(self._get_calculation_sql_context())
+
+    def _prepare_shape_cost_cube(self):
+        """Builds shape_cost_cube, the sums of each load shape's values times
+        each electric avoided cost component by utility, region, value curve,
+        year and quarter, unless it already exists. The quarterly electric
+        calculation reads it instead of the hourly tables. Loads that change
+        the avoided costs or load shapes update or drop it (see
+        _update_shape_cost_cube), so it's only rebuilt after those."""
+        if self._table_exists("shape_cost_cube"):
+            return
+        start = time.perf_counter()
+        with self.engine.begin() as conn:
+            conn.execute(
+                text(
+                    f"CREATE TABLE shape_cost_cube AS {self._get_shape_cost_cube_sql()}"
+                )
+            )
+            conn.execute(text(self._file_to_string(SHAPE_COST_CUBE_INDEX)))
+        self._analyze_table("shape_cost_cube")
+        logging.info(f"Built shape_cost_cube in {time.perf_counter() - start:.1f}s")
+
+    def _get_shape_cost_cube_sql(self, cube_filter=None):
+        """The query shape_cost_cube is built from, limited to the rows that
+        match cube_filter (a condition on elec_av_costs and elec_load_shape)
+        if it's given."""
+        template = self.template_env.get_template("shape_cost_cube.sql")
+        return template.render(
+            {
+                **self._get_calculation_sql_context(),
+                "cost_components": SHAPE_COST_CUBE_COMPONENTS,
+                "cube_filter": cube_filter,
+            }
+        )
+
+    def _update_shape_cost_cube(self, table_name: str, append=False):
+        """Brings shape_cost_cube, if it exists, up to date after a load of
+        table_name. The rows of load shapes appended to elec_load_shape (the
+        metered ones) are added to it, and incremental avoided cost loads have
+        already recomputed the curves they replaced (see _replace_curves).
+        Any other load of one of its source tables drops it, so the next
+        calculation that uses it rebuilds it."""
+        if table_name not in SHAPE_COST_CUBE_SOURCES or not self._table_exists(
+            "shape_cost_cube"
+        ):
+            return
+        if self.config.incremental_av_costs and table_name in VALUE_CURVE_INDEXES:
+            return
+        if not append:
+            self._drop_table("shape_cost_cube")
+            return
+        load_shape_name = (
+            "load_shape_name_code" if self.config.compact_schema else "load_shape_name"
+        )
+        load_shape_names = [
+            name
+            for (name,) in self._exec_select_sql(
+                f"SELECT DISTINCT {load_shape_name} FROM elec_load_shape EXCEPT SELECT load_shape_name FROM shape_cost_cube"
+            )
+        ]
+        if not load_shape_names:
+            return
+        with self.engine.begin() as conn:
+            conn.execute(
+                text(
+                    "INSERT INTO shape_cost_cube "
+                    + self._get_shape_cost_cube_sql(
+                        f"elec_load_shape.{load_shape_name} IN :load_shape_names"
+                    )
+                ).bindparams(bindparam("load_shape_names", expanding=True)),
+                {"load_shape_names": load_shape_names},
+            )
+        self._analyze_table("shape_cost_cube")
+
+    def _run_numpy_calculation(self):
+        """Computes the calculation's results with numpy_engine instead of the
+        calculation templates, from the same tables, and writes them like
+        _run_calc does."""
+        start = time.perf_counter()
+        # the ratio the templates report when both benefits and costs are 0
+        zero_ratio = (
+            0.0
+            if self.config.database_type in ["postgresql", "duckdb"]
+            else float("-inf")
+        )
+        engine = numpy_engine.NumpyEngine(
+            **self._numpy_engine_inputs(),
+            use_value_curve_name_for_join=self.config.use_value_curve_name_for_join,
+            zero_ratio=zero_ratio,
+        )
+        if self.config.separate_output_tables:
+            self._write_results(
+                *engine.electric(
+                    self._elec_aggregation_columns(), self._elec_components()
+                )
+            )
+            self._write_results(
+                *engine.gas(self._gas_aggregation_columns(), self._gas_components())
+            )
+        else:
+            self._write_results(
+                *engine.combined(self._elec_components(), self._gas_components())
+            )
+        logging.info(f"Ran the numpy calculation in {time.perf_counter() - start:.1f}s")
+
+    def _numpy_engine_inputs(self):
+        """The tables numpy_engine.NumpyEngine reads, as {column: values}, with
+        the avoided costs and load shapes limited to the projects' utilities
+        and the names matched the way the calculation templates match them."""
+        context = self._get_calculation_sql_context()
+        project_info = context["project_info_table"]
+        if self.config.database_type == "bigquery":
+            load_shape, therms_profile = "UPPER(load_shape)", "UPPER(therms_profile)"
+        else:
+            load_shape, therms_profile = "load_shape", "therms_profile"
+        elec_av_costs = ", ".join(
+            f"elec_av_costs.{column}"
+            for column in numpy_engine.ELEC_AV_COSTS_COLUMNS
+            if column not in ("utility", "region")
+        )
+        if self.config.compact_schema:
+            eac_sql = f"""SELECT utility_codes.value AS utility, region_codes.value AS region, {elec_av_costs}
+                FROM {context["eac_table"]} elec_av_costs
+                JOIN utility_codes ON utility_codes.code = elec_av_costs.utility_code
+                JOIN region_codes ON region_codes.code = elec_av_costs.region_code"""
+            els_sql = f"""SELECT utility_codes.value AS utility, load_shape_name_codes.value AS load_shape_name, elec_load_shape.hour_of_year, elec_load_shape.value
+                FROM {context["els_table"]} elec_load_shape
+                JOIN utility_codes ON utility_codes.code = elec_load_shape.utility_code
+                JOIN load_shape_name_codes ON load_shape_name_codes.code = elec_load_shape.load_shape_name_code"""
+        else:
+            eac_sql = f"""SELECT elec_av_costs.utility, elec_av_costs.region, {elec_av_costs}
+                FROM {context["eac_table"]} elec_av_costs"""
+            els_sql = f"""SELECT {", ".join(numpy_engine.ELEC_LOAD_SHAPE_COLUMNS)}
+                FROM {context["els_table"]} elec_load_shape"""
+        project_columns = {
+            "load_shape": f"{load_shape} AS load_shape",
+            "therms_profile": f"{therms_profile} AS therms_profile",
+        }
+        projects_sql = "SELECT {} FROM {}".format(
+            ", ".join(
+                project_columns.get(column, column)
+                for column in numpy_engine.PROJECT_COLUMNS
+            ),
+            project_info,
+        )
+        utilities = f"SELECT utility FROM {project_info}"
+        return {
+            "projects": self._select_columns(projects_sql),
+            "elec_av_costs": self._select_columns(
+                f"""SELECT * FROM ({eac_sql}) elec_av_costs
+                WHERE EXISTS (
+                    SELECT 1 FROM {project_info} project_info
+                    WHERE project_info.utility = elec_av_costs.utility
+                        AND project_info.region = elec_av_costs.region
+                )"""
+            ),
+            "elec_load_shape": self._select_columns(
+                f"SELECT * FROM ({els_sql}) elec_load_shape WHERE utility IN ({utilities})"
+            ),
+            "gas_av_costs": self._select_columns(
+                f"""SELECT {", ".join(numpy_engine.GAS_AV_COSTS_COLUMNS)}
+                FROM {context["gac_table"]} WHERE utility IN ({utilities})"""
+            ),
+            "therms_profile": self._select_columns(
+                f"""SELECT {", ".join(numpy_engine.THERMS_PROFILE_COLUMNS)}
+                FROM {context["therms_profile_table"]} WHERE utility IN ({utilities})"""
+            ),
+        }
+
+    def _select_columns(self, sql: str):
+        """Returns the result of sql as {column name: list of values}."""
+        with self.engine.begin() as conn:
+            result = conn.execute(text(sql))
+            names = list(result.keys())
+            rows = result.fetchall()
+        return {name: [row[i] for row in rows] for i, name in enumerate(names)}
 
     def _get_calculation_sql(self, mode="both"):
         if mode == "both":
@@ -485,6 +1352,9 @@ class DBManager:
             "elec_components": self._elec_components(),
             "gas_components": self._gas_components(),
             "use_value_curve_name_for_join": self.config.use_value_curve_name_for_join,
+            "compact_schema": self.config.compact_schema,
+            "quarterly_elec_aggregation": self.config.quarterly_elec_aggregation,
+            "shape_cost_cube": self.config.shape_cost_cube,
         }
         if mode == "electric":
             context["elec_aggregation_columns"] = elec_agg_columns
@@ -583,38 +1453,180 @@ class DBManager:
         be present in the header row of the csv file being read, and are
         capitalized (with string.upper()) before returning the dict."""
         dicts = []
+        for row in self._csv_file_to_dict_iter(csv_file_path, fieldnames):
+            for field in fields_to_upper:
+                row[field] = row[field].upper()
+            dicts.append(row)
+        return dicts
+
+    def _csv_file_to_dict_iter(self, csv_file_path: str, fieldnames=None):
+        """Generator that yields one dict per data row of the csv file at
+        csv_file_path, skipping the header row if there is one. If fieldnames
+        is None, the keys are taken from the file's (required) header row."""
+        has_header = fieldnames is not None and self._has_header(csv_file_path)
         with open(csv_file_path, newline="") as f:
-            has_header = csv.Sniffer().has_header(f.read(HEADER_READ_SIZE))
-            f.seek(0)
+            if fieldnames is None:
+                yield from csv.DictReader(f)
+                return
             csv_reader = csv.DictReader(f, fieldnames=fieldnames)
             if has_header:
                 next(csv_reader)
-            for row in csv_reader:
-                processed = row
-                for field in fields_to_upper:
-                    processed[field] = processed[field].upper()
-                dicts.append(processed)
-        return dicts
+            yield from csv_reader
 
-    def _csv_file_to_rows(self, csv_file_path: str):
-        """Reads a csv file into memory and returns a list of tuples representing
-        the data. If no header row is present, it raises a FLEXValueException."""
-        rows = []
+    def _has_header(self, csv_file_path: str):
+        """Whether the csv file at csv_file_path seems to start with a header
+        row, going by csv.Sniffer. An empty file has none."""
         with open(csv_file_path, newline="") as f:
-            has_header = csv.Sniffer().has_header(f.read(HEADER_READ_SIZE))
-            if not has_header:
-                raise FLEXValueException(
-                    f"The file you provided, {csv_file_path}, \
-                                 doesn't seem to have a header row. Please provide a header row \
-                                 containing the column names."
+            sample = f.read(HEADER_READ_SIZE)
+        return bool(sample) and csv.Sniffer().has_header(sample)
+
+    def _use_columnar_parser(self):
+        """Whether files are parsed a record batch at a time with pyarrow
+        (csv_parser = "pyarrow") rather than row by row with the csv module."""
+        return self.config.csv_parser == "pyarrow"
+
+    def _csv_file_to_typed_tuples(
+        self,
+        csv_file_path: str,
+        fieldnames,
+        types,
+        fields_to_upper=None,
+        byte_range=None,
+    ):
+        """Generator that yields the fieldnames columns of the csv file at
+        csv_file_path as tuples, one per data row, with each value converted to
+        the python type matching its postgres type in types (see
+        CSV_VALUE_CONVERTERS). The fields in fields_to_upper are upper-cased.
+        Like the dicts of _csv_file_to_dict_iter, the columns are positional:
+        a header row is skipped if the file seems to have one (or, if
+        byte_range is given, if byte_range has one), but never used to locate
+        them. If byte_range (a partitions.ByteRange) is given, only its rows
+        are read."""
+        if byte_range is not None:
+            has_header = byte_range.header_end > 0
+        else:
+            has_header = self._has_header(csv_file_path)
+        if self._use_columnar_parser():
+            yield from columnar.typed_rows(
+                csv_file_path,
+                fieldnames,
+                types,
+                fields_to_upper,
+                byte_range,
+                header=has_header,
+            )
+            return
+        fields_to_upper = fields_to_upper or []
+        converters = [
+            str.upper if field in fields_to_upper else CSV_VALUE_CONVERTERS[type_name]
+            for field, type_name in zip(fieldnames, types)
+        ]
+        with partitions.open_text(csv_file_path, byte_range) as f:
+            csv_reader = csv.reader(f)
+            if has_header:
+                next(csv_reader, None)
+            for row in csv_reader:
+                if not row:
+                    continue
+                yield tuple(
+                    value if convert is None else convert(value)
+                    for value, convert in zip(row, converters)
                 )
-            f.seek(0)
+
+    def _wide_csv_file_to_long_tuples(
+        self,
+        csv_file_path: str,
+        fixed_fieldnames,
+        name_field: str,
+        fields_to_upper=None,
+        types=None,
+    ):
+        """Generator that streams a "wide" csv file, where the first
+        len(fixed_fieldnames) columns are fixed and each remaining column holds
+        the values for one named shape, and yields it in "long" format: one
+        tuple of the fixed values, the shape's header and its value per
+        (row, shape) pair. Only one row (or, with the pyarrow csv_parser, one
+        record batch) of the file is in memory at a time. fields_to_upper may
+        include name_field. types, if given, holds the postgres type of each
+        fixed field, then of name_field and of the value; otherwise the values
+        are left as strings.
+        If no header row is present, it raises a FLEXValueException."""
+        fields_to_upper = fields_to_upper or []
+        num_fixed = len(fixed_fieldnames)
+        if not self._has_header(csv_file_path):
+            raise FLEXValueException(
+                f"The file you provided, {csv_file_path}, \
+                             doesn't seem to have a header row. Please provide a header row \
+                             containing the column names."
+            )
+        if types is not None and self._use_columnar_parser():
+            yield from columnar.wide_typed_rows(
+                csv_file_path, fixed_fieldnames, name_field, types, fields_to_upper
+            )
+            return
+        types = types or ["text"] * (num_fixed + 2)
+        converters = [
+            str.upper if field in fields_to_upper else CSV_VALUE_CONVERTERS[type_name]
+            for field, type_name in zip(fixed_fieldnames, types)
+        ]
+        convert_value = CSV_VALUE_CONVERTERS[types[-1]] or str
+        with open(csv_file_path, newline="") as f:
             csv_reader = csv.reader(f)
-            rows = []
-            # Note that we're reading the whole file into memory - don't use this on big files.
+            names = next(csv_reader)[num_fixed:]
+            if name_field in fields_to_upper:
+                names = [name.upper() for name in names]
             for row in csv_reader:
-                rows.append(row)
-        return rows
+                fixed = tuple(
+                    value if convert is None else convert(value)
+                    for value, convert in zip(row, converters)
+                )
+                for name, value in zip(names, row[num_fixed:]):
+                    yield (*fixed, name, convert_value(value))
+
+    def _wide_csv_file_to_long_dicts(
+        self,
+        csv_file_path: str,
+        fixed_fieldnames,
+        name_field: str,
+        fields_to_upper=None,
+        types=None,
+    ):
+        """Like _wide_csv_file_to_long_tuples, but yields dicts keyed by the
+        fixed fieldnames, name_field and "value"."""
+        fieldnames = list(fixed_fieldnames) + [name_field, "value"]
+        for row in self._wide_csv_file_to_long_tuples(
+            csv_file_path, fixed_fieldnames, name_field, fields_to_upper, types
+        ):
+            yield dict(zip(fieldnames, row))
+
+    def _max_load_workers(self):
+        """How many table loads FlexValueRun may run at the same time;
+        configurable with load_workers, defaulting to one at a time."""
+        return self.config.load_workers or 1
+
+    def _load_chunk_size(self):
+        """The number of rows to send to the database at once when loading
+        files; configurable with load_chunk_size, defaulting to INSERT_ROW_COUNT."""
+        return self.config.load_chunk_size or INSERT_ROW_COUNT
+
+    def _chunk_rows(self, rows, chunk_size: int = None):
+        """Generator that groups the iterable rows into lists of at most
+        chunk_size items (by default, _load_chunk_size()), without
+        materializing more than one chunk."""
+        chunk_size = chunk_size or self._load_chunk_size()
+        rows = iter(rows)
+        while True:
+            chunk = list(islice(rows, chunk_size))
+            if not chunk:
+                return
+            yield chunk
+
+    def _insert_rows_in_chunks(self, insert_text: str, rows):
+        """Executes insert_text once per chunk of rows (an iterable of dicts),
+        all in a single transaction."""
+        with self.engine.begin() as conn:
+            for chunk in self._chunk_rows(rows):
+                conn.execute(text(insert_text), chunk)
 
     def _load_csv_file(
         self,
@@ -623,32 +1635,29 @@ class DBManager:
         fieldnames,
         load_sql_file_path: str,
         dict_processor=None,
+        types=None,
     ):
         """Loads the table_name table, Since some of the input data can be over a gibibyte,
         the load reads in chunks of data and inserts them sequentially. The chunk size is
-        determined by INSERT_ROW_COUNT in this file.
+        determined by _load_chunk_size.
         fieldnames is the list of expected values in the header row of the csv file being read.
         dict_processor is a function that takes a single dictionary and returns a single dictionary
+        types, if given, is the postgres type of each of the fieldnames; the values are then
+        parsed into python values with _csv_file_to_typed_tuples.
         """
-        with open(csv_file_path, newline="") as f:
-            has_header = csv.Sniffer().has_header(f.read(HEADER_READ_SIZE))
-            f.seek(0)
-            csv_reader = csv.DictReader(f, fieldnames=fieldnames)
-            if has_header:
-                next(csv_reader)
-            buffer = []
-            rownum = 0
-            insert_text = self._file_to_string(load_sql_file_path)
-            with self.engine.begin() as conn:
-                for row in csv_reader:
-                    buffer.append(dict_processor(row) if dict_processor else row)
-                    rownum += 1
-                    if rownum == INSERT_ROW_COUNT:
-                        conn.execute(text(insert_text), buffer)
-                        buffer = []
-                        rownum = 0
-                else:  # this is for/else
-                    conn.execute(text(insert_text), buffer)
+        if types is not None:
+            rows = (
+                dict(zip(fieldnames, row))
+                for row in self._csv_file_to_typed_tuples(
+                    csv_file_path, fieldnames, types
+                )
+            )
+        else:
+            rows = self._csv_file_to_dict_iter(csv_file_path, fieldnames)
+        if dict_processor:
+            rows = map(dict_processor, rows)
+        insert_text = self._load_sql(load_sql_file_path, table_name)
+        self._insert_rows_in_chunks(insert_text, rows)
 
     def _exec_select_sql(self, sql: str):
         """Returns a list of tuples that have been copied from the sqlalchemy result."""
@@ -671,6 +1680,8 @@ class PostgresqlManager(DBManager):
             password=self.config.password,
         )
         logging.debug(f"connection = {self.connection}")
+        # the compact schema's codes, by column and then value
+        self._value_codes = {}
 
     def _get_db_connection_string(self, config: FLEXValueConfig) -> str:
         user = config.user
@@ -684,226 +1695,588 @@ class PostgresqlManager(DBManager):
     def _get_truncate_prefix(self):
         return "TRUNCATE TABLE"
 
-    def process_gas_av_costs(self, gas_av_costs_path: str, truncate=False):
-        def copy_write(cur, rows):
-            with cur.copy(
-                """COPY gas_av_costs (
-                    state,
-                    utility,
-                    region,
-                    year,
-                    quarter,
-                    month,
-                    datetime,
-                    market,
-                    t_d,
-                    environment,
-                    btm_methane,
-                    total,
-                    upstream_methane,
-                    marginal_ghg,
-                    value_curve_name)
-                    FROM STDIN"""
-            ) as copy:
-                for row in rows:
-                    copy.write_row(row)
-
-        self._prepare_table("gas_av_costs", "flexvalue/sql/create_gas_av_cost.sql")
-        MAX_ROWS = 10000
-        logging.info("IN PG VERSION OF LOAD GAS AV COSTS")
-        try:
-            cur = self.connection.cursor()
-            buf = []
-            with open(gas_av_costs_path) as f:
-                reader = csv.DictReader(f)
-                for i, r in enumerate(reader):
-                    dt = datetime(
-                        year=int(r["year"]),
-                        month=int(r["month"]),
-                        day=1,
-                        hour=0,
-                        minute=0,
-                        second=0,
-                    )
-                    gac_timestamp = dt.strftime("%Y-%m-%d %H:%M:%S %Z")
-                    buf.append(
-                        [
-                            r["state"],
-                            r["utility"],
-                            r["region"],
-                            int(r["year"]),
-                            int(r["quarter"]),
-                            int(r["month"]),
-                            gac_timestamp,
-                            float(r["market"]),
-                            float(r["t_d"]),
-                            float(r["environment"]),
-                            float(r["btm_methane"]),
-                            float(r["total"]),
-                            float(r["upstream_methane"]),
-                            float(r["marginal_ghg"]),
-                            r["value_curve_name"],
-                        ]
-                    )
-                    if len(buf) == MAX_ROWS:
-                        copy_write(cur, buf)
-                        buf = []
-                else:
-                    copy_write(cur, buf)
-            self.connection.commit()
-        except Exception as e:
-            logging.error(f"Error loading the gas avoided costs: {e}")
-
-    def process_elec_av_costs(self, elec_av_costs_path):
-        def copy_write(cur, rows):
-            with cur.copy(
-                """COPY elec_av_costs (
-                    state,
-                    utility,
-                    region,
-                    datetime,
-                    year,
-                    quarter,
-                    month,
-                    hour_of_day,
-                    hour_of_year,
-                    energy,
-                    losses,
-                    ancillary_services,
-                    capacity,
-                    transmission,
-                    distribution,
-                    cap_and_trade,
-                    ghg_adder,
-                    ghg_rebalancing,
-                    methane_leakage,
-                    total,
-                    marginal_ghg,
-                    ghg_adder_rebalancing,
-                    value_curve_name)
-                    FROM STDIN"""
-            ) as copy:
-                for row in rows:
-                    copy.write_row(row)
+    def _build_indexes(self, table_name: str):
+        """With create_indexes_concurrently, the indexes are built with
+        CREATE INDEX CONCURRENTLY, which doesn't block reads of the table
+        while it runs, but can't run inside a transaction."""
+        if not self.config.create_indexes_concurrently:
+            super()._build_indexes(table_name)
+            return
+        if self._partition_levels(table_name):
+            logging.info(
+                f"{table_name} is partitioned, so its indexes can't be built concurrently."
+            )
+            super()._build_indexes(table_name)
+            return
+        with self.engine.connect().execution_options(
+            isolation_level="AUTOCOMMIT"
+        ) as conn:
+            for index_filepath in self._table_indexes(table_name).values():
+                sql = re.sub(
+                    r"^CREATE INDEX",
+                    "CREATE INDEX CONCURRENTLY",
+                    self._file_to_string(index_filepath),
+                    flags=re.MULTILINE,
+                )
+                conn.execute(text(sql))
 
-        self._prepare_table(
-            "elec_av_costs",
-            "flexvalue/sql/create_elec_av_cost.sql",
-            # index_filepaths=["flexvalue/sql/elec_av_costs_index.sql"]
+    def _create_staging_table(
+        self, table_name: str, staging_table: str, create_table_sql: str
+    ):
+        """The staging table is UNLOGGED, so loading it doesn't write WAL,
+        unless it's partitioned."""
+        if self._partition_levels(table_name):
+            super()._create_staging_table(table_name, staging_table, create_table_sql)
+            return
+        super()._create_staging_table(
+            table_name,
+            staging_table,
+            create_table_sql.replace("CREATE TABLE", "CREATE UNLOGGED TABLE", 1),
         )
 
-        logging.debug("in pg version of load_elec_av_costs")
-        MAX_ROWS = 10000
+    def _swap_in_staging_table(self, table_name: str, staging_table: str):
+        """The staging table is made durable (SET LOGGED), indexed and analyzed
+        before the swap, so the swap transaction only renames things and holds
+        its lock on table_name for a moment."""
+        indexes = self._table_indexes(table_name)
+        with self.engine.begin() as conn:
+            if not self._partition_levels(table_name):
+                conn.execute(text(f"ALTER TABLE {staging_table} SET LOGGED"))
+            for index_name, index_filepath in indexes.items():
+                sql = self._retarget_sql(
+                    self._file_to_string(index_filepath),
+                    {table_name: staging_table, index_name: f"{index_name}_staging"},
+                )
+                conn.execute(text(sql))
+            conn.execute(text(f"ANALYZE {staging_table}"))
+        with self.engine.begin() as conn:
+            conn.execute(text(f"DROP TABLE IF EXISTS {table_name}"))
+            conn.execute(text(f"ALTER TABLE {staging_table} RENAME TO {table_name}"))
+            for index_name in indexes:
+                conn.execute(
+                    text(f"ALTER INDEX {index_name}_staging RENAME TO {index_name}")
+                )
+            self._rename_constraints_and_sequences(conn, table_name)
+            self._rename_partitions(conn, table_name, staging_table)
+
+    def _rename_constraints_and_sequences(self, conn, table_name: str):
+        """Gives the primary key and serial sequences of table_name, which are
+        named after the staging table it was created as, the names they'd have
+        had if it had been created as table_name, so they don't drift with
+        each staged refresh."""
+        for (constraint_name,) in conn.execute(
+            text(
+                "SELECT conname FROM pg_constraint WHERE conrelid = CAST(:table_name AS regclass) AND contype = 'p'"
+            ),
+            {"table_name": table_name},
+        ).fetchall():
+            conn.execute(
+                text(
+                    f"ALTER TABLE {table_name} RENAME CONSTRAINT {constraint_name} TO {table_name}_pkey"
+                )
+            )
+        for sequence_name, column_name in conn.execute(
+            text(
+                """SELECT s.relname, a.attname FROM pg_depend d
+                JOIN pg_class s ON s.oid = d.objid AND s.relkind = 'S'
+                JOIN pg_attribute a ON a.attrelid = d.refobjid AND a.attnum = d.refobjsubid
+                WHERE d.refobjid = CAST(:table_name AS regclass) AND d.deptype = 'a'"""
+            ),
+            {"table_name": table_name},
+        ).fetchall():
+            conn.execute(
+                text(
+                    f"ALTER SEQUENCE {sequence_name} RENAME TO {table_name}_{column_name}_seq"
+                )
+            )
 
-        try:
-            cur = self.connection.cursor()
-            buf = []
-            with open(elec_av_costs_path) as f:
-                reader = csv.DictReader(f)
-                for i, r in enumerate(reader):
-                    eac_timestamp = datetime.strptime(
-                        r["datetime"], "%Y-%m-%d %H:%M:%S %Z"
-                    )
-                    buf.append(
-                        [
-                            r["state"],
-                            r["utility"],
-                            r["region"],
-                            eac_timestamp,
-                            r["year"],
-                            r["quarter"],
-                            r["month"],
-                            r["hour_of_day"],
-                            r["hour_of_year"],
-                            r["energy"],
-                            r["losses"],
-                            r["ancillary_services"],
-                            r["capacity"],
-                            r["transmission"],
-                            r["distribution"],
-                            r["cap_and_trade"],
-                            r["ghg_adder"],
-                            r["ghg_rebalancing"],
-                            r["methane_leakage"],
-                            float(r["total"]),
-                            r["marginal_ghg"],
-                            r["ghg_adder_rebalancing"],
-                            r["value_curve_name"],
-                        ]
+    def _rename_partitions(self, conn, table_name: str, staging_table: str):
+        """Renames the partitions of table_name, which are named after the
+        staging table it was created as, to the names they'd have had if it
+        had been created as table_name."""
+        for (partition,) in conn.execute(
+            text(
+                "SELECT CAST(CAST(relid AS regclass) AS text) FROM pg_partition_tree(CAST(:table_name AS regclass)) WHERE parentrelid IS NOT NULL"
+            ),
+            {"table_name": table_name},
+        ).fetchall():
+            if partition.startswith(staging_table):
+                conn.execute(
+                    text(
+                        f"ALTER TABLE {partition} RENAME TO {table_name}{partition[len(staging_table):]}"
                     )
-                    if len(buf) == MAX_ROWS:
-                        copy_write(cur, buf)
-                        buf = []
-                else:
-                    copy_write(cur, buf)
-            self.connection.commit()
-        except Exception as e:
-            logging.error(f"Error loading the electric avoided costs: {e}")
-
-    def process_elec_load_shape(self, elec_load_shapes_path: str):
-        def copy_write(cur, rows):
-            with cur.copy(
-                "COPY elec_load_shape (state, utility, region, quarter, month, hour_of_day, hour_of_year, load_shape_name, value) FROM STDIN"
-            ) as copy:
-                for row in rows:
-                    copy.write_row(row)
+                )
 
-        self._prepare_table(
-            "elec_load_shape",
-            "flexvalue/sql/create_elec_load_shape.sql",
-            # index_filepaths=["flexvalue/sql/elec_load_shape_index.sql"]
-        )
-        cur = self.connection.cursor()
-        # if you're concerned about RAM change this to sane number
-        MAX_ROWS = 10000
-
-        buf = []
-        with open(elec_load_shapes_path) as f:
-            # this probably escapes fine but a csv reader is a safer bet
-            columns = f.readline().split(",")
-            load_shape_names = [
-                c.strip()
-                for c in columns
-                if columns.index(c) > columns.index("hour_of_year")
+    def _partition_levels(self, table_name: str):
+        """The (strategy, column) partition levels of table_name, or of the
+        table it's standing in for, outermost first; empty unless partition_by
+        is set and table_name is in PARTITION_LEVELS."""
+        if not self.config.partition_by:
+            return []
+        live_tables = {
+            staging: table for table, staging in self._staging_tables.items()
+        }
+        levels = [
+            (strategy, column or self.config.partition_by)
+            for strategy, column in PARTITION_LEVELS.get(
+                live_tables.get(table_name, table_name), []
+            )
+        ]
+        if self.config.compact_schema:
+            # the compact tables hold codes rather than utility names
+            levels = [
+                (strategy, f"{column}_code" if column in DICTIONARY_COLUMNS else column)
+                for strategy, column in levels
             ]
+        return levels
+
+    def _table_indexes(self, table_name: str):
+        """The calculation indexes are covering indexes here, and the compact
+        tables' indexes are on their code columns."""
+        replacements = dict(POSTGRES_CALCULATION_INDEXES)
+        if self.config.compact_schema:
+            replacements.update(COMPACT_INDEXES)
+        return {
+            index_name: replacements.get(index_filepath, index_filepath)
+            for index_name, index_filepath in super()._table_indexes(
+                table_name
+            ).items()
+        }
 
-            f.seek(0)
-            reader = csv.DictReader(f)
-            for r in reader:
-                for load_shape in load_shape_names:
-                    buf.append(
-                        (
-                            r["state"].upper(),
-                            r["utility"].upper(),
-                            r["region"].upper(),
-                            int(r["quarter"]),
-                            int(r["month"]),
-                            int(r["hour_of_day"]),
-                            int(r["hour_of_year"]),
-                            load_shape.upper(),
-                            float(r[load_shape]),
-                        )
+    def _create_table_sql(self, table_name: str, sql_filepath: str):
+        """With compact_schema, the tables in COMPACT_TABLES are created from
+        their compact CREATE TABLE statements, and the code tables they use
+        are created if they don't exist. With partition_by, the tables in
+        PARTITION_LEVELS are created as partitioned tables without their serial
+        pk, which isn't used and, as a primary key, would have to include the
+        partition columns."""
+        if self.config.compact_schema and table_name in COMPACT_TABLES:
+            self._prepare_value_code_tables()
+            sql_filepath = COMPACT_TABLES[table_name]
+        sql = super()._create_table_sql(table_name, sql_filepath)
+        levels = self._partition_levels(table_name)
+        if not levels:
+            return sql
+        strategy, column = levels[0]
+        sql = re.sub(r"\s*pk SERIAL PRIMARY KEY,", "", sql)
+        return f"{sql.rstrip().rstrip(';')} PARTITION BY {strategy} ({column});"
+
+    def _prepare_partitions(self, conn, table_name: str, source_table: str):
+        with conn.connection.driver_connection.cursor() as cur:
+            self._create_partitions(cur, table_name, source_table)
+
+    def _create_partitions(self, cur, table_name: str, source_table: str):
+        """Creates, with the psycopg cursor cur, the partitions (and
+        sub-partitions) of table_name that the rows of source_table need and
+        that don't exist yet. LIST partitions hold one value, and are named
+        after it where that name is free, and RANGE partitions one year; rows
+        with a null partition column go to a DEFAULT partition. Existing
+        partitions are looked up by their bounds, since different values can
+        have the same name."""
+        levels = self._partition_levels(table_name)
+        if not levels:
+            return
+        columns = ", ".join(column for _, column in levels)
+        existing = {}
+        for keys in cur.execute(
+            f"SELECT DISTINCT {columns} FROM {source_table}"
+        ).fetchall():
+            parent = table_name
+            for level, ((strategy, _), key) in enumerate(zip(levels, keys)):
+                if parent not in existing:
+                    existing[parent] = self._existing_partitions(cur, parent)
+                if key is None:
+                    suffix, bounds = "default", "DEFAULT"
+                    bound_values = ("DEFAULT", ())
+                elif strategy == "RANGE":
+                    suffix = str(int(key))
+                    bounds = f"FOR VALUES FROM ({int(key)}) TO ({int(key) + 1})"
+                    bound_values = ("FROM", (str(int(key)), str(int(key) + 1)))
+                else:
+                    suffix = re.sub("[^a-z0-9]+", "_", str(key).lower()) or "blank"
+                    bounds = f"FOR VALUES IN ({pg_sql.Literal(key).as_string(cur)})"
+                    bound_values = ("IN", (str(key),))
+                partition = existing[parent].get(bound_values)
+                if partition is None:
+                    partition = self._partition_name(cur, parent, suffix, key)
+                    if level + 1 < len(levels):
+                        bounds += " PARTITION BY {} ({})".format(*levels[level + 1])
+                    cur.execute(
+                        f"CREATE TABLE {partition} PARTITION OF {parent} {bounds}"
                     )
-                if len(buf) >= MAX_ROWS:
-                    copy_write(cur, buf)
-                    buf = []
-            else:
-                copy_write(cur, buf)
-        self.connection.commit()
+                    existing[parent][bound_values] = partition
+                parent = partition
+
+    def _existing_partitions(self, cur, parent: str):
+        """The partitions of parent, by their _partition_bound_values."""
+        return {
+            _partition_bound_values(bound): partition
+            for partition, bound in cur.execute(
+                "SELECT CAST(CAST(c.oid AS regclass) AS text), pg_get_expr(c.relpartbound, c.oid) FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid WHERE i.inhparent = CAST(%s AS regclass)",
+                [parent],
+            ).fetchall()
+        }
 
-    def process_metered_load_shape(self, metered_load_shape_path: str):
-        """Note this has to be run after process_project_info, as it depends
-        on the utility for each project having been loaded"""
+    def _partition_name(self, cur, parent: str, suffix: str, key):
+        """parent_suffix, unless that's taken or longer than postgres allows
+        for an identifier, in which case it's cut short and a hash of parent
+        and key is added to it."""
+        partition = f"{parent}_{suffix}"
+        if (
+            len(partition.encode()) <= MAX_IDENTIFIER_LENGTH
+            and cur.execute("SELECT to_regclass(%s)", [partition]).fetchone()[0]
+            is None
+        ):
+            return partition
+        digest = hashlib.sha1(f"{parent}\0{key}".encode()).hexdigest()[:8]
+        prefix = partition.encode()[: MAX_IDENTIFIER_LENGTH - len(digest) - 1]
+        return f"{prefix.decode(errors='ignore')}_{digest}"
+
+    def _prepare_shared_tables(self):
+        """The compact schema's code tables are shared by its tables."""
+        super()._prepare_shared_tables()
+        if self.config.compact_schema:
+            self._prepare_value_code_tables()
+
+    def _prepare_value_code_tables(self):
+        for column in DICTIONARY_COLUMNS:
+            self._prepare_table(
+                f"{column}_codes", f"flexvalue/sql/create_{column}_codes.sql"
+            )
 
-        def copy_write(cur, rows):
-            with cur.copy(
-                "COPY elec_load_shape (hour_of_year, utility, load_shape_name, value) FROM STDIN"
-            ) as copy:
-                for row in rows:
-                    copy.write_row(row)
+    def _encode_compact_columns(self, table_name: str, columns, rows, types=None):
+        """Adapts the columns, rows and types of a COPY into table_name to the
+        compact schema, if table_name has it: the DICTIONARY_COLUMNS values
+        are replaced by their codes (see _value_code), in their _code columns,
+        and the SMALLINT columns are sent as int2."""
+        table_columns = {
+            column["name"]: column["type"]
+            for column in inspect(self.engine).get_columns(table_name)
+        }
+        encoded = [
+            column in DICTIONARY_COLUMNS and f"{column}_code" in table_columns
+            for column in columns
+        ]
+        if not any(encoded):
+            return columns, rows, types
+        columns = [
+            f"{column}_code" if encode else column
+            for column, encode in zip(columns, encoded)
+        ]
+        if types is not None:
+            types = [
+                "int2"
+                if isinstance(table_columns.get(column), sqlalchemy.SmallInteger)
+                else type_name
+                for column, type_name in zip(columns, types)
+            ]
+        dictionaries = [
+            column[: -len("_code")] if encode else None
+            for column, encode in zip(columns, encoded)
+        ]
+        rows = (
+            [
+                self._value_code(dictionary, value) if dictionary else value
+                for dictionary, value in zip(dictionaries, row)
+            ]
+            for row in rows
+        )
+        return columns, rows, types
+
+    def _value_code(self, column: str, value):
+        """The SMALLINT code of value in the {column}_codes table, which value
+        is added to if it isn't there yet. Codes are cached, so there's a round
+        trip per distinct value."""
+        if value is None:
+            return None
+        codes = self._value_codes.setdefault(column, {})
+        if value not in codes:
+            with self.engine.begin() as conn:
+                conn.execute(
+                    text(
+                        f"INSERT INTO {column}_codes (value) VALUES (:value) ON CONFLICT (value) DO NOTHING"
+                    ),
+                    {"value": value},
+                )
+                codes[value] = conn.execute(
+                    text(f"SELECT code FROM {column}_codes WHERE value = :value"),
+                    {"value": value},
+                ).scalar()
+        return codes[value]
+
+    def _copy_rows(self, table_name: str, columns, rows, types=None):
+        """COPYs rows (an iterable of sequences whose values are in the same
+        order as columns) into table_name, then commits. The rows are streamed
+        to the server, so memory use doesn't depend on how many there are.
+        If types (the postgres type name of each column) is given, the binary
+        COPY format is used when psycopg supports it; the values must then
+        already be of the matching python types (int, float, datetime, str).
+        """
+        if self.config.compact_schema:
+            columns, rows, types = self._encode_compact_columns(
+                table_name, columns, rows, types
+            )
+        binary = types is not None and BINARY_COPY_SUPPORTED
+        # the partitions a partitioned table needs aren't known until the rows
+        # are read, so they're COPYed into a temporary table first
+        partitioned = bool(self._partition_levels(table_name))
+        copy_table = f"{table_name}_rows" if partitioned else table_name
+        sql = f"COPY {copy_table} ({', '.join(columns)}) FROM STDIN"
+        if binary:
+            sql += " (FORMAT BINARY)"
+        try:
+            with self.connection.cursor() as cur:
+                if partitioned:
+                    cur.execute(
+                        f"CREATE TEMPORARY TABLE {copy_table} (LIKE {table_name} INCLUDING DEFAULTS) ON COMMIT DROP"
+                    )
+                with cur.copy(sql) as copy:
+                    if binary:
+                        copy.set_types(types)
+                    for row in rows:
+                        copy.write_row(row)
+                if partitioned:
+                    self._create_partitions(cur, table_name, copy_table)
+                    cur.execute(
+                        f"INSERT INTO {table_name} ({', '.join(columns)}) SELECT {', '.join(columns)} FROM {copy_table}"
+                    )
+            self.connection.commit()
+        except Exception:
+            self.connection.rollback()
+            raise
+
+    def _load_csv_file(
+        self,
+        csv_file_path: str,
+        table_name: str,
+        fieldnames,
+        load_sql_file_path: str,
+        dict_processor=None,
+        types=None,
+    ):
+        """load_sql_file_path isn't needed for postgresql; the rows are COPYed
+        (in text format) into the columns named by the keys of the first row.
+        If types is given and there is no dict_processor, the typed values are
+        COPYed into the fieldnames columns in binary format instead."""
+        if types is not None and dict_processor is None:
+            self._copy_rows(
+                self._target_table(table_name),
+                fieldnames,
+                self._csv_file_to_typed_tuples(csv_file_path, fieldnames, types),
+                types=types,
+            )
+            return
+        rows = self._csv_file_to_dict_iter(csv_file_path, fieldnames)
+        if dict_processor:
+            rows = map(dict_processor, rows)
+        first_row = next(rows, None)
+        if first_row is None:
+            return
+        columns = list(first_row.keys())
+        self._copy_rows(
+            self._target_table(table_name),
+            columns,
+            (
+                [None if row[column] == "" else row[column] for column in columns]
+                for row in chain([first_row], rows)
+            ),
+        )
+
+    def process_gas_av_costs(self, gas_av_costs_path: str, truncate=False):
+        self._prepare_table(
+            "gas_av_costs", "flexvalue/sql/create_gas_av_cost.sql", truncate=truncate
+        )
+        logging.debug("in pg version of process_gas_av_costs")
+        try:
+            self._copy_csv_file(
+                gas_av_costs_path,
+                self._target_table("gas_av_costs"),
+                "_copy_gas_av_costs",
+            )
+        except Exception as e:
+            logging.error(f"Error loading the gas avoided costs: {e}")
+            raise FLEXValueException(
+                f"Couldn't load the gas avoided costs from {gas_av_costs_path}: {e}"
+            ) from e
+
+    def _copy_gas_av_costs(
+        self, gas_av_costs_path: str, table_name: str, byte_range=None
+    ):
+        """COPYs the gas avoided costs file (or just the rows in byte_range)
+        into table_name, adding the datetime column."""
+        # the datetime column is derived from year and month, after month
+        datetime_index = GAS_AV_COSTS_FIELDS.index("month") + 1
+        rows = (
+            (
+                *row[:datetime_index],
+                datetime(year=row[3], month=row[5], day=1),
+                *row[datetime_index:],
+            )
+            for row in self._csv_file_to_typed_tuples(
+                gas_av_costs_path,
+                GAS_AV_COSTS_FIELDS,
+                GAS_AV_COSTS_COPY_TYPES,
+                byte_range=byte_range,
+            )
+        )
+        self._copy_rows(
+            table_name,
+            GAS_AV_COSTS_FIELDS[:datetime_index]
+            + ["datetime"]
+            + GAS_AV_COSTS_FIELDS[datetime_index:],
+            rows,
+            types=(
+                GAS_AV_COSTS_COPY_TYPES[:datetime_index]
+                + ["timestamp"]
+                + GAS_AV_COSTS_COPY_TYPES[datetime_index:]
+            ),
+        )
+
+    def process_elec_av_costs(self, elec_av_costs_path: str, truncate=False):
+        self._prepare_table(
+            "elec_av_costs",
+            "flexvalue/sql/create_elec_av_cost.sql",
+            truncate=truncate,
+        )
+        logging.debug("in pg version of process_elec_av_costs")
+        try:
+            self._copy_csv_file(
+                elec_av_costs_path,
+                self._target_table("elec_av_costs"),
+                "_copy_elec_av_costs",
+            )
+        except Exception as e:
+            logging.error(f"Error loading the electric avoided costs: {e}")
+            raise FLEXValueException(
+                f"Couldn't load the electric avoided costs from {elec_av_costs_path}: {e}"
+            ) from e
+
+    def _copy_elec_av_costs(
+        self, elec_av_costs_path: str, table_name: str, byte_range=None
+    ):
+        """COPYs the electric avoided costs file (or just the rows in
+        byte_range) into table_name."""
+        self._copy_rows(
+            table_name,
+            ELEC_AVOIDED_COSTS_FIELDS,
+            self._typed_elec_av_costs_rows(elec_av_costs_path, byte_range),
+            types=ELEC_AV_COSTS_COPY_TYPES,
+        )
+
+    def _typed_elec_av_costs_rows(self, elec_av_costs_path: str, byte_range=None):
+        """Generator that yields the rows of the electric avoided costs file as
+        tuples of python values matching ELEC_AV_COSTS_COPY_TYPES, in the order
+        of ELEC_AVOIDED_COSTS_FIELDS, so they can be sent with binary COPY."""
+        return self._csv_file_to_typed_tuples(
+            elec_av_costs_path,
+            ELEC_AVOIDED_COSTS_FIELDS,
+            ELEC_AV_COSTS_COPY_TYPES,
+            byte_range=byte_range,
+        )
+
+    def _copy_csv_file(self, csv_file_path: str, table_name: str, copy_method: str):
+        """COPYs csv_file_path into table_name with the copy_method method, which
+        takes the file path, a table name and an optional partitions.ByteRange.
+        If copy_partitions is more than 1, the file is split into that many
+        line-aligned byte ranges, each of which is parsed and COPYed by its own
+        worker process, over its own connection, into an unlogged staging
+        table. The rows are then moved into table_name in a single transaction,
+        so either all of them are loaded or none are."""
+        num_partitions = self.config.copy_partitions or 1
+        byte_ranges = (
+            partitions.line_aligned_ranges(
+                csv_file_path, num_partitions, self._has_header(csv_file_path)
+            )
+            if num_partitions > 1
+            else []
+        )
+        if len(byte_ranges) <= 1:
+            getattr(self, copy_method)(csv_file_path, table_name)
+            return
+        staging_table = f"{table_name}_partitioned_load"
+        with self.engine.begin() as conn:
+            conn.execute(text(f"DROP TABLE IF EXISTS {staging_table}"))
+            conn.execute(
+                text(
+                    f"CREATE UNLOGGED TABLE {staging_table} (LIKE {table_name} INCLUDING DEFAULTS)"
+                )
+            )
+        try:
+            # spawn rather than fork, so workers don't share this connection
+            with ProcessPoolExecutor(
+                max_workers=len(byte_ranges),
+                mp_context=multiprocessing.get_context("spawn"),
+            ) as executor:
+                futures = [
+                    executor.submit(
+                        _copy_partition,
+                        self.config,
+                        copy_method,
+                        csv_file_path,
+                        staging_table,
+                        byte_range,
+                    )
+                    for byte_range in byte_ranges
+                ]
+                for future in futures:
+                    future.result()
+            with self.engine.begin() as conn:
+                self._prepare_partitions(conn, table_name, staging_table)
+                conn.execute(
+                    text(f"INSERT INTO {table_name} SELECT * FROM {staging_table}")
+                )
+        finally:
+            with self.engine.begin() as conn:
+                conn.execute(text(f"DROP TABLE IF EXISTS {staging_table}"))
+
+    def process_elec_load_shape(self, elec_load_shapes_path: str, truncate=False):
+        self._prepare_table(
+            "elec_load_shape",
+            "flexvalue/sql/create_elec_load_shape.sql",
+            truncate=truncate,
+        )
+        rows = self._wide_csv_file_to_long_tuples(
+            elec_load_shapes_path,
+            ELEC_LOAD_SHAPE_FIXED_FIELDS,
+            "load_shape_name",
+            fields_to_upper=["state", "utility", "region", "load_shape_name"],
+            types=ELEC_LOAD_SHAPE_COPY_TYPES,
+        )
+        self._copy_rows(
+            self._target_table("elec_load_shape"),
+            ELEC_LOAD_SHAPE_FIXED_FIELDS + ["load_shape_name", "value"],
+            rows,
+            types=ELEC_LOAD_SHAPE_COPY_TYPES,
+        )
+
+    def process_therms_profile(self, therms_profiles_path: str, truncate: bool = False):
+        self._prepare_table(
+            "therms_profile",
+            "flexvalue/sql/create_therms_profile.sql",
+            truncate=truncate,
+        )
+        rows = self._wide_csv_file_to_long_tuples(
+            therms_profiles_path,
+            THERMS_PROFILE_FIXED_FIELDS,
+            "profile_name",
+            fields_to_upper=["state", "utility", "region", "profile_name"],
+            types=THERMS_PROFILE_COPY_TYPES,
+        )
+        self._copy_rows(
+            self._target_table("therms_profile"),
+            THERMS_PROFILE_FIXED_FIELDS + ["profile_name", "value"],
+            rows,
+            types=THERMS_PROFILE_COPY_TYPES,
+        )
+
+    def process_metered_load_shape(self, metered_load_shape_path: str):
+        """Note this has to be run after process_project_info, as it depends
+        on the utility for each project having been loaded"""
 
         # get the list of load shape names we care about from project_info
         metered_load_shape_query = "SELECT distinct utility, load_shape from project_info where load_shape not in (select distinct load_shape_name from elec_load_shape);"
+        if self.config.compact_schema:
+            metered_load_shape_query = "SELECT distinct utility, load_shape from project_info where load_shape not in (select value from load_shape_name_codes where code in (select distinct load_shape_name_code from elec_load_shape));"
         load_shapes_utils = defaultdict(list)
         with self.engine.begin() as conn:
             result = conn.execute(text(metered_load_shape_query))
@@ -911,84 +2284,133 @@ class PostgresqlManager(DBManager):
                 load_shapes_utils[row[1].upper()].append(row[0])
 
         # get the load shapes in this file
-        with open(metered_load_shape_path) as f:
-            # this probably escapes fine but a csv reader is a safer bet
-            columns = [x.strip() for x in f.readline().split(",")]
-            metered_load_shapes = [
-                c.strip()
-                for c in columns
-                if columns.index(c) > columns.index("hour_of_year")
-            ]
+        with open(metered_load_shape_path, newline="") as f:
+            columns = [x.strip() for x in next(csv.reader(f))]
+            metered_load_shapes = columns[columns.index("hour_of_year") + 1 :]
 
-        cur = self.connection.cursor()
-        MAX_ROWS = 10000
-
-        buf = []
         # This is so deeply nested because the project info could have more
         # than one utility per a given metered load shape.
-        with open(metered_load_shape_path) as f:
-            reader = csv.DictReader(f)
-            for row in reader:
+        def metered_rows():
+            for row in self._csv_file_to_dict_iter(metered_load_shape_path):
                 for load_shape in metered_load_shapes:
-                    try:
-                        utils = load_shapes_utils[load_shape.upper()]
-                    except KeyError:
-                        # If load shape not in load_shapes_utils, don't load it
-                        continue
-                    for util in utils:
-                        buf.append(
-                            [
-                                int(row["hour_of_year"]),
-                                util.upper(),
-                                load_shape.upper(),
-                                float(row[load_shape]),
-                            ]
+                    # If load shape not in load_shapes_utils, don't load it
+                    for util in load_shapes_utils.get(load_shape.upper(), []):
+                        yield (
+                            int(row["hour_of_year"]),
+                            util.upper(),
+                            load_shape.upper(),
+                            float(row[load_shape]),
                         )
-                if len(buf) >= MAX_ROWS:
-                    copy_write(cur, buf)
-                    buf = []
-            else:
-                copy_write(cur, buf)
-        self.connection.commit()
 
-    def _load_project_info_data(self, insert_text, project_info_dicts):
-        """insert_text isn't needed for postgresql"""
+        self._copy_rows(
+            "elec_load_shape",
+            ["hour_of_year", "utility", "load_shape_name", "value"],
+            metered_rows(),
+            types=["int4", "text", "text", "float8"],
+        )
 
-        def copy_write(cur, rows):
-            with cur.copy(
-                "COPY project_info (id, state, utility, region, mwh_savings, therms_savings, load_shape, therms_profile, start_year, start_quarter, start_date, end_date, units, eul, ntg, discount_rate, admin_cost, measure_cost, incentive_cost, value_curve_name) FROM STDIN"
-            ) as copy:
-                for row in rows:
-                    copy.write_row(row)
+    def _create_discount_factors(self, conn):
+        """With compact_schema, the code tables are analyzed too, before every
+        calculation: they're too small for autovacuum to ever analyze them,
+        and without statistics the planner badly misjudges the calculation's
+        joins on the codes."""
+        conn.execute(
+            text(
+                f"CREATE TEMPORARY TABLE discount_factors ON COMMIT DROP AS {self._get_discount_factors_sql()}"
+            )
+        )
+        conn.execute(text("ANALYZE discount_factors"))
+        if self.config.compact_schema:
+            for column in DICTIONARY_COLUMNS:
+                conn.execute(text(f"ANALYZE {column}_codes"))
 
-        rows = [
-            (
-                x["id"],
-                x["state"],
-                x["utility"],
-                x["region"],
-                x["mwh_savings"],
-                x["therms_savings"],
-                x["load_shape"],
-                x["therms_profile"],
-                x["start_year"],
-                x["start_quarter"],
-                x["start_date"],
-                x["end_date"],
-                x["units"],
-                x["eul"],
-                x["ntg"],
-                x["discount_rate"],
-                x["admin_cost"],
-                x["measure_cost"],
-                x["incentive_cost"],
-                x["value_curve_name"],
-            )
-            for x in project_info_dicts
+    def _run_calc(self, sql):
+        """Without output tables, csv results are written to output_file with
+        COPY ... TO STDOUT, whose csv (with a header row) is streamed straight
+        into the file, so the rows are never formatted in python. The FLOAT
+        columns are formatted like the other databases' csv output (see
+        _python_float_sql)."""
+        if (
+            self.config.output_table
+            or self.config.electric_output_table
+            or self.config.gas_output_table
+            or not self.config.output_file
+            or self.config.result_format() != "csv"
+        ):
+            super()._run_calc(sql)
+            return
+        sql = sql.strip().rstrip(";")
+        with self.engine.begin() as conn:
+            self._create_discount_factors(conn)
+            with conn.connection.driver_connection.cursor() as cur:
+                # the result's columns and types, without running it
+                cur.execute(f"SELECT * FROM ({sql}) AS results LIMIT 0")
+                types = self.connection.adapters.types
+                columns = [
+                    self._python_float_sql(_quote_identifier(column.name))
+                    if getattr(types.get(column.type_code), "name", None) == "float8"
+                    else _quote_identifier(column.name)
+                    for column in cur.description
+                ]
+                copy_sql = f"COPY (SELECT {', '.join(columns)} FROM ({sql}) AS results) TO STDOUT (FORMAT csv, HEADER)"
+                with open(self.config.output_file, "wb") as outfile:
+                    with cur.copy(copy_sql) as copy:
+                        for data in copy:
+                            outfile.write(data)
+
+    def _python_float_sql(self, column: str):
+        """column, a FLOAT, as the text python's csv writer writes for it:
+        postgres writes infinity as Infinity and whole numbers without a
+        fractional part, where python writes inf and 0.0. (Whole numbers of
+        1e15 or more are still written in exponent notation.)"""
+        return f"""CASE
+            WHEN {column} = FLOAT 'inf' THEN 'inf'
+            WHEN {column} = FLOAT '-inf' THEN '-inf'
+            WHEN {column} = FLOAT 'nan' THEN 'nan'
+            WHEN {column} = TRUNC({column}) AND ABS({column}) < 1e15 THEN CAST({column} AS TEXT) || '.0'
+            ELSE CAST({column} AS TEXT)
+        END AS {column}"""
+
+    def _result_types(self, conn, sql):
+        """The result's types, from a description of it that doesn't run it."""
+        result = conn.execute(
+            text(f"SELECT * FROM ({sql.strip().rstrip(';')}) AS results LIMIT 0")
+        )
+        types = self.connection.adapters.types
+        return [
+            getattr(types.get(column.type_code), "name", None)
+            for column in result.cursor.description
+        ]
+
+    def _load_project_info_data(self, insert_text, project_info_dicts):
+        """insert_text isn't needed for postgresql"""
+        columns = [
+            "id",
+            "state",
+            "utility",
+            "region",
+            "mwh_savings",
+            "therms_savings",
+            "load_shape",
+            "therms_profile",
+            "start_year",
+            "start_quarter",
+            "start_date",
+            "end_date",
+            "units",
+            "eul",
+            "ntg",
+            "discount_rate",
+            "admin_cost",
+            "measure_cost",
+            "incentive_cost",
+            "value_curve_name",
         ]
-        cursor = self.connection.cursor()
-        copy_write(cursor, rows)
-        self.connection.commit()
+        self._copy_rows(
+            self._target_table("project_info"),
+            columns,
+            ([x[column] for column in columns] for x in project_info_dicts),
+        )
 
 
 class SqliteManager(DBManager):
@@ -1004,11 +2426,350 @@ class SqliteManager(DBManager):
         """sqlite doesn't support TRUNCATE"""
         return "DELETE FROM"
 
+    def _max_load_workers(self):
+        """sqlite only allows one writer at a time, so loads always run sequentially"""
+        return 1
+
     def _get_db_connection_string(self, config: FLEXValueConfig) -> str:
         database = config.database
         conn_str = f"sqlite+pysqlite://{database}"
         return conn_str
 
+    def _result_types(self, conn, sql):
+        """sqlite doesn't report the types of a query's columns, but a
+        temporary view of it has the declared types of the table columns it
+        selects, whose affinities give their types. Computed columns don't
+        have one."""
+        conn.execute(text("DROP VIEW IF EXISTS temp.flexvalue_results"))
+        conn.execute(
+            text(
+                f"CREATE TEMPORARY VIEW flexvalue_results AS {sql.strip().rstrip(';')}"
+            )
+        )
+        declared_types = [
+            row[2].upper()
+            for row in conn.execute(text("PRAGMA temp.table_info(flexvalue_results)"))
+        ]
+        conn.execute(text("DROP VIEW temp.flexvalue_results"))
+        return [
+            next(
+                (
+                    type_name
+                    for substrings, type_name in SQLITE_AFFINITY_TYPES
+                    if any(substring in declared_type for substring in substrings)
+                ),
+                None,
+            )
+            for declared_type in declared_types
+        ]
+
+
+def _partition_bound_values(bound: str):
+    """The kind ("IN", "FROM" or "DEFAULT") and values of a partition bound
+    as pg_get_expr shows it, which quotes the values of some column types and
+    not others, so that ("IN", ("PG&E",)) is read from "FOR VALUES IN
+    ('PG&E')" and ("FROM", ("2021", "2022")) from "FOR VALUES FROM (2021) TO
+    (2022)"."""
+    if bound == "DEFAULT":
+        return ("DEFAULT", ())
+    kind, values = re.match(r"FOR VALUES (\w+) (.*)", bound, re.DOTALL).groups()
+    return (
+        kind,
+        tuple(
+            bare or quoted.replace("''", "'")
+            for quoted, bare in PARTITION_BOUND_VALUE.findall(values)
+            if bare != "TO"
+        ),
+    )
+
+
+def _quote_identifier(name: str):
+    return '"' + name.replace('"', '""') + '"'
+
+
+class DuckDBManager(DBManager):
+    """Runs FLEXvalue on a local DuckDB database file (the database setting).
+    The csv files are read by DuckDB's parallel csv reader and cast, upper
+    cased and unpivoted in SQL, so no rows pass through python, and the
+    calculation's results are written to output_file with COPY."""
+
+    def __init__(self, fv_config: FLEXValueConfig):
+        super().__init__(fv_config)
+        self.template_env = Environment(
+            loader=PackageLoader("flexvalue", "templates"),
+            autoescape=select_autoescape(),
+        )
+        self.config = fv_config
+
+    def _get_db_connection_string(self, config: FLEXValueConfig) -> str:
+        return f"duckdb:///{config.database}"
+
+    def _get_db_engine(self, config: FLEXValueConfig) -> Engine:
+        try:
+            return super()._get_db_engine(config)
+        except sqlalchemy.exc.NoSuchModuleError:
+            raise FLEXValueException(
+                "The duckdb database_type requires duckdb and duckdb-engine. Install them with `pip install flexvalue[duckdb]`."
+            )
+
+    def _get_truncate_prefix(self):
+        return "TRUNCATE TABLE"
+
+    def _max_load_workers(self):
+        """Only one process can write to a DuckDB database file, so loads run
+        one at a time; each one is read by all of DuckDB's threads."""
+        return 1
+
+    def _create_table_sql(self, table_name: str, sql_filepath: str):
+        """DuckDB has no SERIAL type, so the tables are created without the
+        pk column, which nothing reads. DuckDB's FLOAT is single precision,
+        so FLOAT columns are created as DOUBLE, like PostgreSQL's FLOAT."""
+        sql = re.sub(
+            r"^\s*pk SERIAL PRIMARY KEY,\n",
+            "",
+            super()._create_table_sql(table_name, sql_filepath),
+            flags=re.MULTILINE,
+        )
+        return re.sub(r"\bFLOAT\b", "DOUBLE", sql)
+
+    def _table_indexes(self, table_name: str):
+        """DuckDB joins with hash joins, which don't use indexes, so the
+        CALCULATION_INDEXES aren't built; they would only slow down loads."""
+        return dict(TABLE_INDEXES.get(table_name, {}))
+
+    def _normalize_name_case(self):
+        # DuckDBManager has always upper-cased the names it loads.
+        pass
+
+    def _read_csv_sql(self, csv_file_path: str, header: bool = True, names=None):
+        """A read_csv call that reads every column of csv_file_path as text,
+        naming the first ones names if given."""
+        path = csv_file_path.replace("'", "''")
+        names_sql = (
+            f", names = [{', '.join(repr(name) for name in names)}]" if names else ""
+        )
+        return f"read_csv('{path}', header = {str(header).lower()}{names_sql}, all_varchar = true)"
+
+    def _cast_sql(self, column: str, type_name: str, upper: bool = False):
+        """The expression that converts the text column (a quoted identifier)
+        to type_name, a postgres type as in ELEC_AV_COSTS_COPY_TYPES."""
+        if type_name == "timestamp":
+            # drop the timezone name, as in "2021-01-01 00:00:00 UTC"
+            return f"strptime(left({column}, 19), '%Y-%m-%d %H:%M:%S')"
+        if upper:
+            return f"UPPER({column})"
+        return f"CAST({column} AS {DUCKDB_TYPES[type_name]})"
+
+    def _csv_header(self, csv_file_path: str):
+        with open(csv_file_path, newline="") as f:
+            return next(csv.reader(f))
+
+    def _insert_csv_file(
+        self,
+        csv_file_path: str,
+        table_name: str,
+        fieldnames,
+        types,
+        derived_columns=None,
+    ):
+        """Inserts the fieldnames columns of the csv file, cast to types, into
+        table_name, along with derived_columns ({column: expression over the
+        fieldnames columns}). As in _csv_file_to_typed_tuples, the columns are
+        positional and the header row is optional."""
+        if not os.path.getsize(csv_file_path):
+            return
+        derived_columns = derived_columns or {}
+        expressions = [
+            self._cast_sql(_quote_identifier(field), type_name)
+            for field, type_name in zip(fieldnames, types)
+        ] + list(derived_columns.values())
+        with self.engine.begin() as conn:
+            conn.exec_driver_sql(
+                f"INSERT INTO {self._target_table(table_name)} ({', '.join(list(fieldnames) + list(derived_columns))}) "
+                f"SELECT {', '.join(expressions)} FROM {self._read_csv_sql(csv_file_path, self._has_header(csv_file_path), fieldnames)}"
+            )
+
+    def _insert_wide_csv_file(
+        self,
+        csv_file_path: str,
+        table_name: str,
+        fixed_fieldnames,
+        name_field: str,
+        types,
+        fields_to_upper,
+    ):
+        """Like _wide_csv_file_to_long_tuples, but unpivots the file into
+        table_name with UNPIVOT. The fixed columns are the first ones, whatever
+        their names in the header row."""
+        header = self._csv_header(csv_file_path)
+        num_fixed = len(fixed_fieldnames)
+        expressions = [
+            self._cast_sql(
+                _quote_identifier(column), type_name, fieldname in fields_to_upper
+            )
+            for column, fieldname, type_name in zip(
+                header[:num_fixed], fixed_fieldnames, types
+            )
+        ]
+        expressions.append(
+            "UPPER(shape_name)" if name_field in fields_to_upper else "shape_name"
+        )
+        expressions.append(self._cast_sql("shape_value", types[-1]))
+        shape_columns = ", ".join(
+            _quote_identifier(column) for column in header[num_fixed:]
+        )
+        with self.engine.begin() as conn:
+            conn.exec_driver_sql(
+                f"INSERT INTO {self._target_table(table_name)} ({', '.join(list(fixed_fieldnames) + [name_field, 'value'])}) "
+                f"SELECT {', '.join(expressions)} FROM (UNPIVOT (SELECT * FROM {self._read_csv_sql(csv_file_path)}) "
+                f"ON {shape_columns} INTO NAME shape_name VALUE shape_value)"
+            )
+
+    def process_elec_av_costs(self, elec_av_costs_path: str, truncate=False):
+        self._prepare_table(
+            "elec_av_costs",
+            "flexvalue/sql/create_elec_av_cost.sql",
+            truncate=truncate,
+        )
+        self._insert_csv_file(
+            elec_av_costs_path,
+            "elec_av_costs",
+            ELEC_AVOIDED_COSTS_FIELDS,
+            ELEC_AV_COSTS_COPY_TYPES,
+            derived_columns={"date_str": 'left("datetime", 10)'},
+        )
+
+    def process_gas_av_costs(self, gas_av_costs_path: str, truncate=False):
+        self._prepare_table(
+            "gas_av_costs", "flexvalue/sql/create_gas_av_cost.sql", truncate=truncate
+        )
+        self._insert_csv_file(
+            gas_av_costs_path,
+            "gas_av_costs",
+            GAS_AV_COSTS_FIELDS,
+            GAS_AV_COSTS_COPY_TYPES,
+            derived_columns={
+                "datetime": 'make_timestamp(CAST("year" AS BIGINT), CAST("month" AS BIGINT), 1, 0, 0, 0)'
+            },
+        )
+
+    def process_elec_load_shape(self, elec_load_shapes_path: str, truncate=False):
+        self._prepare_table(
+            "elec_load_shape",
+            "flexvalue/sql/create_elec_load_shape.sql",
+            truncate=truncate,
+        )
+        self._insert_wide_csv_file(
+            elec_load_shapes_path,
+            "elec_load_shape",
+            ELEC_LOAD_SHAPE_FIXED_FIELDS,
+            "load_shape_name",
+            ELEC_LOAD_SHAPE_COPY_TYPES,
+            fields_to_upper=["state", "utility", "region", "load_shape_name"],
+        )
+
+    def process_therms_profile(self, therms_profiles_path: str, truncate: bool = False):
+        self._prepare_table(
+            "therms_profile",
+            "flexvalue/sql/create_therms_profile.sql",
+            truncate=truncate,
+        )
+        self._insert_wide_csv_file(
+            therms_profiles_path,
+            "therms_profile",
+            THERMS_PROFILE_FIXED_FIELDS,
+            "profile_name",
+            THERMS_PROFILE_COPY_TYPES,
+            fields_to_upper=["state", "utility", "region", "profile_name"],
+        )
+
+    def process_metered_load_shape(self, metered_load_shape_path: str):
+        """Adds the metered load shapes the projects use, and that aren't in
+        elec_load_shape yet, once for each of their projects' utilities, like
+        PostgresqlManager.process_metered_load_shape. Note this has to be run
+        after process_project_info."""
+        header = self._csv_header(metered_load_shape_path)
+        hour_index = [column.strip() for column in header].index("hour_of_year")
+        shape_columns = ", ".join(
+            _quote_identifier(column) for column in header[hour_index + 1 :]
+        )
+        with self.engine.begin() as conn:
+            conn.exec_driver_sql(
+                f"""INSERT INTO elec_load_shape (hour_of_year, utility, load_shape_name, value)
+                SELECT CAST(metered.{_quote_identifier(header[hour_index])} AS INTEGER), projects.utility, projects.load_shape, CAST(metered.shape_value AS DOUBLE)
+                FROM (
+                    UNPIVOT (SELECT * FROM {self._read_csv_sql(metered_load_shape_path)})
+                    ON {shape_columns} INTO NAME shape_name VALUE shape_value
+                ) metered
+                JOIN (
+                    SELECT DISTINCT UPPER(utility) AS utility, UPPER(load_shape) AS load_shape
+                    FROM project_info
+                    WHERE load_shape NOT IN (SELECT DISTINCT load_shape_name FROM elec_load_shape)
+                ) projects ON projects.load_shape = UPPER(TRIM(metered.shape_name))"""
+            )
+
+    def process_project_info(self, project_info_path: str):
+        """Loads the project info file (whose columns are positional, and
+        whose header row is optional) with read_csv, computing start_date and
+        end_date like DBManager.process_project_info."""
+        self._prepare_table(
+            "project_info",
+            "flexvalue/sql/create_project_info.sql",
+            index_filepaths=[
+                "flexvalue/sql/project_info_index.sql",
+                "flexvalue/sql/project_info_dates_index.sql",
+            ],
+            truncate=True,
+        )
+        has_header = self._has_header(project_info_path)
+        upper_fields = ["load_shape", "therms_profile", "state", "region", "utility"]
+        names = ", ".join(f"'{field}'" for field in PROJECT_INFO_FIELDS)
+        columns = [
+            f"UPPER({field})" if field in upper_fields else field
+            for field in PROJECT_INFO_FIELDS
+        ]
+        start_month = "(CAST(start_quarter AS INTEGER) - 1) * 3 + 1"
+        with self.engine.begin() as conn:
+            conn.exec_driver_sql(
+                f"""INSERT INTO {self._target_table("project_info")} ({', '.join(PROJECT_INFO_FIELDS)}, start_date, end_date)
+                SELECT {', '.join(columns)},
+                    printf('%d-%02d-01', CAST(start_year AS INTEGER), {start_month}),
+                    printf('%d-%02d-01', CAST(start_year AS INTEGER) + CAST(eul AS INTEGER), {start_month})
+                FROM read_csv(
+                    '{project_info_path.replace("'", "''")}', header = {str(has_header).lower()},
+                    names = [{names}], all_varchar = true
+                )"""
+            )
+
+    def _run_calc(self, sql):
+        """Without output tables, csv and parquet results are written to
+        output_file with COPY (csv with a header row); arrow results are
+        written like DBManager writes them."""
+        output_format = self.config.result_format()
+        if (
+            self.config.output_table
+            or self.config.electric_output_table
+            or self.config.gas_output_table
+            or not self.config.output_file
+            or output_format == "arrow"
+        ):
+            super()._run_calc(sql)
+            return
+        path = self.config.output_file.replace("'", "''")
+        options = "FORMAT parquet" if output_format == "parquet" else "FORMAT csv, HEADER"
+        with self.engine.begin() as conn:
+            self._create_discount_factors(conn)
+            conn.exec_driver_sql(f"COPY ({sql.strip()}) TO '{path}' ({options})")
+
+    def _result_types(self, conn, sql):
+        """The result's types, from a description of it that doesn't run it."""
+        result = conn.execute(
+            text(f"SELECT * FROM ({sql.strip().rstrip(';')}) AS results LIMIT 0")
+        )
+        return [
+            DUCKDB_RESULT_TYPES.get(str(column[1])) for column in result.cursor.description
+        ]
+
 
 class BigQueryManager(DBManager):
     def __init__(self, fv_config: FLEXValueConfig):
@@ -1074,6 +2835,98 @@ class BigQueryManager(DBManager):
                     empty_tables.append(table_name)
         return empty_tables
 
+    def _load_table_data(
+        self, table_name: str, process_method: str, path: str, append=False
+    ):
+        """BigQuery tables have no indexes and are loaded with load jobs or
+        from other tables, so neither bulk_load nor staged_refresh change
+        anything"""
+        getattr(self, process_method)(path)
+
+    def _source_fingerprint(self, path: str, manifest_row=None):
+        """path is a local file or a BigQuery table here; a table's etag
+        changes whenever it does."""
+        if os.path.isfile(path):
+            return super()._source_fingerprint(path, manifest_row)
+        table = self.client.get_table(path)
+        return {
+            "source": path,
+            "content_hash": table.etag,
+            "size": table.num_bytes or 0,
+            "mtime": table.modified.timestamp(),
+        }
+
+    def _manifest_table(self):
+        return f"{self._get_target_dataset()}.load_manifest"
+
+    def _has_loaded_rows(self, table_name: str):
+        """Loads of table_name fill the configured table of the same kind."""
+        source_table = {
+            "elec_av_costs": self.config.elec_av_costs_table,
+            "gas_av_costs": self.config.gas_av_costs_table,
+            "elec_load_shape": self.config.elec_load_shape_table,
+            "therms_profile": self.config.therms_profiles_table,
+            "project_info": self.config.project_info_table,
+        }.get(table_name, table_name)
+        if not source_table or not self._table_exists(source_table):
+            return False
+        return bool(
+            list(self.client.query(f"SELECT 1 FROM {source_table} LIMIT 1").result())
+        )
+
+    def _manifest_row(self, table_name: str, load_name: str):
+        if not self._table_exists(self._manifest_table()):
+            return None
+        rows = self._run_manifest_query(
+            f"SELECT * FROM {self._manifest_table()} WHERE table_name = @table_name AND load_name = @load_name",
+            table_name=table_name,
+            load_name=load_name,
+        )
+        return dict(rows[0].items()) if rows else None
+
+    def _update_manifest(
+        self, table_name: str, load_name: str, fingerprint, append: bool
+    ):
+        if fingerprint is None and not self._table_exists(self._manifest_table()):
+            return
+        self._prepare_load_manifest()
+        if append:
+            self._run_manifest_query(
+                f"DELETE FROM {self._manifest_table()} WHERE table_name = @table_name AND load_name = @load_name",
+                table_name=table_name,
+                load_name=load_name,
+            )
+        else:
+            self._forget_loads(table_name)
+        if fingerprint is not None:
+            self._run_manifest_query(
+                f"INSERT INTO {self._manifest_table()} (table_name, load_name, source, content_hash, size, mtime, loaded_at) VALUES (@table_name, @load_name, @source, @content_hash, @size, @mtime, CURRENT_TIMESTAMP())",
+                table_name=table_name,
+                load_name=load_name,
+                **fingerprint,
+            )
+
+    def _prepare_load_manifest(self):
+        self._prepare_table(self._manifest_table(), "bq_create_load_manifest.sql")
+
+    def _forget_loads(self, table_name: str):
+        if not self._table_exists(self._manifest_table()):
+            return
+        self._run_manifest_query(
+            f"DELETE FROM {self._manifest_table()} WHERE table_name = @table_name",
+            table_name=table_name,
+        )
+
+    def _run_manifest_query(self, sql: str, **params):
+        types = {str: "STRING", int: "INT64", float: "FLOAT64"}
+        job_config = bigquery.QueryJobConfig(
+            query_parameters=[
+                bigquery.ScalarQueryParameter(name, types[type(value)], value)
+                for name, value in params.items()
+            ]
+        )
+        return list(self.client.query(sql, job_config=job_config).result())
+
     def _prepare_table(
         self,
         table_name: str,
@@ -1101,14 +2954,36 @@ class BigQueryManager(DBManager):
                 result = query_job.result()
 
     def process_elec_av_costs(self, elec_av_costs_path: str, truncate=False):
-        # We don't need to do anything with this in BQ, just use the table provided
-        pass
+        """If elec_av_costs_path is a file, loads it into
+        config.elec_av_costs_table; otherwise the table is used as it is."""
+        if os.path.isfile(elec_av_costs_path):
+            self._load_file_into_table(
+                self.config.elec_av_costs_table,
+                ELEC_AVOIDED_COSTS_FIELDS,
+                ELEC_AV_COSTS_COPY_TYPES,
+                self._csv_file_to_typed_tuples(
+                    elec_av_costs_path,
+                    ELEC_AVOIDED_COSTS_FIELDS,
+                    ELEC_AV_COSTS_COPY_TYPES,
+                ),
+            )
 
     def process_gas_av_costs(self, gas_av_costs_path: str, truncate=False):
         """Add a datetime column if none exists, and populate it. It
         will be used to join on in later calculations.
+        If gas_av_costs_path is a file, it's loaded into
+        config.gas_av_costs_table first.
         """
         logging.debug("In bq process_gas_av_costs")
+        if os.path.isfile(gas_av_costs_path):
+            self._load_file_into_table(
+                self.config.gas_av_costs_table,
+                GAS_AV_COSTS_FIELDS,
+                GAS_AV_COSTS_COPY_TYPES,
+                self._csv_file_to_typed_tuples(
+                    gas_av_costs_path, GAS_AV_COSTS_FIELDS, GAS_AV_COSTS_COPY_TYPES
+                ),
+            )
         self._ensure_datetime_column(self.config.gas_av_costs_table)
         sql = f'UPDATE {self.config.gas_av_costs_table} gac SET datetime = (DATETIME(FORMAT("%d-%d-01 00:00:00", gac.year, gac.month))) WHERE TRUE;'
         query_job = self.client.query(sql)
@@ -1152,8 +3027,114 @@ class BigQueryManager(DBManager):
         )
         copy_job.result()
 
+    def _load_file_into_table(self, table_name, fieldnames, types, rows):
+        """Replaces the contents and schema of the BigQuery table table_name
+        (which is created if it doesn't exist) with rows, tuples of the
+        fieldnames columns, whose postgres types are types. The rows are
+        written to temporary csv files of _load_chunk_size() rows, each of
+        which is loaded into the staging table table_name_staging by its own
+        load job: the first replaces it, and the rest append to it,
+        BIG_QUERY_LOAD_JOBS at a time. The staging table is then copied over
+        table_name with one copy job, so table_name is only changed if every
+        chunk was loaded, and all at once."""
+        schema = [
+            bigquery.SchemaField(field, BIG_QUERY_TYPES[type_name])
+            for field, type_name in zip(fieldnames, types)
+        ]
+        staging_table = f"{table_name}_staging"
+        chunk_files = self._csv_chunk_files(rows, self._load_chunk_size())
+        try:
+            self._run_load_job(
+                staging_table, schema, next(chunk_files), truncate=True
+            )
+            with ThreadPoolExecutor(max_workers=BIG_QUERY_LOAD_JOBS) as executor:
+                pending = set()
+                for chunk_file in chunk_files:
+                    if len(pending) == BIG_QUERY_LOAD_JOBS:
+                        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                        for future in done:
+                            future.result()
+                    pending.add(
+                        executor.submit(
+                            self._run_load_job, staging_table, schema, chunk_file
+                        )
+                    )
+                for future in pending:
+                    future.result()
+            job_config = bigquery.CopyJobConfig(
+                create_disposition=bigquery.CreateDisposition.CREATE_IF_NEEDED,
+                write_disposition=bigquery.WriteDisposition.WRITE_TRUNCATE,
+            )
+            copy_job = self.client.copy_table(
+                staging_table, table_name, job_config=job_config
+            )
+            copy_job.result()
+        finally:
+            self.client.delete_table(staging_table, not_found_ok=True)
+
+    def _csv_chunk_files(self, rows, chunk_size: int):
+        """Generator that writes the iterable rows to temporary csv files of
+        at most chunk_size rows, yielding each one, open in binary mode and
+        rewound, once it's written. It yields at least one (maybe empty)
+        file, and only one file's rows are in memory at a time."""
+        rows = iter(rows)
+        first = True
+        while True:
+            chunk_file = tempfile.TemporaryFile()
+            text_file = io.TextIOWrapper(chunk_file, encoding="utf-8", newline="")
+            csv.writer(text_file).writerows(islice(rows, chunk_size))
+            text_file.flush()
+            text_file.detach()
+            if chunk_file.tell() == 0 and not first:
+                chunk_file.close()
+                return
+            first = False
+            chunk_file.seek(0)
+            yield chunk_file
+
+    def _run_load_job(self, table_name, schema, chunk_file, truncate=False):
+        """Loads the csv file object chunk_file into table_name with a load
+        job, replacing the table's rows if truncate, and closes it."""
+        job_config = bigquery.LoadJobConfig(
+            schema=schema,
+            source_format=bigquery.SourceFormat.CSV,
+            create_disposition=bigquery.CreateDisposition.CREATE_IF_NEEDED,
+            write_disposition=bigquery.WriteDisposition.WRITE_TRUNCATE
+            if truncate
+            else bigquery.WriteDisposition.WRITE_APPEND,
+        )
+        with chunk_file:
+            load_job = self.client.load_table_from_file(
+                chunk_file, table_name, job_config=job_config
+            )
+            load_job.result()
+
+    def _load_wide_file_into_table(self, table_name, csv_file_path, fixed_types):
+        """Loads a "wide" csv file, as it is, into table_name: its fixed
+        columns, typed with fixed_types, and then a FLOAT64 column for each
+        shape, all named by the file's header row."""
+        with open(csv_file_path, newline="") as f:
+            csv_reader = csv.reader(f)
+            header = [column.strip() for column in next(csv_reader)]
+        types = list(fixed_types) + ["float8"] * (len(header) - len(fixed_types))
+
+        def rows():
+            with open(csv_file_path, newline="") as f:
+                csv_reader = csv.reader(f)
+                next(csv_reader)
+                yield from csv_reader
+
+        self._load_file_into_table(table_name, header, types, rows())
+
     def process_elec_load_shape(self, elec_load_shapes_path: str, truncate=False):
-        """Transforms data in the table specified by config.elec_load_shape_table, and loads it into `elec_load_shape`."""
+        """Transforms data in the table specified by config.elec_load_shape_table, and loads it into `elec_load_shape`.
+        If elec_load_shapes_path is a file, it's loaded into config.elec_load_shape_table first."""
+        if os.path.isfile(elec_load_shapes_path):
+            self._load_wide_file_into_table(
+                self.config.elec_load_shape_table,
+                elec_load_shapes_path,
+                ELEC_LOAD_SHAPE_COPY_TYPES[: len(ELEC_LOAD_SHAPE_FIXED_FIELDS)],
+            )
         dataset = self._get_target_dataset()
         self._prepare_table(
             f"{dataset}.elec_load_shape", "bq_create_elec_load_shape.sql", truncate=True
@@ -1177,7 +3158,14 @@ class BigQueryManager(DBManager):
     def process_metered_load_shape(self, metered_load_shapes_path: str, truncate=False):
         """Transforms data in the table specified by config.metered_load_shape_table, and
         loads it into `elec_load_shape`. First copies the specified elec_load_shape table
-        into {target_dataset}.elec_load_shape."""
+        into {target_dataset}.elec_load_shape. If metered_load_shapes_path is a file,
+        it's loaded into config.metered_load_shape_table first."""
+        if os.path.isfile(metered_load_shapes_path):
+            self._load_wide_file_into_table(
+                self.config.metered_load_shape_table,
+                metered_load_shapes_path,
+                ["int4"],
+            )
         dataset = self._get_target_dataset()
         self._prepare_table(
             f"{dataset}.elec_load_shape",
@@ -1209,7 +3197,14 @@ class BigQueryManager(DBManager):
         result = query_job.result()
 
     def process_therms_profile(self, therms_profiles_path: str, truncate: bool = False):
-        """Transforms data in the table specified by config.therms_profile_table, and loads it into `therms_profile`."""
+        """Transforms data in the table specified by config.therms_profile_table, and loads it into `therms_profile`.
+        If therms_profiles_path is a file, it's loaded into config.therms_profiles_table first."""
+        if os.path.isfile(therms_profiles_path):
+            self._load_wide_file_into_table(
+                self.config.therms_profiles_table,
+                therms_profiles_path,
+                THERMS_PROFILE_COPY_TYPES[: len(THERMS_PROFILE_FIXED_FIELDS)],
+            )
         dataset = self._get_target_dataset()
         self._prepare_table(
             f"{dataset}.therms_profile",
@@ -1262,6 +3257,7 @@ class BigQueryManager(DBManager):
             "elec_components": self._elec_components(),
             "gas_components": self._gas_components(),
             "use_value_curve_name_for_join": self.config.use_value_curve_name_for_join,
+            "quarterly_elec_aggregation": self.config.quarterly_elec_aggregation,
         }
         if mode == "electric":
             context["elec_aggregation_columns"] = elec_agg_columns
@@ -1289,22 +3285,87 @@ class BigQueryManager(DBManager):
         return context
 
     def _run_calc(self, sql):
+        # the script's result is that of its last statement, the calculation
+        sql = f"CREATE TEMP TABLE discount_factors AS {self._get_discount_factors_sql()};\n{sql}"
         query_job = self.client.query(sql)
-        result = query_job.result()
+        result = query_job.result(page_size=RESULT_FETCH_SIZE)
         if (
             not self.config.output_table
             and not self.config.electric_output_table
             and not self.config.gas_output_table
         ):
-            if self.config.output_file:
-                with open(self.config.output_file, "w") as outfile:
-                    for row in result:
-                        outfile.write(",".join([f"{x}" for x in row.values()]) + "\n")
-            else:
-                for row in result:
-                    print(",".join([f"{x}" for x in row.values()]))
+            output_format = self.config.result_format()
+            if not self.config.bigquery_storage_api and output_format == "csv":
+                # BigQuery results have always been written without a header
+                self._write_results(None, (row.values() for row in result))
+                return
+            # With bigquery_storage_api, the result's record batches are
+            # downloaded with the Storage Read API, from as many streams as
+            # BigQuery splits the result into, in parallel; otherwise they're
+            # read a page at a time.
+            bqstorage_client = None
+            if self.config.bigquery_storage_api:
+                bqstorage_client = self._get_bqstorage_client()
+                result = self._last_statement_rows(query_job)
+            batches = result.to_arrow_iterable(bqstorage_client=bqstorage_client)
+            if output_format == "csv":
+                # written like the REST API's rows, so the csv is the same
+                self._write_results(
+                    None,
+                    (
+                        tuple(row.values())
+                        for batch in batches
+                        for row in batch.to_pylist()
+                    ),
+                )
+                return
+            results.write_record_batches(
+                self.config.output_file or sys.stdout.buffer,
+                batches,
+                output_format,
+                columns=[field.name for field in result.schema],
+            )
+
+    def _last_statement_rows(self, query_job):
+        """The rows of the destination table of the last statement of the
+        script query_job ran. The script's own result has no destination
+        table, and the Storage Read API can only read tables, so without this
+        its rows would still be paged through with the REST API."""
+        last_job = max(
+            self.client.list_jobs(parent_job=query_job), key=lambda job: job.created
+        )
+        return self.client.list_rows(last_job.destination, page_size=RESULT_FETCH_SIZE)
+
+    def _get_bqstorage_client(self):
+        if bigquery_storage is None or results.pa is None:
+            raise FLEXValueException(
+                "bigquery_storage_api requires google-cloud-bigquery-storage and pyarrow. Install them with `pip install flexvalue[bigquery-storage]`."
+            )
+        return bigquery_storage.BigQueryReadClient()
 
     def process_project_info(self, project_info_path: str):
+        """If project_info_path is a file, loads it into
+        config.project_info_table; otherwise the table is used as it is."""
+        if os.path.isfile(project_info_path):
+            self._load_file_into_table(
+                self.config.project_info_table,
+                PROJECT_INFO_FIELDS,
+                PROJECT_INFO_TYPES,
+                (
+                    tuple(row[field] for field in PROJECT_INFO_FIELDS)
+                    for row in self._csv_file_to_dict_iter(
+                        project_info_path, PROJECT_INFO_FIELDS
+                    )
+                ),
+            )
+
+    def _load_chunk_size(self):
+        """The number of rows in each load job; configurable with
+        load_chunk_size, defaulting to BIG_QUERY_CHUNK_SIZE."""
+        return self.config.load_chunk_size or BIG_QUERY_CHUNK_SIZE
+
+    def _normalize_name_case(self):
+        # The BigQuery loaders have always upper-cased the names they load.
         pass
 
     def reset_elec_av_costs(self):
@@ -1339,9 +3400,30 @@ class BigQueryManager(DBManager):
         except NotFound as e:
             # If the table doesn't exist yet, it will be created later
             pass
+        # the manifest uses table names without the dataset
+        self._forget_loads(table_name.split(".")[-1])
 
     def _exec_select_sql(self, sql: str):
         # This is just here to support testing
         query_job = self.client.query(sql)
         result = query_job.result()
         return [x for x in result]
+
+    def _select_columns(self, sql: str):
+        result = self.client.query(sql).result()
+        names = [field.name for field in result.schema]
+        rows = list(result)
+        return {name: [row[name] for row in rows] for name in names}
+
+
+def _copy_partition(
+    config: FLEXValueConfig,
+    copy_method: str,
+    csv_file_path: str,
+    table_name: str,
+    byte_range,
+):
+    """Runs in a worker process of PostgresqlManager._copy_csv_file."""
+    getattr(DBManager.get_db_manager(config), copy_method)(
+        csv_file_path, table_name, byte_range
+    )
@@ -17,7 +17,10 @@
    limitations under the License.
 
 """
+from functools import partial
+
 from flexvalue.config import FLEXValueConfig
+from flexvalue.scheduler import LoadStep, run_load_steps
 
 from .db import (
     DBManager,
@@ -42,44 +45,129 @@ class FlexValueRun:
         if self.config.reset_gas_av_costs:
             self.db_manager.reset_gas_av_costs()
 
+        self.db_manager._normalize_name_case()
+        self.db_manager._prepare_shared_tables()
+        max_workers = self.db_manager._max_load_workers()
+        self.load_timings = run_load_steps(
+            self._load_steps(parallel=max_workers > 1),
+            max_workers=max_workers,
+            processes=max_workers > 1,
+        )
+
+    def _load_steps(self, parallel=False):
+        """The table loads this run asks for, in the order they used to run
+        one after another. They're independent except that metered load shapes
+        have to be loaded after project_info, so we can get the utility for
+        the metered shapes, and after the other load of elec_load_shape.
+        If parallel is True, each load is a picklable call that makes its own
+        DBManager (and so its own connections) in the worker process;
+        otherwise the loads use self.db_manager."""
+
+        def load(table_name, method_name, path, append=False):
+            if parallel:
+                return partial(
+                    _load_table, self.config, table_name, method_name, path, append
+                )
+            return partial(
+                self.db_manager._load_table, table_name, method_name, path, append
+            )
+
+        steps = []
         if self.config.process_elec_av_costs:
-            self.db_manager.process_elec_av_costs(
-                self.config.elec_av_costs_file
-                if self.config.elec_av_costs_file
-                else self.config.elec_av_costs_table
+            steps.append(
+                LoadStep(
+                    "elec_av_costs",
+                    load(
+                        "elec_av_costs",
+                        "process_elec_av_costs",
+                        self.config.elec_av_costs_file
+                        if self.config.elec_av_costs_file
+                        else self.config.elec_av_costs_table,
+                    ),
+                )
             )
         if self.config.process_elec_load_shape:
-            self.db_manager.process_elec_load_shape(
-                self.config.elec_load_shape_file
-                if self.config.elec_load_shape_file
-                else self.config.elec_load_shape_table
+            steps.append(
+                LoadStep(
+                    "elec_load_shape",
+                    load(
+                        "elec_load_shape",
+                        "process_elec_load_shape",
+                        self.config.elec_load_shape_file
+                        if self.config.elec_load_shape_file
+                        else self.config.elec_load_shape_table,
+                    ),
+                )
             )
         if self.config.process_gas_av_costs:
-            self.db_manager.process_gas_av_costs(
-                self.config.gas_av_costs_file
-                if self.config.gas_av_costs_file
-                else self.config.gas_av_costs_table
+            steps.append(
+                LoadStep(
+                    "gas_av_costs",
+                    load(
+                        "gas_av_costs",
+                        "process_gas_av_costs",
+                        self.config.gas_av_costs_file
+                        if self.config.gas_av_costs_file
+                        else self.config.gas_av_costs_table,
+                    ),
+                )
             )
         if self.config.process_therms_profiles:
-            self.db_manager.process_therms_profile(
-                self.config.therms_profiles_file
-                if self.config.therms_profiles_file
-                else self.config.therms_profiles_file
+            steps.append(
+                LoadStep(
+                    "therms_profile",
+                    load(
+                        "therms_profile",
+                        "process_therms_profile",
+                        self.config.therms_profiles_file
+                        if self.config.therms_profiles_file
+                        else self.config.therms_profiles_table,
+                    ),
+                )
             )
         if self.config.project_info_file or self.config.project_info_table:
-            self.db_manager.process_project_info(
-                self.config.project_info_file
-                if self.config.project_info_file
-                else self.config.project_info_table
+            steps.append(
+                LoadStep(
+                    "project_info",
+                    load(
+                        "project_info",
+                        "process_project_info",
+                        self.config.project_info_file
+                        if self.config.project_info_file
+                        else self.config.project_info_table,
+                    ),
+                )
             )
-        # Have to load metered load shapes after project_info, so we can get the
-        # utility for the metered shapes
         if self.config.process_metered_load_shape:
-            self.db_manager.process_metered_load_shape(
-                self.config.metered_load_shape_file
-                if self.config.metered_load_shape_file
-                else self.config.metered_load_shape_table
+            steps.append(
+                LoadStep(
+                    "metered_load_shape",
+                    load(
+                        "elec_load_shape",
+                        "process_metered_load_shape",
+                        self.config.metered_load_shape_file
+                        if self.config.metered_load_shape_file
+                        else self.config.metered_load_shape_table,
+                        append=True,
+                    ),
+                    # both load elec_load_shape
+                    depends_on=["project_info", "elec_load_shape"],
+                )
             )
+        return steps
 
     def run(self):
         self.db_manager.run()
+
+
+def _load_table(
+    config: FLEXValueConfig,
+    table_name: str,
+    method_name: str,
+    path: str,
+    append: bool,
+):
+    """Runs one table load in a worker process of a parallel load."""
+    DBManager.get_db_manager(config)._load_table(
+        table_name, method_name, path, append
+    )
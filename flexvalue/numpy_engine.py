@@ -0,0 +1,717 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+
+   Copyright 2021 Recurve Analytics, Inc.
+
+   Licensed under the Apache License, Version 2.0 (the "License");
+   you may not use this file except in compliance with the License.
+   You may obtain a copy of the License at
+
+       http://www.apache.org/licenses/LICENSE-2.0
+
+   Unless required by applicable law or agreed to in writing, software
+   distributed under the License is distributed on an "AS IS" BASIS,
+   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+   See the License for the specific language governing permissions and
+   limitations under the License.
+
+"""
+
+from flexvalue.config import FLEXValueException
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+__all__ = ("NumpyEngine",)
+
+# The avoided cost columns the engine reads, total and marginal_ghg included
+ELEC_COST_COLUMNS = (
+    "energy",
+    "losses",
+    "ancillary_services",
+    "capacity",
+    "transmission",
+    "distribution",
+    "cap_and_trade",
+    "ghg_adder",
+    "ghg_rebalancing",
+    "methane_leakage",
+    "total",
+    "marginal_ghg",
+    "ghg_adder_rebalancing",
+)
+GAS_COST_COLUMNS = (
+    "market",
+    "t_d",
+    "environment",
+    "btm_methane",
+    "total",
+    "upstream_methane",
+    "marginal_ghg",
+)
+
+# The columns of each input table, as the engine expects them
+PROJECT_COLUMNS = (
+    "id",
+    "utility",
+    "region",
+    "load_shape",
+    "therms_profile",
+    "value_curve_name",
+    "mwh_savings",
+    "therms_savings",
+    "units",
+    "ntg",
+    "eul",
+    "start_year",
+    "start_quarter",
+    "discount_rate",
+    "admin_cost",
+    "measure_cost",
+    "incentive_cost",
+)
+ELEC_AV_COSTS_COLUMNS = (
+    "utility",
+    "region",
+    "value_curve_name",
+    "year",
+    "quarter",
+    "month",
+    "hour_of_year",
+    "datetime",
+) + ELEC_COST_COLUMNS
+ELEC_LOAD_SHAPE_COLUMNS = ("utility", "load_shape_name", "hour_of_year", "value")
+GAS_AV_COSTS_COLUMNS = (
+    "utility",
+    "value_curve_name",
+    "year",
+    "quarter",
+    "month",
+) + GAS_COST_COLUMNS
+THERMS_PROFILE_COLUMNS = ("utility", "profile_name", "month", "value")
+
+
+def _require_numpy():
+    if np is None:
+        raise FLEXValueException(
+            "The numpy calculation_engine requires numpy. Install it with `pip install flexvalue[numpy]`, or use calculation_engine = 'sql'."
+        )
+
+
+def _encode(values, vocabulary):
+    """The index of each of values in vocabulary, a dict that's extended with
+    the values it doesn't have yet. None is coded -1, since it doesn't match
+    anything in a join."""
+    return np.fromiter(
+        (
+            -1 if value is None else vocabulary.setdefault(value, len(vocabulary))
+            for value in values
+        ),
+        dtype=np.int64,
+        count=len(values),
+    )
+
+
+def _combine(codes, sizes):
+    """One integer key per row for the columns of codes, whose values are
+    below the matching sizes; -1 if any of the codes is."""
+    key = np.zeros(len(codes[0]), dtype=np.int64)
+    for code, size in zip(codes, sizes):
+        key = key * max(size, 1) + code
+    missing = np.zeros(len(key), dtype=bool)
+    for code in codes:
+        missing |= code < 0
+    key[missing] = -1
+    return key
+
+
+def _lookup(sorted_keys, keys):
+    """The position of each of keys in sorted_keys, or -1."""
+    if not len(sorted_keys):
+        return np.full(len(keys), -1, dtype=np.int64)
+    position = np.searchsorted(sorted_keys, keys).clip(0, len(sorted_keys) - 1)
+    return np.where((sorted_keys[position] == keys) & (keys >= 0), position, -1)
+
+
+def _expand(starts, counts):
+    """The indexes of the ranges starting at starts and counts long, one
+    after another, and the index of the range each comes from."""
+    total = int(counts.sum())
+    source = np.repeat(np.arange(len(counts)), counts)
+    within = np.arange(total) - np.repeat(np.cumsum(counts) - counts, counts)
+    return np.repeat(starts, counts) + within, source
+
+
+class NumpyEngine:
+    """Computes what the calculation templates do, in memory with numpy.
+
+    Each input is a table as {column: sequence of values}, with the columns
+    in PROJECT_COLUMNS, ELEC_AV_COSTS_COLUMNS, ELEC_LOAD_SHAPE_COLUMNS,
+    GAS_AV_COSTS_COLUMNS and THERMS_PROFILE_COLUMNS. The names must already
+    be matched the way the calculation joins them (upper-cased load shape and
+    therms profile names). zero_ratio is the TRC or PAC ratio reported when
+    both the benefits and the costs are zero: 0.0 on postgresql, and -inf
+    elsewhere, as in the templates.
+
+    The electric avoided costs are read into dense (year, hour_of_year)
+    arrays for each utility, region (and value curve, with
+    use_value_curve_name_for_join), and the load shapes into a matrix with a
+    row per shape and a column per hour. Their matrix products give the sum
+    of the shape times each cost component for every month, which are then
+    discounted and scaled by each project's savings. The gas avoided costs
+    are monthly, so they're joined to each project's quarters directly."""
+
+    def __init__(
+        self,
+        projects,
+        elec_av_costs,
+        elec_load_shape,
+        gas_av_costs,
+        therms_profile,
+        use_value_curve_name_for_join=False,
+        zero_ratio=0.0,
+    ):
+        _require_numpy()
+        self.use_value_curve_name_for_join = use_value_curve_name_for_join
+        self.zero_ratio = zero_ratio
+        self._utilities, self._regions, self._curves = {}, {}, {}
+        self._load_shapes, self._profiles = {}, {}
+        self._prepare_projects(projects)
+        self._elec_av_costs = elec_av_costs
+        self._elec_load_shape = elec_load_shape
+        self._gas_av_costs = gas_av_costs
+        self._therms_profile = therms_profile
+        self._elec_records = None
+        self._gas_records = None
+
+    def _prepare_projects(self, projects):
+        """Codes the projects' names and computes their costs and the year,
+        quarter and discount factor of each quarter of their EULs, like the
+        discount_factors table."""
+        ids, self.id_codes = np.unique(
+            np.asarray(projects["id"], dtype=object).astype(str), return_inverse=True
+        )
+        self.ids = ids.tolist()
+        self.id_codes = self.id_codes.reshape(-1)
+        self.utility = _encode(projects["utility"], self._utilities)
+        self.region = _encode(projects["region"], self._regions)
+        self.load_shape = _encode(projects["load_shape"], self._load_shapes)
+        self.therms_profile = _encode(projects["therms_profile"], self._profiles)
+        self.curve = _encode(projects["value_curve_name"], self._curves)
+        for column in [
+            "mwh_savings",
+            "therms_savings",
+            "units",
+            "ntg",
+            "discount_rate",
+            "admin_cost",
+            "measure_cost",
+            "incentive_cost",
+        ]:
+            setattr(self, column, np.asarray(projects[column], dtype=float))
+        for column in ["eul", "start_year", "start_quarter"]:
+            setattr(self, column, np.asarray(projects[column], dtype=np.int64))
+        quarter_discount = 1 + self.discount_rate / 4.0
+        self.trc_costs = (
+            self.admin_cost
+            + ((1 - self.ntg) * self.incentive_cost + self.ntg * self.measure_cost)
+            / quarter_discount
+        )
+        self.pac_costs = self.admin_cost + self.incentive_cost / quarter_discount
+        # like the discount_factors query, projects whose EUL isn't positive
+        # have no quarters, so they're left out of the results
+        num_quarters = np.maximum(self.eul * 4, 0)
+        offset, self.pq_project = _expand(
+            np.zeros(len(num_quarters), dtype=np.int64), num_quarters
+        )
+        quarter_index = self.start_quarter[self.pq_project] - 1 + offset
+        self.pq_year = self.start_year[self.pq_project] + quarter_index // 4
+        self.pq_quarter = quarter_index % 4 + 1
+        self.pq_discount = 1.0 / quarter_discount[self.pq_project] ** offset
+
+    def _elec_keys(self, utility, region, curve):
+        codes = [utility, region]
+        sizes = [len(self._utilities), len(self._regions)]
+        if self.use_value_curve_name_for_join:
+            codes.append(curve)
+            sizes.append(len(self._curves))
+        return _combine(codes, sizes)
+
+    def _load_shape_matrix(self):
+        """The load shapes as (utility and shape keys, value matrix, matrix of
+        the number of rows), with a row per shape and a column per hour."""
+        els = self._elec_load_shape
+        keys = _combine(
+            [
+                _encode(els["utility"], self._utilities),
+                _encode(els["load_shape_name"], self._load_shapes),
+            ],
+            [len(self._utilities), len(self._load_shapes)],
+        )
+        hours = np.asarray(els["hour_of_year"], dtype=np.int64)
+        shape_keys, shape_index = np.unique(keys, return_inverse=True)
+        num_hours = int(hours.max()) + 1 if len(hours) else 0
+        values = np.zeros((len(shape_keys), num_hours))
+        present = np.zeros((len(shape_keys), num_hours))
+        np.add.at(values, (shape_index, hours), np.asarray(els["value"], dtype=float))
+        np.add.at(present, (shape_index, hours), 1)
+        return shape_keys, values, present
+
+    def _elec_cube(self, rows, num_years, num_hours, shapes, present):
+        """The sums of each of shapes (a value matrix) times the rows of one
+        utility, region (and curve) of the electric avoided costs, by year and
+        month: an array of (shape, year, month, [joined rows, shape value,
+        shape times each of ELEC_COST_COLUMNS]), and the quarter of each year
+        and month."""
+        year, hour, month, quarter, costs = rows
+        hourly = np.zeros((num_years, num_hours, 1 + costs.shape[1]))
+        np.add.at(hourly, (year, hour, 0), 1)
+        np.add.at(hourly, (year, hour), np.column_stack([np.zeros(len(year)), costs]))
+        hour_month = np.zeros((num_years, num_hours), dtype=np.int64)
+        hour_month[year, hour] = month
+        month_quarter = np.zeros((num_years, 13), dtype=np.int64)
+        month_quarter[year, month] = quarter
+        cube = np.zeros((len(shapes), num_years, 12, 2 + costs.shape[1]))
+        for y in np.unique(year):
+            for m in np.unique(month[year == y]):
+                hours = np.nonzero(hour_month[y] == m)[0]
+                counts = hourly[y, hours, 0]
+                cube[:, y, m - 1, 0] = present[:, hours] @ counts
+                cube[:, y, m - 1, 1] = shapes[:, hours] @ counts
+                cube[:, y, m - 1, 2:] = shapes[:, hours] @ hourly[y, hours, 1:]
+        return cube, month_quarter
+
+    def _elec_cost_rows(self):
+        """The electric avoided costs as (key, year index, hour, month, quarter,
+        costs) arrays, with the years they cover."""
+        eac = self._elec_av_costs
+        keys = self._elec_keys(
+            _encode(eac["utility"], self._utilities),
+            _encode(eac["region"], self._regions),
+            _encode(eac["value_curve_name"], self._curves),
+        )
+        years = np.asarray(eac["year"], dtype=np.int64)
+        unique_years, year_index = np.unique(years, return_inverse=True)
+        costs = np.column_stack(
+            [np.asarray(eac[column], dtype=float) for column in ELEC_COST_COLUMNS]
+        ).reshape(len(keys), len(ELEC_COST_COLUMNS))
+        return (
+            keys,
+            year_index,
+            np.asarray(eac["hour_of_year"], dtype=np.int64),
+            np.asarray(eac["month"], dtype=np.int64),
+            np.asarray(eac["quarter"], dtype=np.int64),
+            costs,
+            unique_years,
+        )
+
+    def _elec(self):
+        """The electric results of each project by quarter and month, as
+        (project quarter, month, [joined rows, shape value, shape times each
+        of ELEC_COST_COLUMNS]) records, for the months that joined any rows."""
+        if self._elec_records is not None:
+            return self._elec_records
+        shape_keys, shapes, present = self._load_shape_matrix()
+        keys, year, hour, month, quarter, costs, years = self._elec_cost_rows()
+        num_hours = max(shapes.shape[1], int(hour.max()) + 1 if len(hour) else 0)
+        shapes = np.pad(shapes, ((0, 0), (0, num_hours - shapes.shape[1])))
+        present = np.pad(present, ((0, 0), (0, num_hours - present.shape[1])))
+        project_keys = self._elec_keys(self.utility, self.region, self.curve)
+        project_shapes = _lookup(
+            shape_keys,
+            _combine(
+                [self.utility, self.load_shape],
+                [len(self._utilities), len(self._load_shapes)],
+            ),
+        )
+        shape_utilities = shape_keys // max(len(self._load_shapes), 1)
+        order = np.argsort(keys, kind="stable")
+        unique_keys, starts = np.unique(keys[order], return_index=True)
+        ends = np.append(starts[1:], len(order))
+        records = []
+        for key, start, end in zip(unique_keys, starts, ends):
+            projects = np.nonzero((project_keys == key) & (project_shapes >= 0))[0]
+            if key < 0 or not len(projects):
+                continue
+            rows = order[start:end]
+            utility = key
+            for size in [len(self._curves)] * self.use_value_curve_name_for_join + [
+                len(self._regions)
+            ]:
+                utility = utility // max(size, 1)
+            utility_shapes = np.nonzero(shape_utilities == utility)[0]
+            cube, month_quarter = self._elec_cube(
+                (year[rows], hour[rows], month[rows], quarter[rows], costs[rows]),
+                len(years),
+                num_hours,
+                shapes[utility_shapes],
+                present[utility_shapes],
+            )
+            local_shape = np.full(len(shape_keys), -1)
+            local_shape[utility_shapes] = np.arange(len(utility_shapes))
+            pq = np.nonzero(np.isin(self.pq_project, projects))[0]
+            pq_year = _lookup(years, self.pq_year[pq])
+            pq, pq_year = pq[pq_year >= 0], pq_year[pq_year >= 0]
+            pq_shape = local_shape[project_shapes[self.pq_project[pq]]]
+            for m in range(1, 13):
+                in_quarter = month_quarter[pq_year, m] == self.pq_quarter[pq]
+                values = cube[pq_shape[in_quarter], pq_year[in_quarter], m - 1]
+                joined = values[:, 0] > 0
+                records.append(
+                    (
+                        pq[in_quarter][joined],
+                        np.full(int(joined.sum()), m),
+                        values[joined],
+                    )
+                )
+        if records:
+            pq, months, values = (np.concatenate(parts) for parts in zip(*records))
+        else:
+            pq = months = np.zeros(0, dtype=np.int64)
+            values = np.zeros((0, 2 + len(ELEC_COST_COLUMNS)))
+        self._elec_records = (pq, months, values)
+        return self._elec_records
+
+    def _gas(self):
+        """The gas results of each project's joined avoided cost rows, as
+        (project quarter, month, avoided costs (GAS_COST_COLUMNS), therms
+        profile value) records."""
+        if self._gas_records is not None:
+            return self._gas_records
+        gac = self._gas_av_costs
+        utility = _encode(gac["utility"], self._utilities)
+        curve = _encode(gac["value_curve_name"], self._curves)
+        years = np.asarray(gac["year"], dtype=np.int64)
+        quarters = np.asarray(gac["quarter"], dtype=np.int64)
+        months = np.asarray(gac["month"], dtype=np.int64)
+        costs = np.column_stack(
+            [np.asarray(gac[column], dtype=float) for column in GAS_COST_COLUMNS]
+        ).reshape(len(years), len(GAS_COST_COLUMNS))
+        unique_years, year_index = np.unique(years, return_inverse=True)
+
+        def gas_keys(utility, curve, year_index, quarter):
+            codes = [utility, year_index, quarter]
+            sizes = [len(self._utilities), len(unique_years), 5]
+            if self.use_value_curve_name_for_join:
+                codes.insert(1, curve)
+                sizes.insert(1, len(self._curves))
+            return _combine(codes, sizes)
+
+        keys = gas_keys(utility, curve, year_index, quarters)
+        order = np.argsort(keys, kind="stable")
+        sorted_keys = keys[order]
+        p = self.pq_project
+        pq_year = _lookup(unique_years, self.pq_year)
+        pq_keys = gas_keys(self.utility[p], self.curve[p], pq_year, self.pq_quarter)
+        pq_keys[pq_year < 0] = -1
+        starts = np.searchsorted(sorted_keys, pq_keys, side="left")
+        counts = np.searchsorted(sorted_keys, pq_keys, side="right") - starts
+        counts[pq_keys < 0] = 0
+        positions, pq = _expand(starts, counts)
+        rows = order[positions]
+
+        # each pair is joined to the therms profile rows of the project's
+        # utility and profile for the avoided costs' month
+        therms = self._therms_profile
+        profile_keys = _combine(
+            [
+                _encode(therms["utility"], self._utilities),
+                _encode(therms["profile_name"], self._profiles),
+                np.asarray(therms["month"], dtype=np.int64),
+            ],
+            [len(self._utilities), len(self._profiles), 13],
+        )
+        profile_order = np.argsort(profile_keys, kind="stable")
+        sorted_profile_keys = profile_keys[profile_order]
+        pair_keys = _combine(
+            [self.utility[p[pq]], self.therms_profile[p[pq]], months[rows]],
+            [len(self._utilities), len(self._profiles), 13],
+        )
+        starts = np.searchsorted(sorted_profile_keys, pair_keys, side="left")
+        counts = np.searchsorted(sorted_profile_keys, pair_keys, side="right") - starts
+        counts[pair_keys < 0] = 0
+        positions, pair = _expand(starts, counts)
+        profile_rows = profile_order[positions]
+        self._gas_records = (
+            pq[pair],
+            months[rows][pair],
+            costs[rows][pair],
+            np.asarray(therms["value"], dtype=float)[profile_rows],
+        )
+        return self._gas_records
+
+    def _groups(self, pq, months, aggregation_columns):
+        """The index of the (id, aggregation columns) group of each record,
+        and each group's id and aggregation column values."""
+        p = self.pq_project[pq]
+        columns = {
+            "region": self.region[p],
+            "year": self.pq_year[pq],
+            "quarter": self.pq_quarter[pq],
+            "month": months,
+        }
+        group_columns = [self.id_codes[p]] + [
+            columns[column] for column in aggregation_columns
+        ]
+        if not len(pq):
+            return np.zeros(0, dtype=np.int64), []
+        unique_groups, group = np.unique(
+            np.column_stack(group_columns), axis=0, return_inverse=True
+        )
+        regions = list(self._regions)
+        labels = []
+        for unique_group in unique_groups.tolist():
+            label = [self.ids[unique_group[0]]]
+            for column, value in zip(aggregation_columns, unique_group[1:]):
+                label.append(regions[value] if column == "region" else value)
+            labels.append(label)
+        return group.reshape(-1), labels
+
+    def _sum(self, group, num_groups, values):
+        return np.bincount(group, weights=values, minlength=num_groups)
+
+    def _max(self, group, num_groups, values):
+        result = np.full(num_groups, -np.inf)
+        np.maximum.at(result, group, values)
+        return result
+
+    def _ratio(self, benefits, costs):
+        with np.errstate(divide="ignore", invalid="ignore"):
+            ratio = benefits / costs
+        zero = costs == 0
+        ratio[zero & (benefits > 0)] = np.inf
+        ratio[zero & (benefits < 0)] = -np.inf
+        ratio[zero & (benefits == 0)] = self.zero_ratio
+        return ratio
+
+    def _elec_metrics(self, components):
+        """The electric records' benefits and savings, by name."""
+        pq, months, values = self._elec()
+        p = self.pq_project[pq]
+        savings = self.units[p] * self.ntg[p] * self.mwh_savings[p]
+        discount = self.pq_discount[pq]
+        cost = {column: values[:, 2 + i] for i, column in enumerate(ELEC_COST_COLUMNS)}
+        metrics = {
+            "electric_benefits": savings * discount * cost["total"],
+            "annual_net_mwh_savings": savings * values[:, 1] / self.eul[p],
+            "lifecycle_net_mwh_savings": savings * values[:, 1],
+            "lifecycle_elec_ghg_savings": savings * cost["marginal_ghg"],
+        }
+        for component in components:
+            metrics[f"component:{component}"] = (
+                savings
+                * cost[component]
+                * (1 if component == "marginal_ghg" else discount)
+            )
+        return pq, months, metrics
+
+    def _gas_metrics(self, components):
+        """The gas records' benefits and savings, by name."""
+        pq, months, costs, values = self._gas()
+        p = self.pq_project[pq]
+        savings = self.units[p] * self.ntg[p] * self.therms_savings[p] * values
+        discount = self.pq_discount[pq]
+        cost = {column: costs[:, i] for i, column in enumerate(GAS_COST_COLUMNS)}
+        metrics = {
+            "gas_benefits": savings * discount * cost["total"],
+            "annual_net_therms_savings": savings / self.eul[p],
+            "lifecycle_net_therms_savings": savings,
+            "lifecycle_gas_ghg_savings": savings * cost["marginal_ghg"],
+        }
+        for component in components:
+            metrics[f"component:{component}"] = (
+                savings
+                * cost[component]
+                * (1 if component == "marginal_ghg" else discount)
+            )
+        return pq, months, metrics
+
+    def electric(self, aggregation_columns, components):
+        """The columns and rows of elec_calculation.sql's results, grouped by
+        id and aggregation_columns (any of region, year, quarter and month)."""
+        aggregation_columns, components = list(aggregation_columns), list(components)
+        pq, months, metrics = self._elec_metrics(components)
+        group, labels = self._groups(pq, months, aggregation_columns)
+        n = len(labels)
+        p = self.pq_project[pq]
+        sums = {name: self._sum(group, n, values) for name, values in metrics.items()}
+        trc_costs = self._max(group, n, self.trc_costs[p])
+        pac_costs = self._max(group, n, self.pac_costs[p])
+        columns = [
+            ("trc_ratio", self._ratio(sums["electric_benefits"], trc_costs)),
+            ("pac_ratio", self._ratio(sums["electric_benefits"], pac_costs)),
+            ("electric_benefits", sums["electric_benefits"]),
+            ("trc_costs", trc_costs),
+            ("pac_costs", pac_costs),
+            ("annual_net_mwh_savings", sums["annual_net_mwh_savings"]),
+            ("lifecycle_net_mwh_savings", sums["lifecycle_net_mwh_savings"]),
+            ("lifecycle_elec_ghg_savings", sums["lifecycle_elec_ghg_savings"]),
+        ]
+        return self._result(labels, aggregation_columns, columns, components, sums)
+
+    def gas(self, aggregation_columns, components):
+        """The columns and rows of gas_calculation.sql's results, grouped by
+        id and aggregation_columns (any of region, year, quarter and month)."""
+        aggregation_columns, components = list(aggregation_columns), list(components)
+        pq, months, metrics = self._gas_metrics(components)
+        group, labels = self._groups(pq, months, aggregation_columns)
+        n = len(labels)
+        p = self.pq_project[pq]
+        _, _, costs, values = self._gas()
+        sums = {name: self._sum(group, n, values) for name, values in metrics.items()}
+        trc_costs = self._max(group, n, self.trc_costs[p])
+        pac_costs = self._max(group, n, self.pac_costs[p])
+        # the template sums the total of each distinct (eul, total, therms
+        # profile value) in a group
+        distinct = np.unique(
+            np.column_stack(
+                [group, self.eul[p], costs[:, GAS_COST_COLUMNS.index("total")], values]
+            ).reshape(len(group), 4),
+            axis=0,
+        )
+        total = self._sum(distinct[:, 0].astype(np.int64), n, distinct[:, 2])
+        columns = [
+            ("total", total),
+            ("trc_ratio", self._ratio(sums["gas_benefits"], trc_costs)),
+            ("pac_ratio", self._ratio(sums["gas_benefits"], pac_costs)),
+            ("gas_benefits", sums["gas_benefits"]),
+            ("trc_costs", trc_costs),
+            ("pac_costs", pac_costs),
+            ("annual_net_therms_savings", sums["annual_net_therms_savings"]),
+            ("lifecycle_net_therms_savings", sums["lifecycle_net_therms_savings"]),
+            ("therms_profile_value", self._max(group, n, values)),
+            ("lifecycle_gas_ghg_savings", sums["lifecycle_gas_ghg_savings"]),
+        ]
+        return self._result(labels, aggregation_columns, columns, components, sums)
+
+    def combined(self, elec_components, gas_components):
+        """The columns and rows of calculation.sql's results, by id. As in
+        the template, which joins the hourly electric results to the monthly
+        gas ones on their datetime, the TRC and PAC ratios count the gas
+        benefits of a month only if the project has no electric result for
+        the month's first hour."""
+        elec_components, gas_components = list(elec_components), list(gas_components)
+        elec_pq, _, elec = self._elec_metrics(elec_components)
+        gas_pq, gas_months, gas = self._gas_metrics(gas_components)
+        elec_p, gas_p = self.pq_project[elec_pq], self.pq_project[gas_pq]
+        project_ids = np.unique(np.concatenate([elec_p, gas_p]))
+        ids = self.id_codes[project_ids]
+        unique_ids, group_of_project = np.unique(ids, return_inverse=True)
+        group = np.full(len(self.id_codes), -1)
+        group[project_ids] = group_of_project.reshape(-1)
+        n = len(unique_ids)
+        elec_group, gas_group = group[elec_p], group[gas_p]
+        sums = {name: self._sum(elec_group, n, values) for name, values in elec.items()}
+        gas_sums = {
+            name: self._sum(gas_group, n, values) for name, values in gas.items()
+        }
+        unmatched = ~self._has_elec_first_hour(gas_pq, gas_months)
+        ratio_benefits = sums["electric_benefits"] + self._sum(
+            gas_group[unmatched], n, gas["gas_benefits"][unmatched]
+        )
+        trc_costs = self._max(
+            np.concatenate([elec_group, gas_group]),
+            n,
+            self.trc_costs[np.concatenate([elec_p, gas_p])],
+        )
+        pac_costs = self._max(
+            np.concatenate([elec_group, gas_group]),
+            n,
+            self.pac_costs[np.concatenate([elec_p, gas_p])],
+        )
+        columns = [
+            ("trc_ratio", self._ratio(ratio_benefits, trc_costs)),
+            ("pac_ratio", self._ratio(ratio_benefits, pac_costs)),
+            ("electric_benefits", sums["electric_benefits"]),
+            ("gas_benefits", gas_sums["gas_benefits"]),
+            ("total_benefits", sums["electric_benefits"] + gas_sums["gas_benefits"]),
+            ("trc_costs", trc_costs),
+            ("pac_costs", pac_costs),
+            ("annual_net_mwh_savings", sums["annual_net_mwh_savings"]),
+            ("lifecycle_net_mwh_savings", sums["lifecycle_net_mwh_savings"]),
+            ("annual_net_therms_savings", gas_sums["annual_net_therms_savings"]),
+            ("lifecycle_net_therms_savings", gas_sums["lifecycle_net_therms_savings"]),
+            ("lifecycle_elec_ghg_savings", sums["lifecycle_elec_ghg_savings"]),
+            ("lifecycle_gas_ghg_savings", gas_sums["lifecycle_gas_ghg_savings"]),
+            (
+                "lifecycle_total_ghg_savings",
+                sums["lifecycle_elec_ghg_savings"]
+                + gas_sums["lifecycle_gas_ghg_savings"],
+            ),
+        ]
+        columns += [
+            (component, sums[f"component:{component}"]) for component in elec_components
+        ]
+        columns += [
+            (component, gas_sums[f"component:{component}"])
+            for component in gas_components
+        ]
+        labels = [[self.ids[id_code]] for id_code in unique_ids]
+        return self._result(labels, [], columns, [], {})
+
+    def _has_elec_first_hour(self, pq, months):
+        """Whether each project quarter's project has an electric result for
+        the first hour of the month: an avoided cost row dated the 1st at
+        midnight, and a load shape row for its hour."""
+        eac = self._elec_av_costs
+        keys = self._elec_keys(
+            _encode(eac["utility"], self._utilities),
+            _encode(eac["region"], self._regions),
+            _encode(eac["value_curve_name"], self._curves),
+        )
+        datetimes = np.asarray(
+            [str(value)[:19] for value in eac["datetime"]], dtype="datetime64[s]"
+        )
+        first_hours = datetimes == datetimes.astype("datetime64[M]")
+        month_number = datetimes[first_hours].astype("datetime64[M]").astype(np.int64)
+        num_months = int(month_number.max()) + 1 if len(month_number) else 1
+        hour_keys = keys[first_hours] * num_months + month_number
+        hour_keys[keys[first_hours] < 0] = -1
+        hours = np.asarray(eac["hour_of_year"], dtype=np.int64)[first_hours]
+        order = np.argsort(hour_keys, kind="stable")
+        hour_keys, hours = hour_keys[order], hours[order]
+
+        p = self.pq_project[pq]
+        gas_month_number = (self.pq_year[pq] - 1970) * 12 + months - 1
+        project_keys = self._elec_keys(self.utility, self.region, self.curve)[p]
+        found = _lookup(hour_keys, project_keys * num_months + gas_month_number)
+        found[(project_keys < 0) | (gas_month_number >= num_months)] = -1
+        shape_keys, _, present = self._load_shape_matrix()
+        project_shapes = _lookup(
+            shape_keys,
+            _combine(
+                [self.utility, self.load_shape],
+                [len(self._utilities), len(self._load_shapes)],
+            ),
+        )[p]
+        hour = hours[found.clip(0)] if len(hours) else np.zeros(len(p), dtype=np.int64)
+        in_shape = hour < present.shape[1]
+        result = (found >= 0) & (project_shapes >= 0) & in_shape
+        result[result] = present[project_shapes[result], hour[result]] > 0
+        return result
+
+    def _result(self, labels, aggregation_columns, columns, components, sums):
+        """The result's column names and rows, in the templates' order: id,
+        the named columns, the aggregation columns and the components."""
+        names = (
+            ["id"] + [name for name, _ in columns] + aggregation_columns + components
+        )
+        values = [values.tolist() for _, values in columns] + [
+            sums[f"component:{component}"].tolist() for component in components
+        ]
+        rows = []
+        for i, label in enumerate(labels):
+            computed = [column[i] for column in values]
+            num_columns = len(columns)
+            rows.append(
+                tuple(
+                    label[:1]
+                    + computed[:num_columns]
+                    + label[1:]
+                    + computed[num_columns:]
+                )
+            )
+        return names, rows
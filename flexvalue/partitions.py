@@ -0,0 +1,104 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+
+   Copyright 2021 Recurve Analytics, Inc.
+
+   Licensed under the Apache License, Version 2.0 (the "License");
+   you may not use this file except in compliance with the License.
+   You may obtain a copy of the License at
+
+       http://www.apache.org/licenses/LICENSE-2.0
+
+   Unless required by applicable law or agreed to in writing, software
+   distributed under the License is distributed on an "AS IS" BASIS,
+   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+   See the License for the specific language governing permissions and
+   limitations under the License.
+
+"""
+import io
+import os
+
+from collections import namedtuple
+
+__all__ = ("ByteRange", "line_aligned_ranges", "open_binary", "open_text")
+
+# The data rows from byte start up to (not including) byte end of a csv file,
+# read after its header row, which ends at byte header_end (0 if the file has
+# no header row)
+ByteRange = namedtuple("ByteRange", ["header_end", "start", "end"])
+
+
+def line_aligned_ranges(csv_file_path: str, num_partitions: int, header=True):
+    """Splits the data rows of the csv file at csv_file_path (everything after
+    its header line, if header is True) into at most num_partitions ByteRanges
+    of about the same size, each of which starts at the beginning of a line.
+    Fields must not contain newlines, which is true of all the FLEXvalue input
+    files."""
+    size = os.path.getsize(csv_file_path)
+    with open(csv_file_path, "rb") as f:
+        if header:
+            f.readline()
+        header_end = f.tell()
+        bounds = [header_end]
+        for i in range(1, num_partitions):
+            target = header_end + (size - header_end) * i // num_partitions
+            if target <= bounds[-1]:
+                continue
+            # start one byte early, so a target at the start of a line stays put
+            f.seek(target - 1)
+            f.readline()
+            if bounds[-1] < f.tell() < size:
+                bounds.append(f.tell())
+    bounds.append(size)
+    return [
+        ByteRange(header_end, start, end)
+        for start, end in zip(bounds[:-1], bounds[1:])
+        if start < end
+    ]
+
+
+class _FileRange(io.RawIOBase):
+    """A binary file object that reads the header line of a file, then the
+    bytes of one ByteRange."""
+
+    def __init__(self, path: str, byte_range: ByteRange):
+        self._file = open(path, "rb")
+        self._spans = [[0, byte_range.header_end], [byte_range.start, byte_range.end]]
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        while self._spans:
+            position, end = self._spans[0]
+            if position < end:
+                self._file.seek(position)
+                read = self._file.readinto(
+                    memoryview(buffer)[: min(len(buffer), end - position)]
+                )
+                if read:
+                    self._spans[0][0] += read
+                    return read
+            self._spans.pop(0)
+        return 0
+
+    def close(self):
+        self._file.close()
+        super().close()
+
+
+def open_binary(path: str, byte_range: ByteRange = None):
+    """Opens the csv file at path for reading bytes; if byte_range is given,
+    only its header row and the rows in byte_range are read."""
+    if byte_range is None:
+        return open(path, "rb")
+    return io.BufferedReader(_FileRange(path, byte_range))
+
+
+def open_text(path: str, byte_range: ByteRange = None):
+    """Like open_binary, but opens the file as text for the csv module."""
+    if byte_range is None:
+        return open(path, newline="")
+    return io.TextIOWrapper(open_binary(path, byte_range), newline="")
@@ -0,0 +1,127 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+
+   Copyright 2021 Recurve Analytics, Inc.
+
+   Licensed under the Apache License, Version 2.0 (the "License");
+   you may not use this file except in compliance with the License.
+   You may obtain a copy of the License at
+
+       http://www.apache.org/licenses/LICENSE-2.0
+
+   Unless required by applicable law or agreed to in writing, software
+   distributed under the License is distributed on an "AS IS" BASIS,
+   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+   See the License for the specific language governing permissions and
+   limitations under the License.
+
+"""
+from itertools import chain, islice
+
+from flexvalue.config import FLEXValueException
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+
+__all__ = ("record_batches", "write_record_batches")
+
+# The number of result rows in each record batch, and so in each parquet row
+# group
+ROW_GROUP_SIZE = 100000
+
+# The arrow types of the result columns of each postgres type (see
+# record_batches); the types of other columns are inferred from their values
+ARROW_TYPES = {
+    "text": "string",
+    "varchar": "string",
+    "int2": "int64",
+    "int4": "int64",
+    "int8": "int64",
+    "float4": "float64",
+    "float8": "float64",
+    "bool": "bool_",
+    "timestamp": "timestamp",
+}
+
+
+def _require_pyarrow(output_format):
+    if pa is None:
+        raise FLEXValueException(
+            f"The {output_format} output_format requires pyarrow. Install it with `pip install flexvalue[pyarrow]`."
+        )
+
+
+def _arrow_type(type_name):
+    arrow_type = ARROW_TYPES.get(type_name)
+    if arrow_type == "timestamp":
+        return pa.timestamp("us")
+    return getattr(pa, arrow_type)() if arrow_type else None
+
+
+def record_batches(columns, rows, output_format, types=None):
+    """Generator that converts the iterable of result rows (tuples in the
+    order of columns) to arrow record batches of up to ROW_GROUP_SIZE rows,
+    without materializing more than one batch of rows. types, if given, are
+    the postgres type names of the columns; the columns whose types are in
+    ARROW_TYPES get the same arrow type in every batch, even where a batch
+    has nothing but NULLs in them."""
+    _require_pyarrow(output_format)
+    columns = list(columns)
+    if types:
+        arrow_types = [_arrow_type(type_name) for type_name in types]
+    else:
+        arrow_types = [None] * len(columns)
+    rows = iter(rows)
+    while True:
+        chunk = list(islice(rows, ROW_GROUP_SIZE))
+        if not chunk:
+            return
+        yield pa.RecordBatch.from_arrays(
+            [
+                pa.array(values, type=arrow_type)
+                for values, arrow_type in zip(zip(*chunk), arrow_types)
+            ],
+            names=columns,
+        )
+
+
+def _schema(batch):
+    """The schema of the file, from its first record batch. Columns of
+    unknown type that are all NULL in it are written as float64, the type of
+    the calculation's benefits and savings."""
+    return pa.schema(
+        [
+            pa.field(field.name, pa.float64())
+            if pa.types.is_null(field.type)
+            else field
+            for field in batch.schema
+        ]
+    )
+
+
+def write_record_batches(path, batches, output_format, columns=None):
+    """Writes the iterable of arrow record batches to path (or a binary file
+    object), one at a time, as a snappy-compressed parquet file (a row group
+    per batch) or an arrow IPC file, depending on output_format. Batches
+    whose types differ from the first one's are cast to it. If there are no
+    batches, the file has the given columns, typed NULL, and no rows."""
+    _require_pyarrow(output_format)
+    batches = iter(batches)
+    first = next(batches, None)
+    if first is None:
+        schema = pa.schema([(column, pa.null()) for column in columns or []])
+    else:
+        schema = _schema(first)
+    if output_format == "parquet":
+        writer = pq.ParquetWriter(path, schema, compression="snappy")
+    else:
+        writer = pa.ipc.new_file(path, schema)
+    with writer:
+        if first is None:
+            return
+        for batch in chain([first], batches):
+            writer.write_table(pa.Table.from_batches([batch]).cast(schema))
@@ -0,0 +1,110 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+
+   Copyright 2021 Recurve Analytics, Inc.
+
+   Licensed under the Apache License, Version 2.0 (the "License");
+   you may not use this file except in compliance with the License.
+   You may obtain a copy of the License at
+
+       http://www.apache.org/licenses/LICENSE-2.0
+
+   Unless required by applicable law or agreed to in writing, software
+   distributed under the License is distributed on an "AS IS" BASIS,
+   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+   See the License for the specific language governing permissions and
+   limitations under the License.
+
+"""
+import logging
+import multiprocessing
+import time
+
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+    wait,
+)
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List
+
+from flexvalue.config import FLEXValueException
+
+__all__ = ("LoadStep", "run_load_steps")
+
+
+@dataclass
+class LoadStep:
+    """One table load: name identifies it (usually the table name), load does
+    the work, and depends_on names the steps that must finish before it starts.
+    Dependencies on steps that aren't scheduled are ignored."""
+
+    name: str
+    load: Callable[[], None]
+    depends_on: List[str] = field(default_factory=list)
+
+
+def _timed(step: LoadStep):
+    start = time.perf_counter()
+    step.load()
+    return time.perf_counter() - start
+
+
+def _executor(max_workers: int, processes: bool):
+    if processes:
+        # spawn rather than fork, so workers don't inherit (and later close)
+        # the parent's database connections
+        return ProcessPoolExecutor(
+            max_workers=max_workers, mp_context=multiprocessing.get_context("spawn")
+        )
+    return ThreadPoolExecutor(max_workers=max_workers)
+
+
+def run_load_steps(
+    steps: List[LoadStep], max_workers: int = 1, processes: bool = False
+) -> Dict[str, float]:
+    """Runs each step once the steps it depends on have finished, with up to
+    max_workers of them at a time. Each step runs in a worker thread or, if
+    processes is True, in a worker process (so the steps must be picklable and
+    CPU-bound parsing isn't serialized by the GIL). Steps are started in the
+    order given whenever there's a free worker, so with max_workers = 1 this is
+    a plain sequential load. Returns the number of seconds each step took, by
+    name, in the order they finished, and logs a summary.
+    If a step raises, no more steps are started, the ones already running are
+    waited for, and the exception is re-raised."""
+    names = {step.name for step in steps}
+    waiting = list(steps)
+    done = set()
+    timings = {}
+    running = {}
+    start = time.perf_counter()
+    max_workers = max(max_workers, 1)
+    with _executor(max_workers, processes) as executor:
+        while waiting or running:
+            for step in list(waiting):
+                if len(running) >= max_workers:
+                    break
+                if all(dep in done or dep not in names for dep in step.depends_on):
+                    waiting.remove(step)
+                    logging.debug(f"starting the {step.name} load")
+                    running[executor.submit(_timed, step)] = step
+            if not running:
+                raise FLEXValueException(
+                    f"The loads of {', '.join(step.name for step in waiting)} depend on each other, so none of them can start."
+                )
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                step = running.pop(future)
+                if future.exception() is not None:
+                    wait(running)
+                    raise future.exception()
+                timings[step.name] = future.result()
+                done.add(step.name)
+    if timings:
+        logging.info(
+            f"Loaded {len(timings)} tables in {time.perf_counter() - start:.1f}s: "
+            + ", ".join(f"{name} {seconds:.1f}s" for name, seconds in timings.items())
+        )
+    return timings
@@ -0,0 +1,26 @@
+CREATE TABLE elec_av_costs (
+    state TEXT,
+    utility_code SMALLINT,
+    region_code SMALLINT,
+    datetime TIMESTAMP,
+    year INTEGER,
+    quarter SMALLINT,
+    month SMALLINT,
+    date_str TEXT,
+    hour_of_day SMALLINT,
+    hour_of_year SMALLINT,
+    energy FLOAT,
+    losses FLOAT,
+    ancillary_services FLOAT,
+    capacity FLOAT,
+    transmission FLOAT,
+    distribution FLOAT,
+    cap_and_trade FLOAT,
+    ghg_adder FLOAT,
+    ghg_rebalancing FLOAT,
+    methane_leakage FLOAT,
+    total FLOAT,
+    marginal_ghg FLOAT,
+    ghg_adder_rebalancing FLOAT,
+    value_curve_name TEXT
+);
@@ -0,0 +1,12 @@
+CREATE TABLE elec_load_shape (
+    datetime TIMESTAMP,
+    state TEXT,
+    utility_code SMALLINT,
+    region_code SMALLINT,
+    quarter SMALLINT,
+    month SMALLINT,
+    hour_of_day SMALLINT,
+    hour_of_year SMALLINT,
+    load_shape_name_code SMALLINT,
+    value FLOAT
+);
@@ -0,0 +1,10 @@
+CREATE TABLE load_manifest (
+    table_name TEXT,
+    load_name TEXT,
+    source TEXT,
+    content_hash TEXT,
+    size BIGINT,
+    mtime FLOAT,
+    loaded_at TIMESTAMP,
+    PRIMARY KEY (table_name, load_name)
+);
\ No newline at end of file
@@ -0,0 +1,4 @@
+CREATE TABLE load_shape_name_codes (
+    code SMALLSERIAL PRIMARY KEY,
+    value TEXT UNIQUE NOT NULL
+);
\ No newline at end of file
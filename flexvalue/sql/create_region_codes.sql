@@ -0,0 +1,4 @@
+CREATE TABLE region_codes (
+    code SMALLSERIAL PRIMARY KEY,
+    value TEXT UNIQUE NOT NULL
+);
\ No newline at end of file
@@ -0,0 +1,4 @@
+CREATE TABLE schema_migrations (
+    name TEXT PRIMARY KEY,
+    applied_at TIMESTAMP
+);
\ No newline at end of file
@@ -0,0 +1,4 @@
+CREATE TABLE utility_codes (
+    code SMALLSERIAL PRIMARY KEY,
+    value TEXT UNIQUE NOT NULL
+);
\ No newline at end of file
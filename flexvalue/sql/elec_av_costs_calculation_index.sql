@@ -0,0 +1 @@
+CREATE INDEX IF NOT EXISTS elec_av_costs_calculation_index ON elec_av_costs (utility, region, value_curve_name, year, quarter);
\ No newline at end of file
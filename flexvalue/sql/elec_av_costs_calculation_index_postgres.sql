@@ -0,0 +1 @@
+CREATE INDEX IF NOT EXISTS elec_av_costs_calculation_index ON elec_av_costs (utility, region, value_curve_name, year, quarter) INCLUDE (datetime, month, hour_of_day, hour_of_year, energy, losses, ancillary_services, capacity, transmission, distribution, cap_and_trade, ghg_adder, ghg_rebalancing, methane_leakage, total, marginal_ghg, ghg_adder_rebalancing);
\ No newline at end of file
@@ -0,0 +1 @@
+CREATE INDEX IF NOT EXISTS elec_av_costs_curve_index ON elec_av_costs (value_curve_name);
\ No newline at end of file
@@ -0,0 +1 @@
+CREATE INDEX IF NOT EXISTS elec_load_shape_calculation_index ON elec_load_shape (utility, load_shape_name, hour_of_year);
\ No newline at end of file
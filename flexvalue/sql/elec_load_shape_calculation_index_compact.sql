@@ -0,0 +1 @@
+CREATE INDEX IF NOT EXISTS elec_load_shape_calculation_index ON elec_load_shape (utility_code, load_shape_name_code, hour_of_year) INCLUDE (value);
\ No newline at end of file
@@ -0,0 +1 @@
+CREATE INDEX IF NOT EXISTS gas_av_costs_calculation_index ON gas_av_costs (utility, value_curve_name, year, quarter);
\ No newline at end of file
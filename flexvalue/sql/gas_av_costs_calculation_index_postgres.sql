@@ -0,0 +1 @@
+CREATE INDEX IF NOT EXISTS gas_av_costs_calculation_index ON gas_av_costs (utility, value_curve_name, year, quarter) INCLUDE (datetime, month, market, t_d, environment, btm_methane, total, upstream_methane, marginal_ghg);
\ No newline at end of file
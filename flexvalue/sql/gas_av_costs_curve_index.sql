@@ -0,0 +1 @@
+CREATE INDEX IF NOT EXISTS gas_av_costs_curve_index ON gas_av_costs (value_curve_name);
\ No newline at end of file
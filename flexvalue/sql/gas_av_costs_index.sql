@@ -1,2 +0,0 @@
---CREATE INDEX IF NOT EXISTS gas_av_cost_index ON gas_av_costs (region, utility, state, year, quarter, month, total);
-CREATE INDEX IF NOT EXISTS gas_av_cost_index ON gas_av_costs (utility, state, quarter, month, total);
\ No newline at end of file
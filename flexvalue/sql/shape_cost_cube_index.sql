@@ -0,0 +1 @@
+CREATE INDEX IF NOT EXISTS shape_cost_cube_index ON shape_cost_cube (utility, region, load_shape_name, value_curve_name, year, quarter);
\ No newline at end of file
@@ -1 +0,0 @@
-CREATE INDEX IF NOT EXISTS therm_profile_index ON therms_profile (utility, month, quarter, profile_name, state, value);
\ No newline at end of file
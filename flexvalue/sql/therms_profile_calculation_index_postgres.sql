@@ -0,0 +1 @@
+CREATE INDEX IF NOT EXISTS therms_profile_calculation_index ON therms_profile (utility, profile_name, month) INCLUDE (value);
\ No newline at end of file
@@ -0,0 +1,9 @@
+CREATE TABLE {{ dataset }}.load_manifest (
+    table_name STRING,
+    load_name STRING,
+    source STRING,
+    content_hash STRING,
+    size INTEGER,
+    mtime FLOAT64,
+    loaded_at TIMESTAMP
+);
\ No newline at end of file
@@ -6,8 +6,18 @@ WITH project_costs AS (
         project_info.*,
         project_info.admin_cost + (((1 - project_info.ntg) * project_info.incentive_cost) + (project_info.ntg * project_info.measure_cost)) / (1 + (project_info.discount_rate / 4.0)) as trc_costs,
         project_info.admin_cost + (project_info.incentive_cost / (1 + (project_info.discount_rate / 4.0))) as pac_costs
+        {% if compact_schema -%}
+        , utility_codes.code AS utility_code
+        , region_codes.code AS region_code
+        , load_shape_name_codes.code AS load_shape_name_code
+        {% endif -%}
     FROM
     {{ project_info_table }} project_info
+    {% if compact_schema -%}
+    LEFT JOIN utility_codes ON utility_codes.value = project_info.utility
+    LEFT JOIN region_codes ON region_codes.value = project_info.region
+    LEFT JOIN load_shape_name_codes ON load_shape_name_codes.value = project_info.load_shape
+    {% endif -%}
 ),
 project_costs_with_discounted_elec_av AS (
     SELECT
@@ -23,27 +33,32 @@ project_costs_with_discounted_elec_av AS (
         elec_av_costs.cap_and_trade, elec_av_costs.ghg_adder, elec_av_costs.ghg_rebalancing,
         elec_av_costs.methane_leakage, elec_av_costs.total, elec_av_costs.marginal_ghg,
         elec_av_costs.ghg_adder_rebalancing,
-        1.0 / POW(1.0 + (project_costs.discount_rate / 4.0), ((elec_av_costs.year - project_costs.start_year) * 4) + elec_av_costs.quarter - project_costs.start_quarter) AS discount
+        discount_factors.discount AS discount
     FROM project_costs
+    JOIN discount_factors ON discount_factors.id = project_costs.id
     JOIN
         {{ eac_table }} elec_av_costs
+        {% if compact_schema -%}
+        ON elec_av_costs.utility_code = project_costs.utility_code
+            AND elec_av_costs.region_code = project_costs.region_code
+        {% else -%}
         ON elec_av_costs.utility = project_costs.utility
             AND elec_av_costs.region = project_costs.region
+        {% endif -%}
+            AND elec_av_costs.year = discount_factors.year
+            AND elec_av_costs.quarter = discount_factors.quarter
             {% if use_value_curve_name_for_join -%}
             AND elec_av_costs.value_curve_name = project_costs.value_curve_name
             {% endif -%}
-            {% if database_type == "postgresql" -%}
-            AND elec_av_costs.datetime >= make_timestamp(project_costs.start_year, (project_costs.start_quarter - 1) * 3 + 1, 1, 0, 0, 0)
-            AND elec_av_costs.datetime < make_timestamp(project_costs.start_year, (project_costs.start_quarter - 1) * 3 + 1, 1, 0, 0, 0) + make_interval(project_costs.eul)
-            {% else -%}
-            AND elec_av_costs.datetime >= CAST(DATE(project_costs.start_year, (project_costs.start_quarter - 1) * 3 + 1, 1) AS DATETIME)
-            AND elec_av_costs.datetime < CAST(DATE(CAST(project_costs.start_year + project_costs.eul AS INT), (project_costs.start_quarter - 1) * 3 + 1, 1) AS DATETIME)
-            {% endif -%}
 ),
 elec_calculations AS (
     SELECT
     pcwdea.id
+    {% if compact_schema -%}
+    , elec_load_shape.load_shape_name_code AS load_shape_name
+    {% else -%}
     , elec_load_shape.load_shape_name
+    {% endif -%}
     {% for column in elec_aggregation_columns -%}
     , pcwdea.{{ column }}
     {% endfor -%}
@@ -66,10 +81,15 @@ elec_calculations AS (
     {% endfor -%}
     FROM project_costs_with_discounted_elec_av pcwdea
     JOIN {{ els_table }} elec_load_shape
-        ON UPPER(elec_load_shape.load_shape_name) = UPPER(pcwdea.load_shape)
+        {% if compact_schema -%}
+        ON elec_load_shape.load_shape_name_code = pcwdea.load_shape_name_code
+            AND elec_load_shape.utility_code = pcwdea.utility_code
+        {% else -%}
+        ON elec_load_shape.load_shape_name = {% if database_type == "bigquery" %}UPPER(pcwdea.load_shape){% else %}pcwdea.load_shape{% endif %}
             AND elec_load_shape.utility = pcwdea.utility
+        {% endif -%}
             AND elec_load_shape.hour_of_year = pcwdea.hour_of_year
-    GROUP BY pcwdea.id, pcwdea.eul, pcwdea.datetime, elec_load_shape.load_shape_name
+    GROUP BY pcwdea.id, pcwdea.eul, pcwdea.datetime, elec_load_shape.{{ "load_shape_name_code" if compact_schema else "load_shape_name" }}
     {% for field in elec_addl_fields if not field == "datetime" -%}
     , pcwdea.{{ field }}
     {% endfor -%}
@@ -83,22 +103,18 @@ elec_calculations AS (
         , gas_av_costs.quarter
         , gas_av_costs.total, gas_av_costs.market, gas_av_costs.t_d
         , gas_av_costs.environment, gas_av_costs.btm_methane, gas_av_costs.upstream_methane, gas_av_costs.marginal_ghg
-        , 1.0 / POW(1.0 + (project_costs.discount_rate / 4.0), ((gas_av_costs.year - project_costs.start_year) * 4) + gas_av_costs.quarter - project_costs.start_quarter) AS discount
+        , discount_factors.discount AS discount
         , gas_av_costs.datetime
     FROM project_costs
+    JOIN discount_factors ON discount_factors.id = project_costs.id
     JOIN 
       {{ gac_table }} gas_av_costs
         ON gas_av_costs.utility = project_costs.utility
+            AND gas_av_costs.year = discount_factors.year
+            AND gas_av_costs.quarter = discount_factors.quarter
             {% if use_value_curve_name_for_join -%}
             AND gas_av_costs.value_curve_name = project_costs.value_curve_name
             {% endif -%}
-            {% if database_type == "postgresql" -%}
-            AND gas_av_costs.datetime >= make_timestamp(project_costs.start_year, (project_costs.start_quarter - 1) * 3 + 1, 1, 0, 0, 0)
-            AND gas_av_costs.datetime < make_timestamp(project_costs.start_year, (project_costs.start_quarter - 1) * 3 + 1, 1, 0, 0, 0) + make_interval(project_costs.eul)
-            {% else -%}
-            AND gas_av_costs.datetime >= CAST(DATE(project_costs.start_year, (project_costs.start_quarter - 1) * 3 + 1, 1) AS DATETIME)
-            AND gas_av_costs.datetime < CAST(DATE(CAST(project_costs.start_year + project_costs.eul AS INT), (project_costs.start_quarter - 1) * 3 + 1, 1) AS DATETIME)
-            {% endif -%}
 ),
 gas_calculations AS (
     SELECT pcwdga.id
@@ -125,7 +141,7 @@ gas_calculations AS (
     , pcwdga.datetime
     FROM project_costs_with_discounted_gas_av pcwdga
     JOIN {{ therms_profile_table }} therms_profile
-        ON UPPER(pcwdga.therms_profile) = UPPER(therms_profile.profile_name)
+        ON therms_profile.profile_name = {% if database_type == "bigquery" %}UPPER(pcwdga.therms_profile){% else %}pcwdga.therms_profile{% endif %}
             AND therms_profile.utility = pcwdga.utility
             AND therms_profile.month = pcwdga.month
     GROUP BY pcwdga.id, pcwdga.eul, pcwdga.datetime, therms_profile.profile_name
@@ -134,7 +150,7 @@ gas_calculations AS (
  )
 
 SELECT
-{% if database_type == "postgresql" -%}
+{% if database_type in ["postgresql", "duckdb"] -%}
 CASE
     WHEN elec_calculations.load_shape_name is NULL
         THEN gas_calculations.id
@@ -0,0 +1,19 @@
+WITH RECURSIVE project_quarters AS (
+    SELECT
+        id, discount_rate, eul * 4 AS num_quarters,
+        start_year AS year, start_quarter AS quarter, 0 AS quarter_offset
+    FROM {{ project_info_table }}
+    WHERE eul > 0
+    UNION ALL
+    SELECT
+        id, discount_rate, num_quarters,
+        CASE WHEN quarter = 4 THEN year + 1 ELSE year END,
+        CASE WHEN quarter = 4 THEN 1 ELSE quarter + 1 END,
+        quarter_offset + 1
+    FROM project_quarters
+    WHERE quarter_offset + 1 < num_quarters
+)
+SELECT
+    id, year, quarter,
+    1.0 / POW(1.0 + (discount_rate / 4.0), quarter_offset) AS discount
+FROM project_quarters
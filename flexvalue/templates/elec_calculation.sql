@@ -6,9 +6,111 @@ WITH project_costs AS (
         project_info.*,
         project_info.admin_cost + (((1 - project_info.ntg) * project_info.incentive_cost) + (project_info.ntg * project_info.measure_cost)) / (1 + (project_info.discount_rate / 4.0)) as trc_costs,
         project_info.admin_cost + (project_info.incentive_cost / (1 + (project_info.discount_rate / 4.0))) as pac_costs
+        {% if compact_schema -%}
+        , utility_codes.code AS utility_code
+        , region_codes.code AS region_code
+        , load_shape_name_codes.code AS load_shape_name_code
+        {% endif -%}
     FROM
     {{ project_info_table }} project_info
+    {% if compact_schema -%}
+    LEFT JOIN utility_codes ON utility_codes.value = project_info.utility
+    LEFT JOIN region_codes ON region_codes.value = project_info.region
+    LEFT JOIN load_shape_name_codes ON load_shape_name_codes.value = project_info.load_shape
+    {% endif -%}
+),
+{% if quarterly_elec_aggregation -%}
+{% set utility = "utility_code" if compact_schema else "utility" -%}
+{% set region = "region_code" if compact_schema else "region" -%}
+{% set load_shape_name = "load_shape_name_code" if compact_schema else "load_shape_name" -%}
+{% if compact_schema -%}
+{% set project_load_shape = "project_costs.load_shape_name_code" -%}
+{% elif database_type == "bigquery" -%}
+{% set project_load_shape = "UPPER(project_costs.load_shape)" -%}
+{% else -%}
+{% set project_load_shape = "project_costs.load_shape" -%}
+{% endif -%}
+{% if not shape_cost_cube -%}
+project_shapes AS (
+    SELECT DISTINCT
+        project_costs.{{ utility }} AS utility,
+        project_costs.{{ region }} AS region,
+        {{ project_load_shape }} AS load_shape_name
+        {% if use_value_curve_name_for_join -%}
+        , project_costs.value_curve_name
+        {% endif -%}
+    FROM project_costs
+),
+quarterly_shape_costs AS (
+    SELECT
+        project_shapes.utility,
+        project_shapes.region,
+        project_shapes.load_shape_name,
+        {% if use_value_curve_name_for_join -%}
+        project_shapes.value_curve_name,
+        {% endif -%}
+        elec_av_costs.year,
+        elec_av_costs.quarter,
+        SUM(elec_load_shape.value) AS value,
+        SUM(elec_load_shape.value * elec_av_costs.total) AS total,
+        {% for component in elec_components if component != 'marginal_ghg' -%}
+        SUM(elec_load_shape.value * elec_av_costs.{{ component }}) AS {{ component }},
+        {% endfor -%}
+        SUM(elec_load_shape.value * elec_av_costs.marginal_ghg) AS marginal_ghg
+    FROM project_shapes
+    JOIN
+        {{ eac_table }} elec_av_costs
+        ON elec_av_costs.{{ utility }} = project_shapes.utility
+            AND elec_av_costs.{{ region }} = project_shapes.region
+            {% if use_value_curve_name_for_join -%}
+            AND elec_av_costs.value_curve_name = project_shapes.value_curve_name
+            {% endif -%}
+    JOIN {{ els_table }} elec_load_shape
+        ON elec_load_shape.{{ load_shape_name }} = project_shapes.load_shape_name
+            AND elec_load_shape.{{ utility }} = project_shapes.utility
+            AND elec_load_shape.hour_of_year = elec_av_costs.hour_of_year
+    GROUP BY
+        project_shapes.utility, project_shapes.region, project_shapes.load_shape_name,
+        {% if use_value_curve_name_for_join -%}
+        project_shapes.value_curve_name,
+        {% endif -%}
+        elec_av_costs.year, elec_av_costs.quarter
 ),
+{% endif -%}
+elec_calculations AS (
+    SELECT
+    project_costs.id
+    {% for column in elec_aggregation_columns -%}
+    , {{ "project_costs" if column == "region" else "discount_factors" }}.{{ column }}
+    {% endfor -%}
+    , SUM(project_costs.units * project_costs.ntg * project_costs.mwh_savings * discount_factors.discount * quarterly_shape_costs.total) AS electric_benefits
+    {% for component in elec_components -%}
+    {% if component == 'marginal_ghg' -%}
+    , SUM(project_costs.units * project_costs.ntg * project_costs.mwh_savings * quarterly_shape_costs.{{component}}) AS {{component}}
+    {% else -%}
+    , SUM(project_costs.units * project_costs.ntg * project_costs.mwh_savings * discount_factors.discount * quarterly_shape_costs.{{component}}) AS {{component}}
+    {% endif -%}
+    {% endfor -%}
+    , SUM(project_costs.units * project_costs.ntg * project_costs.mwh_savings * quarterly_shape_costs.value) / CAST(project_costs.eul AS {{ float_type }}) as annual_net_mwh_savings
+    , SUM(project_costs.units * project_costs.ntg * project_costs.mwh_savings * quarterly_shape_costs.value) as lifecycle_net_mwh_savings
+    , MAX(project_costs.trc_costs) AS trc_costs
+    , MAX(project_costs.pac_costs) AS pac_costs
+    , SUM(project_costs.units * project_costs.ntg * project_costs.mwh_savings * quarterly_shape_costs.marginal_ghg) as lifecycle_elec_ghg_savings
+    FROM project_costs
+    JOIN discount_factors ON discount_factors.id = project_costs.id
+    JOIN {% if shape_cost_cube %}shape_cost_cube {% endif %}quarterly_shape_costs
+        ON quarterly_shape_costs.utility = project_costs.{{ utility }}
+            AND quarterly_shape_costs.region = project_costs.{{ region }}
+            AND quarterly_shape_costs.load_shape_name = {{ project_load_shape }}
+            {% if use_value_curve_name_for_join -%}
+            AND quarterly_shape_costs.value_curve_name = project_costs.value_curve_name
+            {% endif -%}
+            AND quarterly_shape_costs.year = discount_factors.year
+            AND quarterly_shape_costs.quarter = discount_factors.quarter
+    GROUP BY project_costs.id, project_costs.eul
+    {%- for column in elec_aggregation_columns %}, {{ "project_costs" if column == "region" else "discount_factors" }}.{{ column }}{% endfor %}
+)
+{% else -%}
 project_costs_with_discounted_elec_av AS (
     SELECT
         project_costs.*,
@@ -23,28 +125,33 @@ project_costs_with_discounted_elec_av AS (
         elec_av_costs.cap_and_trade, elec_av_costs.ghg_adder, elec_av_costs.ghg_rebalancing,
         elec_av_costs.methane_leakage, elec_av_costs.total, elec_av_costs.marginal_ghg,
         elec_av_costs.ghg_adder_rebalancing,
-        1.0 / POW(1.0 + (project_costs.discount_rate / 4.0), ((elec_av_costs.year - project_costs.start_year) * 4) + elec_av_costs.quarter - project_costs.start_quarter) AS discount
+        discount_factors.discount AS discount
         , ((elec_av_costs.year - project_costs.start_year) * 4) + elec_av_costs.quarter - project_costs.start_quarter + 1 as eul_quarter
     FROM project_costs
+    JOIN discount_factors ON discount_factors.id = project_costs.id
     JOIN 
         {{ eac_table }} elec_av_costs
+        {% if compact_schema -%}
+        ON elec_av_costs.utility_code = project_costs.utility_code
+            AND elec_av_costs.region_code = project_costs.region_code
+        {% else -%}
         ON elec_av_costs.utility = project_costs.utility
             AND elec_av_costs.region = project_costs.region
+        {% endif -%}
+            AND elec_av_costs.year = discount_factors.year
+            AND elec_av_costs.quarter = discount_factors.quarter
             {% if use_value_curve_name_for_join -%}
             AND elec_av_costs.value_curve_name = project_costs.value_curve_name
             {% endif -%}
-            {% if database_type == "postgresql" -%}
-            AND elec_av_costs.datetime >= make_timestamp(project_costs.start_year, (project_costs.start_quarter - 1) * 3 + 1, 1, 0, 0, 0)
-            AND elec_av_costs.datetime < make_timestamp(project_costs.start_year, (project_costs.start_quarter - 1) * 3 + 1, 1, 0, 0, 0) + make_interval(project_costs.eul)
-            {% else %}
-            AND elec_av_costs.datetime >= CAST(DATE(project_costs.start_year, (project_costs.start_quarter - 1) * 3 + 1, 1) AS DATETIME)
-            AND elec_av_costs.datetime < CAST(DATE(CAST(project_costs.start_year + project_costs.eul AS INT), (project_costs.start_quarter - 1) * 3 + 1, 1) AS DATETIME)
-            {% endif -%}
 ),
 elec_calculations AS (
     SELECT
     pcwdea.id
+    {% if compact_schema -%}
+    , elec_load_shape.load_shape_name_code AS load_shape_name
+    {% else -%}
     , elec_load_shape.load_shape_name
+    {% endif -%}
     {% for column in elec_aggregation_columns -%}
     , pcwdea.{{ column }}
     {% endfor -%}
@@ -67,19 +174,25 @@ elec_calculations AS (
     {% endfor -%}
     FROM project_costs_with_discounted_elec_av pcwdea
     JOIN {{ els_table}} elec_load_shape
-        ON UPPER(elec_load_shape.load_shape_name) = UPPER(pcwdea.load_shape)
+        {% if compact_schema -%}
+        ON elec_load_shape.load_shape_name_code = pcwdea.load_shape_name_code
+            AND elec_load_shape.utility_code = pcwdea.utility_code
+        {% else -%}
+        ON elec_load_shape.load_shape_name = {% if database_type == "bigquery" %}UPPER(pcwdea.load_shape){% else %}pcwdea.load_shape{% endif %}
             AND elec_load_shape.utility = pcwdea.utility
+        {% endif -%}
             AND elec_load_shape.hour_of_year = pcwdea.hour_of_year
-    GROUP BY pcwdea.id, pcwdea.eul, pcwdea.datetime, elec_load_shape.load_shape_name
+    GROUP BY pcwdea.id, pcwdea.eul, pcwdea.datetime, elec_load_shape.{{ "load_shape_name_code" if compact_schema else "load_shape_name" }}
     {% for field in elec_addl_fields if not field == "datetime" -%}
     , pcwdea.{{field}}
     {% endfor -%}
     {%- for column in elec_aggregation_columns %}, pcwdea.{{ column }}{% endfor %}
 )
+{% endif -%}
 
 SELECT
 elec_calculations.id
-{% if database_type == "postgresql" -%}
+{% if database_type in ["postgresql", "duckdb"] -%}
 , CASE
     WHEN MAX(elec_calculations.trc_costs) = 0 AND SUM(elec_calculations.electric_benefits) > 0 then FLOAT 'inf'
     WHEN MAX(elec_calculations.trc_costs) = 0 AND SUM(elec_calculations.electric_benefits) < 0 then FLOAT '-inf'
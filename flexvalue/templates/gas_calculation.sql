@@ -17,23 +17,19 @@ WITH project_costs AS (
         , gas_av_costs.quarter
         , gas_av_costs.total, gas_av_costs.market, gas_av_costs.t_d
         , gas_av_costs.environment, gas_av_costs.btm_methane, gas_av_costs.upstream_methane, gas_av_costs.marginal_ghg
-        , 1.0 / POW(1.0 + (project_costs.discount_rate / 4.0), ((gas_av_costs.year - project_costs.start_year) * 4) + gas_av_costs.quarter - project_costs.start_quarter) AS discount
+        , discount_factors.discount AS discount
         , ((gas_av_costs.year - project_costs.start_year) * 4) + gas_av_costs.quarter - project_costs.start_quarter + 1 as eul_quarter
         , gas_av_costs.datetime
     FROM project_costs
+    JOIN discount_factors ON discount_factors.id = project_costs.id
     JOIN 
       {{ gac_table }} gas_av_costs
         ON gas_av_costs.utility = project_costs.utility
+            AND gas_av_costs.year = discount_factors.year
+            AND gas_av_costs.quarter = discount_factors.quarter
             {% if use_value_curve_name_for_join -%}
             AND gas_av_costs.value_curve_name = project_costs.value_curve_name
             {% endif -%}
-            {% if database_type == "postgresql" %}
-            AND gas_av_costs.datetime >= make_timestamp(project_costs.start_year, (project_costs.start_quarter - 1) * 3 + 1, 1, 0, 0, 0)
-            AND gas_av_costs.datetime < make_timestamp(project_costs.start_year, (project_costs.start_quarter - 1) * 3 + 1, 1, 0, 0, 0) + make_interval(project_costs.eul)
-            {% else %}
-            AND gas_av_costs.datetime >= CAST(DATE(project_costs.start_year, (project_costs.start_quarter - 1) * 3 + 1, 1) AS DATETIME)
-            AND gas_av_costs.datetime < CAST(DATE(CAST(project_costs.start_year + project_costs.eul AS INT), (project_costs.start_quarter - 1) * 3 + 1, 1) AS DATETIME)
-            {% endif %}
 ),
 gas_calculations AS (
     SELECT pcwdga.id
@@ -60,7 +56,7 @@ gas_calculations AS (
     {% endfor -%}
     FROM project_costs_with_discounted_gas_av pcwdga
     JOIN {{ therms_profile_table }} therms_profile
-        ON UPPER(pcwdga.therms_profile) = UPPER(therms_profile.profile_name)
+        ON therms_profile.profile_name = {% if database_type == "bigquery" %}UPPER(pcwdga.therms_profile){% else %}pcwdga.therms_profile{% endif %}
             AND therms_profile.utility = pcwdga.utility
             AND therms_profile.month = pcwdga.month
     GROUP BY pcwdga.id, pcwdga.eul, pcwdga.total, therms_profile.value
@@ -73,7 +69,7 @@ gas_calculations AS (
 SELECT
 gas_calculations.id
 , SUM(gas_calculations.total) as total
-{% if database_type == "postgresql" -%}
+{% if database_type in ["postgresql", "duckdb"] -%}
 , CASE
     WHEN MAX(gas_calculations.trc_costs) = 0 AND SUM(gas_calculations.gas_benefits) > 0 then FLOAT 'inf'
     WHEN MAX(gas_calculations.trc_costs) = 0 AND SUM(gas_calculations.gas_benefits) < 0 then FLOAT '-inf'
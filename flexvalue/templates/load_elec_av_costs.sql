@@ -3,7 +3,7 @@ INSERT INTO elec_av_costs (
 	state,
     utility,
     region,
-    date_time,
+    datetime,
     year,
     quarter,
     month,
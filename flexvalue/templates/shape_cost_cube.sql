@@ -0,0 +1,24 @@
+{% set utility = "utility_code" if compact_schema else "utility" -%}
+{% set region = "region_code" if compact_schema else "region" -%}
+{% set load_shape_name = "load_shape_name_code" if compact_schema else "load_shape_name" -%}
+SELECT
+    elec_av_costs.{{ utility }} AS utility,
+    elec_av_costs.{{ region }} AS region,
+    elec_load_shape.{{ load_shape_name }} AS load_shape_name,
+    elec_av_costs.value_curve_name,
+    elec_av_costs.year,
+    elec_av_costs.quarter,
+    SUM(elec_load_shape.value) AS value
+    {% for component in cost_components -%}
+    , SUM(elec_load_shape.value * elec_av_costs.{{ component }}) AS {{ component }}
+    {% endfor -%}
+FROM {{ eac_table }} elec_av_costs
+JOIN {{ els_table }} elec_load_shape
+    ON elec_load_shape.{{ utility }} = elec_av_costs.{{ utility }}
+        AND elec_load_shape.hour_of_year = elec_av_costs.hour_of_year
+{% if cube_filter -%}
+WHERE {{ cube_filter }}
+{% endif -%}
+GROUP BY
+    elec_av_costs.{{ utility }}, elec_av_costs.{{ region }}, elec_load_shape.{{ load_shape_name }},
+    elec_av_costs.value_curve_name, elec_av_costs.year, elec_av_costs.quarter
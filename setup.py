@@ -41,6 +41,13 @@ INSTALL_REQUIRES = [
     "google-cloud-bigquery>=2.34.3",
 ]
 
+EXTRAS_REQUIRE = {
+    "pyarrow": ["pyarrow>=7.0.0"],
+    "numpy": ["numpy>=1.21"],
+    "duckdb": ["duckdb>=0.10", "duckdb-engine>=0.11"],
+    "bigquery-storage": ["google-cloud-bigquery-storage>=2.0", "pyarrow>=7.0.0"],
+}
+
 here = os.path.abspath(os.path.dirname(__file__))
 
 # Load the package's __version__.py module as a dictionary.
@@ -96,6 +103,7 @@ setup(
     packages=find_packages(exclude=("tests", "db", "notebooks", "docs")),
     entry_points={"console_scripts": ["flexvalue=flexvalue.cli:cli"]},
     install_requires=INSTALL_REQUIRES,
+    extras_require=EXTRAS_REQUIRE,
     include_package_data=True,
     classifiers=[
         "License :: OSI Approved :: Apache Software License",
@@ -0,0 +1,155 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+
+   Copyright 2021 Recurve Analytics, Inc.
+
+   Licensed under the Apache License, Version 2.0 (the "License");
+   you may not use this file except in compliance with the License.
+   You may obtain a copy of the License at
+
+       http://www.apache.org/licenses/LICENSE-2.0
+
+   Unless required by applicable law or agreed to in writing, software
+   distributed under the License is distributed on an "AS IS" BASIS,
+   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+   See the License for the specific language governing permissions and
+   limitations under the License.
+
+"""
+
+import csv
+import io
+import types
+
+import pytest
+
+from google import api_core
+
+from flexvalue import db
+from flexvalue.config import FLEXValueConfig
+
+try:
+    import pyarrow as pa
+except ImportError:
+    pa = None
+
+
+class FakeReadClient:
+    """Stands in for bigquery_storage.BigQueryReadClient."""
+
+
+class FakeRowIterator:
+    """The result of a query, or the rows of a table, as the
+    bigquery.table.RowIterator it stands in for returns them: rows through the
+    REST API, and record batches (one per row) through to_arrow_iterable. Like
+    a RowIterator, it only uses the Storage Read API with the rows of a table
+    (a query job's own result has none if the query is a script); it records
+    the read client it used, if any, on client."""
+
+    def __init__(self, client, table=None):
+        self.client = client
+        self.table = table
+        self.schema = client.result_schema
+
+    def __iter__(self):
+        return (
+            types.SimpleNamespace(values=lambda row=row: row)
+            for row in self.client.result_rows
+        )
+
+    def to_arrow_iterable(self, bqstorage_client=None):
+        self.client.bqstorage_clients.append(
+            bqstorage_client if self.table is not None else None
+        )
+        for row in self.client.result_rows:
+            yield pa.RecordBatch.from_pylist(
+                [dict(zip(self.schema.names, row))], schema=self.schema
+            )
+
+
+class FakeBigQueryClient:
+    """Stands in for bigquery.Client, recording the load jobs it runs (with
+    the rows they upload), the copy jobs, the deleted tables, the queries and
+    the tables whose rows are listed. Load jobs fail with the rows in
+    fail_rows. Every query is a script of two statements, whose jobs write to
+    the tables "statement0" and "statement1", and every result, or table, has
+    result_rows, with the arrow schema result_schema."""
+
+    def __init__(self, project=None):
+        self.loads = []
+        self.copies = []
+        self.deleted_tables = []
+        self.queries = []
+        self.listed_tables = []
+        self.bqstorage_clients = []
+        self.fail_rows = None
+        self.result_rows = []
+        self.result_schema = None
+
+    def load_table_from_file(self, file_obj, table_name, job_config=None):
+        rows = list(csv.reader(io.TextIOWrapper(file_obj, encoding="utf-8")))
+        if self.fail_rows is not None and self.fail_rows in rows:
+            raise api_core.exceptions.BadRequest("Could not parse the rows")
+        self.loads.append((table_name, job_config, rows))
+        return types.SimpleNamespace(result=lambda: None)
+
+    def copy_table(self, source_table, target_table, job_config=None):
+        self.copies.append((source_table, target_table, job_config))
+        return types.SimpleNamespace(result=lambda: None)
+
+    def delete_table(self, table_name, not_found_ok=False):
+        self.deleted_tables.append(table_name)
+
+    def query(self, sql, job_config=None):
+        self.queries.append(sql)
+        return types.SimpleNamespace(
+            job_id="script",
+            result=lambda page_size=None: FakeRowIterator(self),
+        )
+
+    def list_jobs(self, parent_job=None):
+        assert parent_job.job_id == "script"
+        # newest first
+        return [
+            types.SimpleNamespace(
+                created=statement, destination=f"statement{statement}"
+            )
+            for statement in [1, 0]
+        ]
+
+    def list_rows(self, table, page_size=None):
+        self.listed_tables.append(table)
+        return FakeRowIterator(self, table)
+
+    def get_table(self, table_name):
+        raise db.NotFound(table_name)
+
+
+@pytest.fixture
+def bigquery_manager(monkeypatch):
+    """A factory of BigQueryManagers whose client is a FakeBigQueryClient and
+    whose Storage Read API client is a FakeReadClient, for the inputs.*
+    tables and the given config settings."""
+    monkeypatch.setattr(db.bigquery, "Client", FakeBigQueryClient)
+    monkeypatch.setattr(
+        db,
+        "bigquery_storage",
+        types.SimpleNamespace(BigQueryReadClient=FakeReadClient),
+    )
+
+    def manager(**kwargs):
+        config = FLEXValueConfig(
+            database_type="bigquery",
+            project="test-project",
+            project_info_table="inputs.project_info",
+            elec_load_shape_table="inputs.elec_load_shape",
+            therms_profiles_table="inputs.therms_profile",
+            elec_av_costs_table="inputs.elec_av_costs",
+            gas_av_costs_table="inputs.gas_av_costs",
+            **kwargs,
+        )
+        config.validate()
+        return db.DBManager.get_db_manager(config)
+
+    return manager
@@ -0,0 +1,130 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+
+   Copyright 2021 Recurve Analytics, Inc.
+
+   Licensed under the Apache License, Version 2.0 (the "License");
+   you may not use this file except in compliance with the License.
+   You may obtain a copy of the License at
+
+       http://www.apache.org/licenses/LICENSE-2.0
+
+   Unless required by applicable law or agreed to in writing, software
+   distributed under the License is distributed on an "AS IS" BASIS,
+   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+   See the License for the specific language governing permissions and
+   limitations under the License.
+
+"""
+
+import pytest
+
+from google import api_core
+
+from flexvalue import db
+
+
+@pytest.fixture
+def bigquery_manager(bigquery_manager):
+    return bigquery_manager(output_table="outputs.results", load_chunk_size=2)
+
+
+def test_load_elec_av_costs_file(bigquery_manager, tmp_path):
+    path = tmp_path / "elec_av_costs.csv"
+    path.write_text(
+        ",".join(db.ELEC_AVOIDED_COSTS_FIELDS)
+        + "\n"
+        + "".join(
+            f"CA,PGE,3A,2021-01-01 0{hour}:00:00 UTC,2021,1,1,{hour},{hour},"
+            + ",".join(["0.5"] * 13)
+            + ",ACC2020\n"
+            for hour in range(5)
+        )
+    )
+    bigquery_manager.process_elec_av_costs(str(path))
+    client = bigquery_manager.client
+    loads = client.loads
+    # five rows in jobs of two into the staging table: the first replaces it,
+    # the rest append to it
+    assert [len(rows) for _, _, rows in loads] == [2, 2, 1]
+    assert {table_name for table_name, _, _ in loads} == {
+        "inputs.elec_av_costs_staging"
+    }
+    dispositions = [job_config.write_disposition for _, job_config, _ in loads]
+    assert dispositions[0] == "WRITE_TRUNCATE"
+    assert dispositions[1:] == ["WRITE_APPEND"] * 2
+    # which then replaces the table with one copy job
+    [(source_table, target_table, job_config)] = client.copies
+    assert (source_table, target_table) == (
+        "inputs.elec_av_costs_staging",
+        "inputs.elec_av_costs",
+    )
+    assert job_config.write_disposition == "WRITE_TRUNCATE"
+    assert client.deleted_tables == ["inputs.elec_av_costs_staging"]
+    schema = loads[0][1].schema
+    assert [field.name for field in schema] == db.ELEC_AVOIDED_COSTS_FIELDS
+    assert schema[3].field_type == "DATETIME"
+    rows = sorted(row for _, _, rows in loads for row in rows)
+    assert rows[0][:5] == ["CA", "PGE", "3A", "2021-01-01 00:00:00", "2021"]
+
+
+def test_failed_load_leaves_the_table_unchanged(bigquery_manager, tmp_path):
+    path = tmp_path / "project_info.csv"
+    path.write_text(
+        "".join(
+            f"p{i},CA,PGE,3A,1.5,0,Res_A,annual,2021,1,1,1,0.9,0.0766,100,1000,500,ACC2020\n"
+            for i in range(5)
+        )
+    )
+    client = bigquery_manager.client
+    client.fail_rows = path.read_text().splitlines()[4].split(",")
+    with pytest.raises(api_core.exceptions.BadRequest):
+        bigquery_manager.process_project_info(str(path))
+    assert {table_name for table_name, _, _ in client.loads} == {
+        "inputs.project_info_staging"
+    }
+    assert client.copies == []
+    assert client.deleted_tables == ["inputs.project_info_staging"]
+
+
+def test_load_elec_load_shape_file(bigquery_manager, tmp_path):
+    path = tmp_path / "elec_load_shape.csv"
+    path.write_text(
+        "state,utility,region,quarter,month,hour_of_day,hour_of_year,Res_A,RES_B\n"
+        "CA,PGE,3A,1,1,0,0,0.1,0.2\n"
+    )
+    bigquery_manager.process_elec_load_shape(str(path))
+    table_name, job_config, rows = bigquery_manager.client.loads[0]
+    assert table_name == "inputs.elec_load_shape_staging"
+    assert [(field.name, field.field_type) for field in job_config.schema][-3:] == [
+        ("hour_of_year", "INT64"),
+        ("Res_A", "FLOAT64"),
+        ("RES_B", "FLOAT64"),
+    ]
+    assert rows == [["CA", "PGE", "3A", "1", "1", "0", "0", "0.1", "0.2"]]
+    # the uploaded table is then unpivoted into outputs.elec_load_shape
+    assert "inputs.elec_load_shape" in bigquery_manager.client.queries[-1]
+
+
+def test_load_project_info_file_without_header(bigquery_manager, tmp_path):
+    path = tmp_path / "project_info.csv"
+    path.write_text(
+        "p0,CA,PGE,3A,1.5,0,Res_A,annual,2021,1,1,1,0.9,0.0766,100,1000,500,ACC2020\n"
+        "p1,CA,PGE,3A,2.5,100,res_b,annual,2021,3,2,1,0.8,0.0766,100,1000,500,ACC2020\n"
+    )
+    bigquery_manager.process_project_info(str(path))
+    loads = bigquery_manager.client.loads
+    assert {table_name for table_name, _, _ in loads} == {
+        "inputs.project_info_staging"
+    }
+    assert [field.name for field in loads[0][1].schema] == db.PROJECT_INFO_FIELDS
+    assert [row for _, _, rows in loads for row in rows] == [
+        line.split(",") for line in path.read_text().splitlines()
+    ]
+
+
+def test_tables_are_used_as_they_are(bigquery_manager):
+    bigquery_manager.process_project_info("inputs.project_info")
+    bigquery_manager.process_elec_av_costs("inputs.elec_av_costs")
+    assert bigquery_manager.client.loads == []
@@ -0,0 +1,91 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+
+   Copyright 2021 Recurve Analytics, Inc.
+
+   Licensed under the Apache License, Version 2.0 (the "License");
+   you may not use this file except in compliance with the License.
+   You may obtain a copy of the License at
+
+       http://www.apache.org/licenses/LICENSE-2.0
+
+   Unless required by applicable law or agreed to in writing, software
+   distributed under the License is distributed on an "AS IS" BASIS,
+   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+   See the License for the specific language governing permissions and
+   limitations under the License.
+
+"""
+
+from datetime import datetime, timezone
+
+import pytest
+
+from flexvalue.config import FLEXValueConfig, FLEXValueException
+
+pa = pytest.importorskip("pyarrow")
+pq = pytest.importorskip("pyarrow.parquet")
+
+COLUMNS = ["id", "trc_ratio", "start"]
+SCHEMA = pa.schema(
+    [
+        ("id", pa.string()),
+        ("trc_ratio", pa.float64()),
+        ("start", pa.timestamp("us", tz="UTC")),
+    ]
+)
+START = datetime(2021, 1, 1, tzinfo=timezone.utc)
+ROWS = [("p0", 0.5, START), ("p1", 1.25, START), ("p2", None, None)]
+
+
+@pytest.fixture
+def bigquery_manager(bigquery_manager):
+    def manager(**kwargs):
+        dbm = bigquery_manager(**kwargs)
+        dbm.client.result_rows = ROWS
+        dbm.client.result_schema = SCHEMA
+        return dbm
+
+    return manager
+
+
+def test_storage_api_csv(bigquery_manager, tmp_path):
+    output_file = tmp_path / "results.csv"
+    dbm = bigquery_manager(output_file=str(output_file), bigquery_storage_api=True)
+    dbm._run_calc("SELECT id, trc_ratio FROM results")
+    assert dbm.client.bqstorage_clients[0] is not None
+    # the rows are read from the table of the script's last statement
+    assert dbm.client.listed_tables == ["statement1"]
+    # the same csv as the REST API's
+    assert output_file.read_text() == (
+        "p0,0.5,2021-01-01 00:00:00+00:00\np1,1.25,2021-01-01 00:00:00+00:00\np2,,\n"
+    )
+
+
+def test_storage_api_parquet(bigquery_manager, tmp_path):
+    output_file = tmp_path / "results.parquet"
+    dbm = bigquery_manager(output_file=str(output_file), bigquery_storage_api=True)
+    dbm._run_calc("SELECT id, trc_ratio FROM results")
+    assert dbm.client.bqstorage_clients[0] is not None
+    table = pq.read_table(output_file)
+    assert table.column_names == COLUMNS
+    assert [tuple(row.values()) for row in table.to_pylist()] == ROWS
+
+
+def test_rest_api_csv(bigquery_manager, tmp_path):
+    output_file = tmp_path / "results.csv"
+    dbm = bigquery_manager(output_file=str(output_file))
+    dbm._run_calc("SELECT id, trc_ratio FROM results")
+    assert dbm.client.bqstorage_clients == []
+    assert dbm.client.listed_tables == []
+    assert output_file.read_text() == (
+        "p0,0.5,2021-01-01 00:00:00+00:00\np1,1.25,2021-01-01 00:00:00+00:00\np2,,\n"
+    )
+
+
+def test_storage_api_requires_bigquery():
+    with pytest.raises(FLEXValueException):
+        FLEXValueConfig(
+            database_type="postgresql", bigquery_storage_api=True
+        ).validate()
@@ -18,13 +18,14 @@
 
 """
 
+import csv
 import math
 import pytest
-from flexvalue.db import DBManager
-from flexvalue.config import FLEXValueConfig
+from flexvalue.db import DBManager, GAS_AV_COSTS_COPY_TYPES, GAS_AV_COSTS_FIELDS
+from flexvalue.config import FLEXValueConfig, FLEXValueException
 from flexvalue.flexvalue import FlexValueRun
 from typing import Callable
-from sqlalchemy import text
+from sqlalchemy import inspect, text
 
 TEST_HOST = "postgresql"
 TEST_PORT = 5432
@@ -534,6 +535,15 @@ def test_therms_profiles(config_with_therms_profiles: FLEXValueConfig):
     assert result[0][0] == 144
 
 
+def test_therms_profiles_small_chunks(config_with_therms_profiles: FLEXValueConfig):
+    config_with_therms_profiles.load_chunk_size = 10
+    dbm = DBManager.get_db_manager(config_with_therms_profiles)
+    dbm.reset_therms_profiles()
+    dbm.process_therms_profile(config_with_therms_profiles.therms_profiles_file)
+    result = dbm._exec_select_sql("SELECT COUNT(*) FROM therms_profile;")
+    assert result[0][0] == 144
+
+
 # NOTE This test takes several minutes to run due to loading the data.
 def test_elec_avoided_costs(check_av_costs: Callable[[FLEXValueConfig], None], config_with_elec_avcosts: FLEXValueConfig):
     dbm = DBManager.get_db_manager(config_with_elec_avcosts)
@@ -636,3 +646,771 @@ def test_agg_id_no_fields_same_output(check_av_costs: Callable[[FLEXValueConfig]
     assert (
         result[0][0] == 38
     )  # 38 distinct projects even with 2 projects with no matching loadshape (because they match on the gas loadshape)
+
+
+def test_wide_csv_file_to_long_dicts(config: FLEXValueConfig, tmp_path):
+    csv_path = tmp_path / "wide_load_shapes.csv"
+    csv_path.write_text(
+        "state,utility,region,quarter,month,hour_of_day,hour_of_year,Res_A,res_b\n"
+        "ca,pge,3a,1,1,0,0,0.1,0.2\n"
+        "ca,pge,3a,1,1,1,1,0.3,0.4\n"
+    )
+    dbm = DBManager.get_db_manager(config)
+    rows = dbm._wide_csv_file_to_long_dicts(
+        str(csv_path),
+        ["state", "utility", "region", "quarter", "month", "hour_of_day", "hour_of_year"],
+        "load_shape_name",
+        fields_to_upper=["state", "utility", "region", "load_shape_name"],
+    )
+    chunks = list(dbm._chunk_rows(rows, 3))
+    assert [len(chunk) for chunk in chunks] == [3, 1]
+    assert chunks[0][0] == {
+        "state": "CA",
+        "utility": "PGE",
+        "region": "3A",
+        "quarter": "1",
+        "month": "1",
+        "hour_of_day": "0",
+        "hour_of_year": "0",
+        "load_shape_name": "RES_A",
+        "value": "0.1",
+    }
+    assert chunks[1][0]["load_shape_name"] == "RES_B"
+    assert chunks[1][0]["value"] == "0.4"
+
+
+@pytest.mark.parametrize("csv_parser", ["stdlib", "pyarrow"])
+def test_wide_csv_file_to_long_tuples_typed(
+    config: FLEXValueConfig, tmp_path, csv_parser
+):
+    if csv_parser == "pyarrow":
+        pytest.importorskip("pyarrow")
+    csv_path = tmp_path / "wide_load_shapes.csv"
+    csv_path.write_text(
+        "state,utility,region,quarter,month,hour_of_day,hour_of_year,Res_A,res_b\n"
+        "ca,pge,3a,1,1,0,0,0.1,0.2\n"
+        "ca,pge,3a,1,1,1,1,0.3,0.4\n"
+    )
+    config.csv_parser = csv_parser
+    dbm = DBManager.get_db_manager(config)
+    rows = list(
+        dbm._wide_csv_file_to_long_tuples(
+            str(csv_path),
+            ["state", "utility", "region", "quarter", "month", "hour_of_day", "hour_of_year"],
+            "load_shape_name",
+            fields_to_upper=["state", "utility", "region", "load_shape_name"],
+            types=["text"] * 3 + ["int4"] * 4 + ["text", "float8"],
+        )
+    )
+    assert sorted(rows) == [
+        ("CA", "PGE", "3A", 1, 1, 0, 0, "RES_A", 0.1),
+        ("CA", "PGE", "3A", 1, 1, 0, 0, "RES_B", 0.2),
+        ("CA", "PGE", "3A", 1, 1, 1, 1, "RES_A", 0.3),
+        ("CA", "PGE", "3A", 1, 1, 1, 1, "RES_B", 0.4),
+    ]
+
+
+@pytest.mark.parametrize("csv_parser", ["stdlib", "pyarrow"])
+def test_csv_file_to_typed_tuples_positional(
+    config: FLEXValueConfig, tmp_path, csv_parser
+):
+    if csv_parser == "pyarrow":
+        pytest.importorskip("pyarrow")
+    config.csv_parser = csv_parser
+    dbm = DBManager.get_db_manager(config)
+    rows = (
+        "ca,PGE,,2021,1,1,0.5,0,0,0,1.5,0,0.005,ACC2020\n"
+        "ca,PGE,,2021,1,2,0.5,0,0,0,2.5,0,0.005,ACC2020\n"
+    )
+    expected = [
+        ("ca", "PGE", "", 2021, 1, 1, 0.5, 0.0, 0.0, 0.0, 1.5, 0.0, 0.005, "ACC2020"),
+        ("ca", "PGE", "", 2021, 1, 2, 0.5, 0.0, 0.0, 0.0, 2.5, 0.0, 0.005, "ACC2020"),
+    ]
+    # the header row is skipped whatever its names, and is optional
+    for header in [
+        "State,Utility,Region,Year,Quarter,Month,Market,TD,Env,BTM,Total,Upstream,GHG,Curve\n",
+        "",
+    ]:
+        csv_path = tmp_path / "gas_av_costs.csv"
+        csv_path.write_text(header + rows)
+        assert (
+            list(
+                dbm._csv_file_to_typed_tuples(
+                    str(csv_path),
+                    GAS_AV_COSTS_FIELDS,
+                    GAS_AV_COSTS_COPY_TYPES,
+                )
+            )
+            == expected
+        )
+    csv_path.write_text("")
+    assert (
+        list(
+            dbm._csv_file_to_typed_tuples(
+                str(csv_path), GAS_AV_COSTS_FIELDS, GAS_AV_COSTS_COPY_TYPES
+            )
+        )
+        == []
+    )
+
+
+def test_sqlite_loads_headerless_gas_av_costs(tmp_path):
+    csv_path = tmp_path / "gas_av_costs.csv"
+    csv_path.write_text(
+        "CA,PGE,,2021,1,1,0.5,0,0,0,1.5,0,0.005,ACC2020\n"
+        "CA,PGE,,2021,1,2,0.5,0,0,0,2.5,0,0.005,ACC2020\n"
+    )
+    config = FLEXValueConfig(
+        # the connection string is sqlite+pysqlite:// followed by database
+        database_type="sqlite", database=f"/{tmp_path / 'flexvalue.db'}"
+    )
+    dbm = DBManager.get_db_manager(config)
+    dbm.process_gas_av_costs(str(csv_path))
+    assert dbm._exec_select_sql(
+        "SELECT month, total FROM gas_av_costs ORDER BY month"
+    ) == [(1, 1.5), (2, 2.5)]
+
+
+def test_copy_headerless_av_costs(config: FLEXValueConfig, tmp_path):
+    elec_row = "CA,PGE,3A,2021-01-01 0{hour}:00:00 UTC,2021,1,1,{hour},{hour},0.1,0,0,0,0,0,0,0,0,0,{total},0.1,0,ACC2020\n"
+    csv_path = tmp_path / "elec_av_costs.csv"
+    csv_path.write_text(
+        elec_row.format(hour=0, total=1.5) + elec_row.format(hour=1, total=2.5)
+    )
+    dbm = DBManager.get_db_manager(config)
+    dbm._drop_table("elec_av_costs")
+    dbm.process_elec_av_costs(str(csv_path))
+    assert dbm._exec_select_sql(
+        "SELECT hour_of_year, total FROM elec_av_costs ORDER BY hour_of_year"
+    ) == [(0, 1.5), (1, 2.5)]
+    # a file that can't be parsed fails the load, rather than just being logged
+    csv_path.write_text(elec_row.format(hour=2, total="n/a") * 2)
+    with pytest.raises(FLEXValueException):
+        dbm._load_table("elec_av_costs", "process_elec_av_costs", str(csv_path))
+    assert dbm._exec_select_sql("SELECT COUNT(*) FROM elec_av_costs") == [(2,)]
+    dbm._drop_table("elec_av_costs")
+
+
+def _write_elec_av_costs(path, num_rows, bad_row=None):
+    """An electric avoided costs file of num_rows hours, with a total that
+    can't be parsed on row bad_row, if given."""
+    path.write_text(
+        "state,utility,region,datetime,year,quarter,month,hour_of_day,hour_of_year,energy,losses,ancillary_services,capacity,transmission,distribution,cap_and_trade,ghg_adder,ghg_rebalancing,methane_leakage,total,marginal_ghg,ghg_adder_rebalancing,value_curve_name\n"
+        + "".join(
+            f"CA,{'PGE' if hour % 2 else 'SCE'},3A,2021-01-01 00:00:00 UTC,2021,1,1,0,{hour},0.1,0,0,0,0,0,0,0,0,0,{'n/a' if hour == bad_row else hour / 10},0.1,0,ACC2020\n"
+            for hour in range(num_rows)
+        )
+    )
+
+
+@pytest.mark.parametrize("partition_by", [None, "utility"])
+def test_copy_partitions(config: FLEXValueConfig, tmp_path, partition_by):
+    csv_path = tmp_path / "elec_av_costs.csv"
+    _write_elec_av_costs(csv_path, 3000)
+    config.copy_partitions = 3
+    config.partition_by = partition_by
+    dbm = DBManager.get_db_manager(config)
+    dbm._drop_table("elec_av_costs")
+    dbm._load_table("elec_av_costs", "process_elec_av_costs", str(csv_path))
+    assert dbm._exec_select_sql(
+        "SELECT COUNT(*), COUNT(DISTINCT hour_of_year), SUM(total) FROM elec_av_costs"
+    ) == [(3000, 3000, pytest.approx(sum(hour / 10 for hour in range(3000))))]
+    assert not dbm._table_exists("elec_av_costs_partitioned_load")
+    dbm._drop_table("elec_av_costs")
+
+
+def test_copy_partitions_failure_rolls_back(config: FLEXValueConfig, tmp_path):
+    csv_path = tmp_path / "elec_av_costs.csv"
+    _write_elec_av_costs(csv_path, 300)
+    config.copy_partitions = 3
+    dbm = DBManager.get_db_manager(config)
+    dbm._drop_table("elec_av_costs")
+    dbm._load_table("elec_av_costs", "process_elec_av_costs", str(csv_path))
+    # the last partition's worker fails, after the others have COPYed theirs
+    _write_elec_av_costs(csv_path, 3000, bad_row=2999)
+    with pytest.raises(FLEXValueException):
+        dbm._load_table("elec_av_costs", "process_elec_av_costs", str(csv_path))
+    assert dbm._exec_select_sql("SELECT COUNT(*) FROM elec_av_costs") == [(300,)]
+    assert not dbm._table_exists("elec_av_costs_partitioned_load")
+    dbm._drop_table("elec_av_costs")
+
+
+def test_bulk_load_builds_indexes(config: FLEXValueConfig, tmp_path):
+    csv_path = tmp_path / "therms_profiles.csv"
+    csv_path.write_text(
+        "state,utility,region,quarter,month,annual\n"
+        "CA,PGE,,1,1,0.5\n"
+        "CA,PGE,,1,2,0.5\n"
+    )
+    config.bulk_load = True
+    dbm = DBManager.get_db_manager(config)
+    dbm._drop_indexes("therms_profile")
+    dbm._load_table("therms_profile", "process_therms_profile", str(csv_path))
+    indexes = dbm._exec_select_sql(
+        "SELECT indexname FROM pg_indexes WHERE tablename = 'therms_profile'"
+    )
+    assert ("therms_profile_calculation_index",) in indexes
+
+
+def test_staged_refresh_replaces_table(config: FLEXValueConfig, tmp_path):
+    csv_path = tmp_path / "therms_profiles.csv"
+    csv_path.write_text(
+        "state,utility,region,quarter,month,annual,winter\n"
+        "CA,PGE,,1,1,0.5,0.7\n"
+        "CA,PGE,,1,2,0.5,0.3\n"
+    )
+    config.staged_refresh = True
+    dbm = DBManager.get_db_manager(config)
+    for _ in range(2):
+        dbm._load_table("therms_profile", "process_therms_profile", str(csv_path))
+    assert dbm._exec_select_sql("SELECT COUNT(*) FROM therms_profile") == [(4,)]
+    assert not dbm._table_exists("therms_profile_staging")
+    indexes = dbm._exec_select_sql(
+        "SELECT indexname FROM pg_indexes WHERE tablename = 'therms_profile'"
+    )
+    assert ("therms_profile_calculation_index",) in indexes
+
+
+def test_skip_unchanged_loads(config: FLEXValueConfig, tmp_path):
+    csv_path = tmp_path / "therms_profiles.csv"
+    csv_path.write_text(
+        "state,utility,region,quarter,month,annual,winter\n"
+        "CA,PGE,,1,1,0.5,0.7\n"
+        "CA,PGE,,1,2,0.5,0.3\n"
+    )
+    config.skip_unchanged_loads = True
+    dbm = DBManager.get_db_manager(config)
+    dbm.reset_therms_profiles()
+    for _ in range(2):
+        dbm._load_table("therms_profile", "process_therms_profile", str(csv_path))
+    # the second load was skipped, rather than adding the rows again
+    assert dbm._exec_select_sql("SELECT COUNT(*) FROM therms_profile") == [(4,)]
+    with open(csv_path, "a") as f:
+        f.write("CA,PGE,,1,3,0.5,0.1\n")
+    dbm._load_table("therms_profile", "process_therms_profile", str(csv_path))
+    assert dbm._exec_select_sql("SELECT COUNT(*) FROM therms_profile") == [(10,)]
+    dbm.reset_therms_profiles()
+    assert dbm._exec_select_sql(
+        "SELECT COUNT(*) FROM load_manifest WHERE table_name = 'therms_profile'"
+    ) == [(0,)]
+    # an unchanged file is loaded again into a table that was emptied or
+    # dropped since it was loaded
+    dbm._load_table("therms_profile", "process_therms_profile", str(csv_path))
+    with dbm.engine.begin() as conn:
+        conn.execute(text("DELETE FROM therms_profile"))
+    dbm._load_table("therms_profile", "process_therms_profile", str(csv_path))
+    assert dbm._exec_select_sql("SELECT COUNT(*) FROM therms_profile") == [(6,)]
+    with dbm.engine.begin() as conn:
+        conn.execute(text("DROP TABLE therms_profile"))
+    dbm._load_table("therms_profile", "process_therms_profile", str(csv_path))
+    assert dbm._exec_select_sql("SELECT COUNT(*) FROM therms_profile") == [(6,)]
+    # dropping a table with _drop_table forgets its loads
+    dbm._drop_table("therms_profile")
+    assert dbm._exec_select_sql(
+        "SELECT COUNT(*) FROM load_manifest WHERE table_name = 'therms_profile'"
+    ) == [(0,)]
+
+
+def test_profile_names_are_upper_cased(config: FLEXValueConfig, tmp_path):
+    csv_path = tmp_path / "therms_profiles.csv"
+    csv_path.write_text(
+        "state,utility,region,quarter,month,Annual,winter\n"
+        "ca,pge,,1,1,0.5,0.7\n"
+    )
+    dbm = DBManager.get_db_manager(config)
+    dbm.reset_therms_profiles()
+    dbm._load_table("therms_profile", "process_therms_profile", str(csv_path))
+    assert sorted(
+        dbm._exec_select_sql("SELECT utility, profile_name FROM therms_profile")
+    ) == [("PGE", "ANNUAL"), ("PGE", "WINTER")]
+    # a table loaded before the names were upper-cased is normalized, once
+    dbm._drop_table("schema_migrations")
+    with dbm.engine.begin() as conn:
+        conn.execute(text("UPDATE therms_profile SET profile_name = LOWER(profile_name)"))
+    dbm._normalize_name_case()
+    assert sorted(dbm._exec_select_sql("SELECT profile_name FROM therms_profile")) == [
+        ("ANNUAL",),
+        ("WINTER",),
+    ]
+    with dbm.engine.begin() as conn:
+        conn.execute(text("UPDATE therms_profile SET profile_name = 'annual'"))
+    dbm._normalize_name_case()
+    assert dbm._exec_select_sql("SELECT DISTINCT profile_name FROM therms_profile") == [
+        ("annual",)
+    ]
+    dbm.reset_therms_profiles()
+
+
+def test_discount_factors(config: FLEXValueConfig, tmp_path):
+    csv_path = tmp_path / "project_info.csv"
+    csv_path.write_text(
+        "id,state,utility,region,mwh_savings,therms_savings,load_shape,therms_profile,start_year,start_quarter,units,eul,ntg,discount_rate,admin_cost,measure_cost,incentive_cost,value_curve_name\n"
+        "p1,CA,PGE,3A,1,0,RES_A,ANNUAL,2021,3,1,2,1,0.08,0,0,0,ACC2020\n"
+    )
+    dbm = DBManager.get_db_manager(config)
+    dbm.process_project_info(str(csv_path))
+    with dbm.engine.begin() as conn:
+        dbm._create_discount_factors(conn)
+        rows = conn.execute(
+            text(
+                "SELECT year, quarter, discount FROM discount_factors ORDER BY year, quarter"
+            )
+        ).fetchall()
+    # one row per quarter of the EUL, starting with the start quarter
+    assert [(year, quarter) for year, quarter, _ in rows] == [
+        (2021, 3),
+        (2021, 4),
+        (2022, 1),
+        (2022, 2),
+        (2022, 3),
+        (2022, 4),
+        (2023, 1),
+        (2023, 2),
+    ]
+    for quarter_offset, (_, _, discount) in enumerate(rows):
+        assert math.isclose(discount, 1 / 1.02**quarter_offset)
+
+
+def test_incremental_av_costs_replaces_curves(config: FLEXValueConfig, tmp_path):
+    header = "state,utility,region,year,quarter,month,market,t_d,environment,btm_methane,total,upstream_methane,marginal_ghg,value_curve_name\n"
+
+    def write_curves(path, rows_by_curve):
+        path.write_text(
+            header
+            + "".join(
+                f"CA,PGE,,2021,1,{month},0.1,0.1,0.1,0.1,{total},0.01,0.005,{curve}\n"
+                for curve, (num_rows, total) in rows_by_curve.items()
+                for month in range(1, num_rows + 1)
+            )
+        )
+
+    config.incremental_av_costs = True
+    dbm = DBManager.get_db_manager(config)
+    dbm._drop_table("gas_av_costs")
+    first, second = tmp_path / "first.csv", tmp_path / "second.csv"
+    write_curves(first, {"ACC2020": (3, 1.0), "ACC2021": (3, 1.0)})
+    write_curves(second, {"ACC2021": (2, 2.0), "ACC2022": (4, 2.0)})
+    dbm._load_table("gas_av_costs", "process_gas_av_costs", str(first))
+    dbm._load_table("gas_av_costs", "process_gas_av_costs", str(second))
+    assert dbm._exec_select_sql(
+        "SELECT value_curve_name, COUNT(*), MAX(total) FROM gas_av_costs GROUP BY value_curve_name ORDER BY value_curve_name"
+    ) == [("ACC2020", 3, 1.0), ("ACC2021", 2, 2.0), ("ACC2022", 4, 2.0)]
+    assert not dbm._table_exists("gas_av_costs_incoming")
+
+
+def test_partition_by_creates_partitions(config: FLEXValueConfig, tmp_path):
+    csv_path = tmp_path / "elec_load_shape.csv"
+    csv_path.write_text(
+        "state,utility,region,quarter,month,hour_of_day,hour_of_year,res_a\n"
+        "CA,PGE,3A,1,1,0,0,0.1\n"
+        "CA,SCE,9,1,1,0,0,0.2\n"
+        "CA,,9,1,1,0,0,0.3\n"
+    )
+    config.partition_by = "utility"
+    dbm = DBManager.get_db_manager(config)
+    dbm._drop_table("elec_load_shape")
+    dbm._load_table("elec_load_shape", "process_elec_load_shape", str(csv_path))
+    assert dbm._exec_select_sql(
+        "SELECT CAST(CAST(tableoid AS regclass) AS text), COUNT(*) FROM elec_load_shape GROUP BY 1 ORDER BY 1"
+    ) == [
+        ("elec_load_shape_blank", 1),
+        ("elec_load_shape_pge", 1),
+        ("elec_load_shape_sce", 1),
+    ]
+    assert "pk" not in [
+        column["name"] for column in inspect(dbm.engine).get_columns("elec_load_shape")
+    ]
+    dbm._drop_table("elec_load_shape")
+
+
+def test_partition_by_distinct_values_with_the_same_name(
+    config: FLEXValueConfig, tmp_path
+):
+    long_utility = "UTILITY" * 10
+    csv_path = tmp_path / "elec_load_shape.csv"
+    csv_path.write_text(
+        "state,utility,region,quarter,month,hour_of_day,hour_of_year,res_a\n"
+        "CA,PG&E,3A,1,1,0,0,0.1\n"
+        "CA,PG E,3A,1,1,0,0,0.2\n"
+        f"CA,{long_utility},3A,1,1,0,0,0.3\n"
+        f"CA,{long_utility}X,3A,1,1,0,0,0.4\n"
+    )
+    config.partition_by = "utility"
+    dbm = DBManager.get_db_manager(config)
+    dbm._drop_table("elec_load_shape")
+    dbm._load_table("elec_load_shape", "process_elec_load_shape", str(csv_path))
+    partitions = dbm._exec_select_sql(
+        "SELECT utility, CAST(CAST(tableoid AS regclass) AS text) FROM elec_load_shape ORDER BY value"
+    )
+    assert [utility for utility, _ in partitions] == [
+        "PG&E",
+        "PG E",
+        long_utility,
+        f"{long_utility}X",
+    ]
+    assert len({partition for _, partition in partitions}) == 4
+    assert all(len(partition) <= 63 for _, partition in partitions)
+    # the partitions are found again by their bounds
+    with dbm.engine.begin() as conn:
+        dbm._prepare_partitions(conn, "elec_load_shape", "elec_load_shape")
+    assert dbm._exec_select_sql(
+        "SELECT COUNT(*) FROM pg_inherits WHERE inhparent = CAST('elec_load_shape' AS regclass)"
+    ) == [(4,)]
+    dbm._drop_table("elec_load_shape")
+
+
+def test_compact_schema_encodes_names(config: FLEXValueConfig, tmp_path):
+    csv_path = tmp_path / "elec_load_shape.csv"
+    csv_path.write_text(
+        "state,utility,region,quarter,month,hour_of_day,hour_of_year,res_a,res_b\n"
+        "CA,PGE,3A,1,1,0,0,0.1,0.2\n"
+        "CA,SCE,9,1,1,0,0,0.3,0.4\n"
+    )
+    config.compact_schema = True
+    dbm = DBManager.get_db_manager(config)
+    dbm._drop_table("elec_load_shape")
+    dbm._load_table("elec_load_shape", "process_elec_load_shape", str(csv_path))
+    columns = {
+        column["name"]: str(column["type"])
+        for column in inspect(dbm.engine).get_columns("elec_load_shape")
+    }
+    assert "pk" not in columns and "utility" not in columns
+    assert columns["utility_code"] == columns["hour_of_year"] == "SMALLINT"
+    assert dbm._exec_select_sql(
+        "SELECT utility_codes.value, load_shape_name_codes.value, elec_load_shape.value FROM elec_load_shape JOIN utility_codes ON utility_codes.code = elec_load_shape.utility_code JOIN load_shape_name_codes ON load_shape_name_codes.code = elec_load_shape.load_shape_name_code ORDER BY elec_load_shape.value"
+    ) == [
+        ("PGE", "RES_A", 0.1),
+        ("PGE", "RES_B", 0.2),
+        ("SCE", "RES_A", 0.3),
+        ("SCE", "RES_B", 0.4),
+    ]
+    dbm._drop_table("elec_load_shape")
+
+
+def test_quarterly_elec_aggregation_validation(config: FLEXValueConfig):
+    config.quarterly_elec_aggregation = True
+    with pytest.raises(FLEXValueException):
+        config.validate()
+    config.separate_output_tables = True
+    config.validate()
+    config.aggregation_columns = ["id", "hour_of_year"]
+    with pytest.raises(FLEXValueException):
+        config.validate()
+
+
+def test_shape_cost_cube_follows_loads(config: FLEXValueConfig, tmp_path):
+    def write_curve(path, curve, energy):
+        path.write_text(
+            "state,utility,region,datetime,year,quarter,month,hour_of_day,hour_of_year,energy,losses,ancillary_services,capacity,transmission,distribution,cap_and_trade,ghg_adder,ghg_rebalancing,methane_leakage,total,marginal_ghg,ghg_adder_rebalancing,value_curve_name\n"
+            + "".join(
+                f"CA,PGE,3A,2021-01-01 0{hour}:00:00 UTC,2021,1,1,{hour},{hour},{energy * (hour + 1)},0,0,0,0,0,0,0,0,0,{energy * (hour + 1)},0,0,{curve}\n"
+                for hour in range(2)
+            )
+        )
+
+    first, second = tmp_path / "first.csv", tmp_path / "second.csv"
+    write_curve(first, "ACC2020", 1.0)
+    write_curve(second, "ACC2021", 10.0)
+    shapes_path = tmp_path / "elec_load_shape.csv"
+    shapes_path.write_text(
+        "state,utility,region,quarter,month,hour_of_day,hour_of_year,res_a\n"
+        "CA,PGE,3A,1,1,0,0,0.25\n"
+        "CA,PGE,3A,1,1,1,1,0.75\n"
+    )
+    config.incremental_av_costs = True
+    dbm = DBManager.get_db_manager(config)
+    for table_name in ["shape_cost_cube", "elec_av_costs", "elec_load_shape"]:
+        dbm._drop_table(table_name)
+    dbm._load_table("elec_av_costs", "process_elec_av_costs", str(first))
+    dbm._load_table("elec_load_shape", "process_elec_load_shape", str(shapes_path))
+    dbm._prepare_shape_cost_cube()
+    cube_sql = "SELECT utility, region, load_shape_name, value_curve_name, year, quarter, value, energy FROM shape_cost_cube ORDER BY value_curve_name"
+    assert dbm._exec_select_sql(cube_sql) == [
+        ("PGE", "3A", "RES_A", "ACC2020", 2021, 1, 1.0, 1.75)
+    ]
+    # an incremental load recomputes the rows of the curves it loads
+    dbm._load_table("elec_av_costs", "process_elec_av_costs", str(second))
+    assert dbm._exec_select_sql(cube_sql) == [
+        ("PGE", "3A", "RES_A", "ACC2020", 2021, 1, 1.0, 1.75),
+        ("PGE", "3A", "RES_A", "ACC2021", 2021, 1, 1.0, 17.5),
+    ]
+    # any other load of the load shapes or avoided costs drops it
+    dbm._load_table("elec_load_shape", "process_elec_load_shape", str(shapes_path))
+    assert not dbm._table_exists("shape_cost_cube")
+    for table_name in ["elec_av_costs", "elec_load_shape"]:
+        dbm._drop_table(table_name)
+
+
+def test_numpy_calculation_engine_validation(config: FLEXValueConfig):
+    config.calculation_engine = "pandas"
+    with pytest.raises(FLEXValueException):
+        config.validate()
+    config.calculation_engine = "numpy"
+    config.validate()
+    # the combined output is only by project
+    config.aggregation_columns = ["id", "year"]
+    with pytest.raises(FLEXValueException):
+        config.validate()
+    config.separate_output_tables = True
+    config.validate()
+    config.aggregation_columns = ["id", "hour_of_year"]
+    with pytest.raises(FLEXValueException):
+        config.validate()
+    config.aggregation_columns = []
+    config.gas_output_table = "gas_results"
+    with pytest.raises(FLEXValueException):
+        config.validate()
+
+
+SOURCE_TABLES = ["elec_av_costs", "elec_load_shape", "gas_av_costs", "therms_profile"]
+PROJECT_INFO_HEADER = "id,state,utility,region,mwh_savings,therms_savings,load_shape,therms_profile,start_year,start_quarter,units,eul,ntg,discount_rate,admin_cost,measure_cost,incentive_cost,value_curve_name\n"
+
+
+def _load_calculation_inputs(dbm: DBManager, tmp_path, project_rows):
+    """(Re)loads two years of small avoided costs, a load shape and a therms
+    profile for PGE 3A, and project_rows as the project info, so a calculation
+    can be run end to end."""
+    elec_av_costs = tmp_path / "elec_av_costs.csv"
+    elec_av_costs.write_text(
+        "state,utility,region,datetime,year,quarter,month,hour_of_day,hour_of_year,energy,losses,ancillary_services,capacity,transmission,distribution,cap_and_trade,ghg_adder,ghg_rebalancing,methane_leakage,total,marginal_ghg,ghg_adder_rebalancing,value_curve_name\n"
+        + "".join(
+            f"CA,PGE,3A,{year}-{month:02d}-01 0{hour}:00:00 UTC,{year},{(month + 2) // 3},{month},{hour},{(month - 1) * 2 + hour},{month / 10},0,0,0,0,0,0,0,0,0,{month / 10 + hour},0.1,0,ACC2020\n"
+            for year in [2021, 2022]
+            for month in range(1, 13)
+            for hour in range(2)
+        )
+    )
+    elec_load_shape = tmp_path / "elec_load_shape.csv"
+    elec_load_shape.write_text(
+        "state,utility,region,quarter,month,hour_of_day,hour_of_year,res_a\n"
+        + "".join(
+            f"CA,PGE,3A,{(hour // 2 + 3) // 3},{hour // 2 + 1},{hour % 2},{hour},{(hour + 1) / 300}\n"
+            for hour in range(24)
+        )
+    )
+    gas_av_costs = tmp_path / "gas_av_costs.csv"
+    gas_av_costs.write_text(
+        "state,utility,region,year,quarter,month,market,t_d,environment,btm_methane,total,upstream_methane,marginal_ghg,value_curve_name\n"
+        + "".join(
+            f"CA,PGE,,{year},{(month + 2) // 3},{month},0.5,0,0,0,{month / 4},0,0.005,ACC2020\n"
+            for year in [2021, 2022]
+            for month in range(1, 13)
+        )
+    )
+    therms_profile = tmp_path / "therms_profile.csv"
+    therms_profile.write_text(
+        "state,utility,region,quarter,month,annual\n"
+        + "".join(
+            f"CA,PGE,,{(month + 2) // 3},{month},{1 / 12}\n" for month in range(1, 13)
+        )
+    )
+    project_info = tmp_path / "project_info.csv"
+    project_info.write_text(PROJECT_INFO_HEADER + "".join(project_rows))
+    for table_name in SOURCE_TABLES:
+        dbm._drop_table(table_name)
+    dbm._load_table("elec_av_costs", "process_elec_av_costs", str(elec_av_costs))
+    dbm._load_table(
+        "elec_load_shape", "process_elec_load_shape", str(elec_load_shape)
+    )
+    dbm._load_table("gas_av_costs", "process_gas_av_costs", str(gas_av_costs))
+    dbm._load_table("therms_profile", "process_therms_profile", str(therms_profile))
+    dbm.process_project_info(str(project_info))
+
+
+def test_numpy_calculation_engine_matches_sql(
+    config: FLEXValueConfig, tmp_path, monkeypatch
+):
+    pytest.importorskip("numpy")
+    dbm = DBManager.get_db_manager(config)
+    _load_calculation_inputs(
+        dbm,
+        tmp_path,
+        [
+            "p0,CA,PGE,3A,1.5,0,Res_A,annual,2021,1,1,1,0.9,0.0766,100,1000,500,ACC2020\n",
+            "p1,CA,PGE,3A,2.5,100,res_a,annual,2021,3,2,1,0.8,0.0766,100,1000,500,ACC2020\n",
+            "p2,CA,PGE,3A,2.5,100,res_a,annual,2021,3,2,0,0.8,0.0766,100,1000,500,ACC2020\n",
+        ],
+    )
+    results = []
+    monkeypatch.setattr(
+        DBManager,
+        "_write_results",
+        lambda self, columns, rows, types=None: results.append(
+            (list(columns), sorted(tuple(row) for row in rows))
+        ),
+    )
+    for separate_output_tables in [False, True]:
+        config.separate_output_tables = separate_output_tables
+        config.aggregation_columns = (
+            ["year", "quarter"] if separate_output_tables else []
+        )
+        config.elec_components = ["energy", "marginal_ghg"]
+        config.gas_components = ["market"]
+        for calculation_engine in ["sql", "numpy"]:
+            config.calculation_engine = calculation_engine
+            DBManager.get_db_manager(config).run()
+    sql_results = results[0:1] + results[2:4]
+    numpy_results = results[1:2] + results[4:6]
+    for (sql_columns, sql_rows), (numpy_columns, numpy_rows) in zip(
+        sql_results, numpy_results
+    ):
+        assert numpy_columns == sql_columns
+        assert len(numpy_rows) == len(sql_rows) > 0
+        # the project with no EUL is left out, as by discount_factors
+        assert "p2" not in [row[0] for row in numpy_rows]
+        for sql_row, numpy_row in zip(sql_rows, numpy_rows):
+            assert numpy_row[0] == sql_row[0]
+            assert numpy_row[1:] == pytest.approx(sql_row[1:])
+    for table_name in SOURCE_TABLES:
+        dbm._drop_table(table_name)
+
+
+def test_compact_schema_calculation(config: FLEXValueConfig, tmp_path, monkeypatch):
+    project_rows = [
+        "p0,CA,PGE,3A,1.5,0,Res_A,annual,2021,1,1,1,0.9,0.0766,100,1000,500,ACC2020\n",
+        "p1,CA,PGE,3A,2.5,100,res_a,annual,2021,3,2,1,0.8,0.0766,100,1000,500,ACC2020\n",
+    ]
+    results = []
+    monkeypatch.setattr(
+        DBManager,
+        "_write_results",
+        lambda self, columns, rows, types=None: results.append(
+            (list(columns), sorted(tuple(row) for row in rows))
+        ),
+    )
+    for compact_schema in [False, True]:
+        config.compact_schema = compact_schema
+        dbm = DBManager.get_db_manager(config)
+        if compact_schema:
+            for table_name in SOURCE_TABLES + [
+                "utility_codes",
+                "region_codes",
+                "load_shape_name_codes",
+            ]:
+                dbm._drop_table(table_name)
+        _load_calculation_inputs(dbm, tmp_path, project_rows)
+        dbm.run()
+    # the code tables have statistics, which autovacuum never gathers for them
+    assert dbm._exec_select_sql(
+        "SELECT relname FROM pg_class WHERE relname IN ('utility_codes', 'region_codes', 'load_shape_name_codes') AND reltuples >= 0 ORDER BY relname"
+    ) == [("load_shape_name_codes",), ("region_codes",), ("utility_codes",)]
+    (columns, rows), (compact_columns, compact_rows) = results
+    assert compact_columns == columns
+    assert len(compact_rows) == len(rows) > 0
+    for row, compact_row in zip(rows, compact_rows):
+        assert compact_row[0] == row[0]
+        assert compact_row[1:] == pytest.approx(row[1:])
+    for table_name in SOURCE_TABLES:
+        dbm._drop_table(table_name)
+
+
+def test_zero_eul_project_is_left_out(config: FLEXValueConfig, tmp_path, monkeypatch):
+    dbm = DBManager.get_db_manager(config)
+    _load_calculation_inputs(
+        dbm,
+        tmp_path,
+        [
+            "p0,CA,PGE,3A,1.5,100,Res_A,annual,2021,1,1,1,0.9,0.0766,100,1000,500,ACC2020\n",
+            "p1,CA,PGE,3A,2.5,100,res_a,annual,2021,3,2,0,0.8,0.0766,100,1000,500,ACC2020\n",
+        ],
+    )
+    results = []
+    monkeypatch.setattr(
+        DBManager,
+        "_write_results",
+        lambda self, columns, rows, types=None: results.append([row[0] for row in rows]),
+    )
+    # as with the calculation's old datetime range, a project without any
+    # quarters has no costs or benefits, rather than dividing by its EUL
+    for separate_output_tables in [False, True]:
+        config.separate_output_tables = separate_output_tables
+        DBManager.get_db_manager(config).run()
+    assert results == [["p0"], ["p0"], ["p0"]]
+    for table_name in SOURCE_TABLES:
+        dbm._drop_table(table_name)
+
+
+def test_write_results_as_csv(config: FLEXValueConfig, tmp_path, monkeypatch):
+    monkeypatch.setattr("flexvalue.db.RESULT_FETCH_SIZE", 3)
+    config.output_file = str(tmp_path / "results.csv")
+    rows = [(f"p{i}", i / 10, None) for i in range(10)] + [("a, b", 1.5, "x")]
+    dbm = DBManager.get_db_manager(config)
+    dbm._write_results(["id", "trc_ratio", "region"], iter(rows))
+    with open(config.output_file, newline="") as infile:
+        written = list(csv.reader(infile))
+    assert written[0] == ["id", "trc_ratio", "region"]
+    assert written[1:] == [
+        [id, str(ratio), "" if region is None else region]
+        for id, ratio, region in rows
+    ]
+
+
+def test_run_calc_copies_csv_output(config: FLEXValueConfig, tmp_path, monkeypatch):
+    config.output_file = str(tmp_path / "results.csv")
+    dbm = DBManager.get_db_manager(config)
+    monkeypatch.setattr(dbm, "_create_discount_factors", lambda conn: None)
+    dbm._run_calc(
+        "SELECT 'p0' AS id, 1.5 AS trc_ratio, NULL AS region UNION ALL SELECT 'a, b', 2, 'x';"
+    )
+    with open(config.output_file) as infile:
+        assert infile.read() == 'id,trc_ratio,region\np0,1.5,\n"a, b",2,x\n'
+
+
+def test_run_calc_copies_floats_like_python(
+    config: FLEXValueConfig, tmp_path, monkeypatch
+):
+    dbm = DBManager.get_db_manager(config)
+    monkeypatch.setattr(dbm, "_create_discount_factors", lambda conn: None)
+    sql = "SELECT * FROM (VALUES ('p0', FLOAT 'inf'), ('p1', FLOAT '-inf'), ('p2', 0), ('p3', -2), ('p4', 0.1), ('p5', 1e-7), ('p6', 1e20), ('p7', NULL)) AS results (id, trc_ratio) ORDER BY id;"
+    outputs = []
+    # COPY, then the rows written by python's csv writer
+    for run_calc in [dbm._run_calc, lambda sql: DBManager._run_calc(dbm, sql)]:
+        config.output_file = str(tmp_path / f"results{len(outputs)}.csv")
+        run_calc(sql)
+        with open(config.output_file) as infile:
+            outputs.append(infile.read())
+    assert outputs[0] == outputs[1]
+    assert outputs[0].splitlines()[1:5] == ["p0,inf", "p1,-inf", "p2,0.0", "p3,-2.0"]
+
+
+
+def test_run_calc_types_parquet_output(config: FLEXValueConfig, tmp_path, monkeypatch):
+    pq = pytest.importorskip("pyarrow.parquet")
+    monkeypatch.setattr("flexvalue.results.ROW_GROUP_SIZE", 1)
+    config.output_file = str(tmp_path / "results.parquet")
+    dbm = DBManager.get_db_manager(config)
+    monkeypatch.setattr(dbm, "_create_discount_factors", lambda conn: None)
+    # gas_region is NULL in the first record batch, and text in the next
+    dbm._run_calc(
+        "SELECT * FROM (VALUES ('p0', NULL, 1.5), ('p1', '3A', 2)) AS results (id, gas_region, trc_ratio) ORDER BY id;"
+    )
+    assert pq.read_table(config.output_file).to_pylist() == [
+        {"id": "p0", "gas_region": None, "trc_ratio": 1.5},
+        {"id": "p1", "gas_region": "3A", "trc_ratio": 2.0},
+    ]
+
+
+def test_sqlite_run_calc_types_parquet_output(tmp_path, monkeypatch):
+    pq = pytest.importorskip("pyarrow.parquet")
+    monkeypatch.setattr("flexvalue.results.ROW_GROUP_SIZE", 2)
+    config = FLEXValueConfig(
+        database_type="sqlite",
+        database=f"/{tmp_path / 'flexvalue.db'}",
+        output_file=str(tmp_path / "results.parquet"),
+    )
+    dbm = DBManager.get_db_manager(config)
+    monkeypatch.setattr(dbm, "_create_discount_factors", lambda conn: None)
+    with dbm.engine.begin() as conn:
+        conn.execute(text("CREATE TABLE results (id TEXT, gas_region TEXT)"))
+        conn.execute(
+            text(
+                "INSERT INTO results VALUES ('p0', NULL), ('p1', NULL), ('p2', '3A')"
+            )
+        )
+    # gas_region is NULL in the first record batch, and text in the next
+    dbm._run_calc("SELECT id, gas_region, 1.5 AS trc_ratio FROM results ORDER BY id;")
+    assert pq.read_table(config.output_file).to_pylist() == [
+        {"id": "p0", "gas_region": None, "trc_ratio": 1.5},
+        {"id": "p1", "gas_region": None, "trc_ratio": 1.5},
+        {"id": "p2", "gas_region": "3A", "trc_ratio": 1.5},
+    ]
@@ -0,0 +1,180 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+
+   Copyright 2021 Recurve Analytics, Inc.
+
+   Licensed under the Apache License, Version 2.0 (the "License");
+   you may not use this file except in compliance with the License.
+   You may obtain a copy of the License at
+
+       http://www.apache.org/licenses/LICENSE-2.0
+
+   Unless required by applicable law or agreed to in writing, software
+   distributed under the License is distributed on an "AS IS" BASIS,
+   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+   See the License for the specific language governing permissions and
+   limitations under the License.
+
+"""
+
+
+import csv
+
+import pytest
+
+from flexvalue.config import FLEXValueConfig, FLEXValueException
+from flexvalue.db import DBManager
+from flexvalue.flexvalue import FlexValueRun
+
+pytest.importorskip("duckdb_engine")
+
+
+def _write_inputs(tmp_path):
+    """Two years of electric avoided costs with two hours a month, a wide load
+    shape file with two shapes over those hours, monthly gas avoided costs and
+    a wide therms profile file, and two projects."""
+    files = {
+        "elec_av_costs_file": tmp_path / "elec_av_costs.csv",
+        "elec_load_shape_file": tmp_path / "elec_load_shape.csv",
+        "gas_av_costs_file": tmp_path / "gas_av_costs.csv",
+        "therms_profiles_file": tmp_path / "therms_profile.csv",
+        "project_info_file": tmp_path / "project_info.csv",
+    }
+    files["elec_av_costs_file"].write_text(
+        "state,utility,region,datetime,year,quarter,month,hour_of_day,hour_of_year,energy,losses,ancillary_services,capacity,transmission,distribution,cap_and_trade,ghg_adder,ghg_rebalancing,methane_leakage,total,marginal_ghg,ghg_adder_rebalancing,value_curve_name\n"
+        + "".join(
+            f"CA,PGE,3A,{year}-{month:02d}-01 0{hour}:00:00 UTC,{year},{(month + 2) // 3},{month},{hour},{(month - 1) * 2 + hour},{month / 10},0,0,0,0,0,0,0,0,0,{month / 10 + hour},0.1,0,ACC2020\n"
+            for year in [2021, 2022]
+            for month in range(1, 13)
+            for hour in range(2)
+        )
+    )
+    files["elec_load_shape_file"].write_text(
+        "state,utility,region,quarter,month,hour_of_day,hour_of_year,res_a,Res_B\n"
+        + "".join(
+            f"CA,PGE,3A,{(hour // 2 + 3) // 3},{hour // 2 + 1},{hour % 2},{hour},{(hour + 1) / 300},{1 / 24}\n"
+            for hour in range(24)
+        )
+    )
+    files["gas_av_costs_file"].write_text(
+        "state,utility,region,year,quarter,month,market,t_d,environment,btm_methane,total,upstream_methane,marginal_ghg,value_curve_name\n"
+        + "".join(
+            f"CA,PGE,,{year},{(month + 2) // 3},{month},0.5,0,0,0,{month / 4},0,0.005,ACC2020\n"
+            for year in [2021, 2022]
+            for month in range(1, 13)
+        )
+    )
+    files["therms_profiles_file"].write_text(
+        "state,utility,region,quarter,month,annual\n"
+        + "".join(
+            f"CA,PGE,,{(month + 2) // 3},{month},{1 / 12}\n" for month in range(1, 13)
+        )
+    )
+    files["project_info_file"].write_text(
+        "id,state,utility,region,mwh_savings,therms_savings,load_shape,therms_profile,start_year,start_quarter,units,eul,ntg,discount_rate,admin_cost,measure_cost,incentive_cost,value_curve_name\n"
+        "p0,CA,PGE,3A,1.5,0,Res_A,annual,2021,1,1,1,0.9,0.0766,100,1000,500,ACC2020\n"
+        "p1,CA,PGE,3A,2.5,100,res_b,annual,2021,3,2,1,0.8,0.0766,100,1000,500,ACC2020\n"
+    )
+    return {key: str(path) for key, path in files.items()}
+
+
+def _run(tmp_path, output_file, **kwargs):
+    FlexValueRun(
+        database_type="duckdb",
+        database=str(tmp_path / "flexvalue.duckdb"),
+        process_elec_av_costs=True,
+        process_elec_load_shape=True,
+        process_gas_av_costs=True,
+        process_therms_profiles=True,
+        reset_elec_av_costs=True,
+        reset_elec_load_shape=True,
+        reset_gas_av_costs=True,
+        reset_therms_profiles=True,
+        output_file=str(output_file),
+        **_write_inputs(tmp_path),
+        **kwargs,
+    ).run()
+
+
+def _read_results(output_file):
+    with open(output_file) as infile:
+        rows = [[value.strip() for value in row] for row in csv.reader(infile)]
+    return rows[0], sorted(rows[1:])
+
+
+def test_duckdb_requires_database():
+    with pytest.raises(FLEXValueException):
+        FLEXValueConfig(database_type="duckdb").validate()
+
+
+def test_duckdb_matches_numpy_engine(tmp_path):
+    pytest.importorskip("numpy")
+    _run(tmp_path, tmp_path / "sql.csv")
+    _run(tmp_path, tmp_path / "numpy.csv", calculation_engine="numpy")
+    sql_columns, sql_rows = _read_results(tmp_path / "sql.csv")
+    numpy_columns, numpy_rows = _read_results(tmp_path / "numpy.csv")
+    assert sql_columns == numpy_columns
+    assert [row[0] for row in sql_rows] == ["p0", "p1"]
+    for sql_row, numpy_row in zip(sql_rows, numpy_rows):
+        assert [float(value) for value in sql_row[1:]] == pytest.approx(
+            [float(value) for value in numpy_row[1:]]
+        )
+
+
+def test_duckdb_parquet_output(tmp_path):
+    duckdb = pytest.importorskip("duckdb")
+    _run(tmp_path, tmp_path / "results.csv")
+    _run(tmp_path, tmp_path / "results.parquet")
+    columns, rows = _read_results(tmp_path / "results.csv")
+    parquet = duckdb.sql(
+        f"SELECT * FROM read_parquet('{tmp_path / 'results.parquet'}') ORDER BY id"
+    )
+    assert parquet.columns == columns
+    for row, parquet_row in zip(rows, parquet.fetchall()):
+        assert parquet_row[0] == row[0]
+        assert parquet_row[1:] == pytest.approx([float(value) for value in row[1:]])
+
+
+def test_duckdb_avoided_costs_without_header(tmp_path):
+    _run(tmp_path, tmp_path / "header.csv")
+    inputs = _write_inputs(tmp_path)
+    for key in ["elec_av_costs_file", "gas_av_costs_file"]:
+        with open(inputs[key]) as infile:
+            lines = infile.readlines()
+        with open(inputs[key], "w") as outfile:
+            outfile.writelines(lines[1:])
+    FlexValueRun(
+        database_type="duckdb",
+        database=str(tmp_path / "flexvalue.duckdb"),
+        process_elec_av_costs=True,
+        process_gas_av_costs=True,
+        reset_elec_av_costs=True,
+        reset_gas_av_costs=True,
+        output_file=str(tmp_path / "no_header.csv"),
+        **inputs,
+    ).run()
+    assert _read_results(tmp_path / "no_header.csv") == _read_results(
+        tmp_path / "header.csv"
+    )
+
+
+def test_duckdb_arrow_output_types(tmp_path, monkeypatch):
+    pa = pytest.importorskip("pyarrow")
+    monkeypatch.setattr("flexvalue.results.ROW_GROUP_SIZE", 2)
+    config = FLEXValueConfig(
+        database_type="duckdb",
+        database=str(tmp_path / "flexvalue.duckdb"),
+        output_file=str(tmp_path / "results.arrow"),
+    )
+    dbm = DBManager.get_db_manager(config)
+    monkeypatch.setattr(dbm, "_create_discount_factors", lambda conn: None)
+    # gas_region is NULL in the first record batch, and text in the next
+    dbm._run_calc(
+        "SELECT * FROM (VALUES ('p0', NULL), ('p1', NULL), ('p2', '3A')) AS results (id, gas_region) ORDER BY id;"
+    )
+    assert pa.ipc.open_file(config.output_file).read_all().to_pylist() == [
+        {"id": "p0", "gas_region": None},
+        {"id": "p1", "gas_region": None},
+        {"id": "p2", "gas_region": "3A"},
+    ]
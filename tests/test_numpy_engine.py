@@ -0,0 +1,195 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+
+   Copyright 2021 Recurve Analytics, Inc.
+
+   Licensed under the Apache License, Version 2.0 (the "License");
+   you may not use this file except in compliance with the License.
+   You may obtain a copy of the License at
+
+       http://www.apache.org/licenses/LICENSE-2.0
+
+   Unless required by applicable law or agreed to in writing, software
+   distributed under the License is distributed on an "AS IS" BASIS,
+   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+   See the License for the specific language governing permissions and
+   limitations under the License.
+
+"""
+
+import pytest
+
+from flexvalue.numpy_engine import (
+    ELEC_COST_COLUMNS,
+    GAS_COST_COLUMNS,
+    NumpyEngine,
+)
+
+pytest.importorskip("numpy")
+
+DISCOUNT = 1.01  # 1 + discount_rate / 4
+
+
+def _table(rows):
+    return {column: [row[column] for row in rows] for column in rows[0]}
+
+
+def _engine():
+    """One project with a one-year EUL starting in 2021 Q1, an electric
+    avoided cost curve with one hour in the first month of each quarter (and
+    a 2022 hour outside the EUL), and monthly gas avoided costs."""
+    projects = _table(
+        [
+            {
+                "id": "p1",
+                "utility": "PGE",
+                "region": "1A",
+                "load_shape": "RES",
+                "therms_profile": "FLAT",
+                "value_curve_name": "ACC",
+                "mwh_savings": 2.0,
+                "therms_savings": 10.0,
+                "units": 1,
+                "ntg": 0.5,
+                "eul": 1,
+                "start_year": 2021,
+                "start_quarter": 1,
+                "discount_rate": 0.04,
+                "admin_cost": 10.0,
+                "measure_cost": 100.0,
+                "incentive_cost": 20.0,
+            }
+        ]
+    )
+    elec_av_costs = []
+    for year, hour in [(2021, 0), (2021, 1), (2021, 2), (2021, 3), (2022, 0)]:
+        month = hour * 3 + 1
+        costs = dict.fromkeys(ELEC_COST_COLUMNS, 0.0)
+        costs.update(total=hour + 1.0, energy=(hour + 1) / 2, marginal_ghg=0.1)
+        elec_av_costs.append(
+            {
+                "utility": "PGE",
+                "region": "1A",
+                "value_curve_name": "ACC",
+                "year": year,
+                "quarter": hour + 1,
+                "month": month,
+                "hour_of_year": hour,
+                "datetime": f"{year}-{month:02d}-01 00:00:00",
+                **costs,
+            }
+        )
+    elec_load_shape = [
+        {
+            "utility": "PGE",
+            "load_shape_name": "RES",
+            "hour_of_year": hour,
+            "value": 0.25,
+        }
+        for hour in range(4)
+    ]
+    gas_av_costs = []
+    for month in range(1, 13):
+        costs = dict.fromkeys(GAS_COST_COLUMNS, 0.0)
+        costs.update(total=2.0, market=1.5, marginal_ghg=0.01)
+        gas_av_costs.append(
+            {
+                "utility": "PGE",
+                "value_curve_name": "ACC",
+                "year": 2021,
+                "quarter": (month - 1) // 3 + 1,
+                "month": month,
+                **costs,
+            }
+        )
+    therms_profile = [
+        {"utility": "PGE", "profile_name": "FLAT", "month": month, "value": 1 / 12}
+        for month in range(1, 13)
+    ]
+    return NumpyEngine(
+        projects,
+        _table(elec_av_costs),
+        _table(elec_load_shape),
+        _table(gas_av_costs),
+        _table(therms_profile),
+    )
+
+
+TRC_COSTS = 10 + (0.5 * 20 + 0.5 * 100) / DISCOUNT
+PAC_COSTS = 10 + 20 / DISCOUNT
+# units * ntg * mwh_savings * load shape value * discount * total, by quarter
+ELEC_BENEFITS = [0.25 * (quarter + 1) / DISCOUNT**quarter for quarter in range(4)]
+# units * ntg * therms_savings * profile value * discount * total, by month
+GAS_BENEFITS = [5 / 12 * 2.0 / DISCOUNT ** ((month - 1) // 3) for month in range(1, 13)]
+
+
+def test_electric_by_quarter():
+    columns, rows = _engine().electric(["quarter"], ["energy", "marginal_ghg"])
+    assert columns == [
+        "id",
+        "trc_ratio",
+        "pac_ratio",
+        "electric_benefits",
+        "trc_costs",
+        "pac_costs",
+        "annual_net_mwh_savings",
+        "lifecycle_net_mwh_savings",
+        "lifecycle_elec_ghg_savings",
+        "quarter",
+        "energy",
+        "marginal_ghg",
+    ]
+    assert len(rows) == 4
+    for quarter, row in enumerate(rows):
+        result = dict(zip(columns, row))
+        assert result["id"] == "p1"
+        assert result["quarter"] == quarter + 1
+        assert result["electric_benefits"] == pytest.approx(ELEC_BENEFITS[quarter])
+        assert result["energy"] == pytest.approx(ELEC_BENEFITS[quarter] / 2)
+        assert result["marginal_ghg"] == pytest.approx(0.025)
+        assert result["trc_costs"] == pytest.approx(TRC_COSTS)
+        assert result["trc_ratio"] == pytest.approx(ELEC_BENEFITS[quarter] / TRC_COSTS)
+        assert result["pac_ratio"] == pytest.approx(ELEC_BENEFITS[quarter] / PAC_COSTS)
+        assert result["lifecycle_net_mwh_savings"] == pytest.approx(0.25)
+        assert result["annual_net_mwh_savings"] == pytest.approx(0.25)
+        assert result["lifecycle_elec_ghg_savings"] == pytest.approx(0.025)
+
+
+def test_gas():
+    columns, rows = _engine().gas([], ["market"])
+    assert len(rows) == 1
+    result = dict(zip(columns, rows[0]))
+    assert result["gas_benefits"] == pytest.approx(sum(GAS_BENEFITS))
+    assert result["market"] == pytest.approx(sum(GAS_BENEFITS) * 0.75)
+    # the total of the one distinct (eul, total, profile value) group
+    assert result["total"] == pytest.approx(2.0)
+    assert result["therms_profile_value"] == pytest.approx(1 / 12)
+    assert result["lifecycle_net_therms_savings"] == pytest.approx(5.0)
+    assert result["lifecycle_gas_ghg_savings"] == pytest.approx(0.05)
+    assert result["pac_ratio"] == pytest.approx(sum(GAS_BENEFITS) / PAC_COSTS)
+
+
+def test_combined_ratio_counts_gas_months_without_electric_results():
+    columns, rows = _engine().combined([], [])
+    assert len(rows) == 1
+    result = dict(zip(columns, rows[0]))
+    assert result["electric_benefits"] == pytest.approx(sum(ELEC_BENEFITS))
+    assert result["gas_benefits"] == pytest.approx(sum(GAS_BENEFITS))
+    assert result["total_benefits"] == pytest.approx(
+        sum(ELEC_BENEFITS) + sum(GAS_BENEFITS)
+    )
+    # the first month of each quarter has an electric result at midnight on
+    # the 1st, so its gas benefits aren't in the ratios
+    ratio_benefits = sum(ELEC_BENEFITS) + sum(
+        benefits for month, benefits in enumerate(GAS_BENEFITS) if month % 3
+    )
+    assert result["trc_ratio"] == pytest.approx(ratio_benefits / TRC_COSTS)
+    assert result["pac_ratio"] == pytest.approx(ratio_benefits / PAC_COSTS)
+
+
+def test_zero_costs_ratio():
+    engine = _engine()
+    engine.trc_costs[:] = 0
+    columns, rows = engine.electric([], [])
+    assert dict(zip(columns, rows[0]))["trc_ratio"] == float("inf")
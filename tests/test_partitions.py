@@ -0,0 +1,59 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+
+   Copyright 2021 Recurve Analytics, Inc.
+
+   Licensed under the Apache License, Version 2.0 (the "License");
+   you may not use this file except in compliance with the License.
+   You may obtain a copy of the License at
+
+       http://www.apache.org/licenses/LICENSE-2.0
+
+   Unless required by applicable law or agreed to in writing, software
+   distributed under the License is distributed on an "AS IS" BASIS,
+   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+   See the License for the specific language governing permissions and
+   limitations under the License.
+
+"""
+
+import csv
+from flexvalue.partitions import line_aligned_ranges, open_text
+
+
+def test_partitions_cover_every_row_once(tmp_path):
+    csv_path = tmp_path / "rows.csv"
+    csv_path.write_text(
+        "id,value\n" + "".join(f"{i},{i * 1.5}\n" for i in range(1000))
+    )
+    byte_ranges = line_aligned_ranges(str(csv_path), 7)
+    assert len(byte_ranges) == 7
+    ids = []
+    for byte_range in byte_ranges:
+        with open_text(str(csv_path), byte_range) as f:
+            rows = list(csv.DictReader(f))
+        assert rows
+        ids.extend(int(row["id"]) for row in rows)
+    assert ids == list(range(1000))
+
+
+def test_more_partitions_than_rows(tmp_path):
+    csv_path = tmp_path / "rows.csv"
+    csv_path.write_text("id,value\n1,2\n3,4\n")
+    byte_ranges = line_aligned_ranges(str(csv_path), 10)
+    assert len(byte_ranges) == 2
+    with open_text(str(csv_path), byte_ranges[1]) as f:
+        assert list(csv.reader(f)) == [["id", "value"], ["3", "4"]]
+
+
+def test_partitions_without_header(tmp_path):
+    csv_path = tmp_path / "rows.csv"
+    csv_path.write_text("".join(f"{i},{i * 1.5}\n" for i in range(100)))
+    byte_ranges = line_aligned_ranges(str(csv_path), 3, header=False)
+    assert byte_ranges[0].header_end == byte_ranges[0].start == 0
+    ids = []
+    for byte_range in byte_ranges:
+        with open_text(str(csv_path), byte_range) as f:
+            ids.extend(int(row[0]) for row in csv.reader(f))
+    assert ids == list(range(100))
@@ -0,0 +1,96 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+
+   Copyright 2021 Recurve Analytics, Inc.
+
+   Licensed under the Apache License, Version 2.0 (the "License");
+   you may not use this file except in compliance with the License.
+   You may obtain a copy of the License at
+
+       http://www.apache.org/licenses/LICENSE-2.0
+
+   Unless required by applicable law or agreed to in writing, software
+   distributed under the License is distributed on an "AS IS" BASIS,
+   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+   See the License for the specific language governing permissions and
+   limitations under the License.
+
+"""
+
+import pytest
+
+from flexvalue import results
+from flexvalue.config import FLEXValueConfig, FLEXValueException
+
+pa = pytest.importorskip("pyarrow")
+pq = pytest.importorskip("pyarrow.parquet")
+
+COLUMNS = ["id", "year", "trc_ratio"]
+
+
+def _write(tmp_path, rows, output_format, monkeypatch):
+    monkeypatch.setattr(results, "ROW_GROUP_SIZE", 2)
+    path = str(tmp_path / f"results.{output_format}")
+    results.write_record_batches(
+        path,
+        results.record_batches(COLUMNS, iter(rows), output_format),
+        output_format,
+        columns=COLUMNS,
+    )
+    return path
+
+
+def test_parquet_row_groups(tmp_path, monkeypatch):
+    rows = [("p0", 2021, None), ("p1", 2021, None), ("p2", 2022, 1.5)]
+    parquet_file = pq.ParquetFile(_write(tmp_path, rows, "parquet", monkeypatch))
+    assert parquet_file.metadata.num_row_groups == 2
+    table = parquet_file.read()
+    # trc_ratio is all NULL in the first batch, and float64 anyway
+    assert table.schema.types == [pa.string(), pa.int64(), pa.float64()]
+    assert [tuple(row.values()) for row in table.to_pylist()] == rows
+
+
+def test_typed_columns_null_in_first_batch(tmp_path, monkeypatch):
+    monkeypatch.setattr(results, "ROW_GROUP_SIZE", 2)
+    columns = ["id", "gas_region", "year"]
+    rows = [("p0", None, None), ("p1", None, None), ("p2", "3A", 2021)]
+    path = str(tmp_path / "results.parquet")
+    results.write_record_batches(
+        path,
+        results.record_batches(columns, rows, "parquet", ["text", "text", "int4"]),
+        "parquet",
+        columns=columns,
+    )
+    table = pq.read_table(path)
+    assert table.schema.types == [pa.string(), pa.string(), pa.int64()]
+    assert [tuple(row.values()) for row in table.to_pylist()] == rows
+
+
+def test_arrow_ipc(tmp_path, monkeypatch):
+    rows = [("p0", 2021, 0.5), ("p1", 2022, 1)]
+    table = pa.ipc.open_file(_write(tmp_path, rows, "arrow", monkeypatch)).read_all()
+    assert table.column_names == COLUMNS
+    assert [tuple(row.values()) for row in table.to_pylist()] == rows
+
+
+def test_empty_results(tmp_path, monkeypatch):
+    table = pq.read_table(_write(tmp_path, [], "parquet", monkeypatch))
+    assert table.column_names == COLUMNS
+    assert table.num_rows == 0
+
+
+def test_result_format():
+    assert FLEXValueConfig(database_type=None).result_format() == "csv"
+    assert (
+        FLEXValueConfig(database_type=None, output_file="out.Parquet").result_format()
+        == "parquet"
+    )
+    assert (
+        FLEXValueConfig(
+            database_type=None, output_file="out.csv", output_format="arrow"
+        ).result_format()
+        == "arrow"
+    )
+    with pytest.raises(FLEXValueException):
+        FLEXValueConfig(database_type=None, output_format="parquet").validate()
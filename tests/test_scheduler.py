@@ -0,0 +1,82 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+
+   Copyright 2021 Recurve Analytics, Inc.
+
+   Licensed under the Apache License, Version 2.0 (the "License");
+   you may not use this file except in compliance with the License.
+   You may obtain a copy of the License at
+
+       http://www.apache.org/licenses/LICENSE-2.0
+
+   Unless required by applicable law or agreed to in writing, software
+   distributed under the License is distributed on an "AS IS" BASIS,
+   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+   See the License for the specific language governing permissions and
+   limitations under the License.
+
+"""
+
+import threading
+import pytest
+from flexvalue.config import FLEXValueException
+from flexvalue.scheduler import LoadStep, run_load_steps
+
+
+def test_dependent_step_waits():
+    order = []
+    project_info_started = threading.Event()
+
+    def load_project_info():
+        project_info_started.set()
+        order.append("project_info")
+
+    def load_elec_av_costs():
+        # runs alongside project_info
+        assert project_info_started.wait(5)
+        order.append("elec_av_costs")
+
+    steps = [
+        LoadStep(
+            "metered_load_shape",
+            lambda: order.append("metered_load_shape"),
+            ["project_info"],
+        ),
+        LoadStep("project_info", load_project_info),
+        LoadStep("elec_av_costs", load_elec_av_costs),
+    ]
+    timings = run_load_steps(steps, max_workers=3)
+    assert order.index("project_info") < order.index("metered_load_shape")
+    assert set(timings) == {"metered_load_shape", "project_info", "elec_av_costs"}
+
+
+def test_missing_dependency_is_ignored():
+    timings = run_load_steps(
+        [LoadStep("metered_load_shape", lambda: None, ["project_info"])]
+    )
+    assert list(timings) == ["metered_load_shape"]
+
+
+def test_sequential_order():
+    order = []
+    steps = [LoadStep(name, lambda name=name: order.append(name)) for name in "abc"]
+    run_load_steps(steps, max_workers=1)
+    assert order == ["a", "b", "c"]
+
+
+def test_failure_is_raised():
+    def fail():
+        raise ValueError("bad file")
+
+    with pytest.raises(ValueError):
+        run_load_steps(
+            [LoadStep("a", fail), LoadStep("b", lambda: None, ["a"])], max_workers=2
+        )
+
+
+def test_cycle():
+    with pytest.raises(FLEXValueException):
+        run_load_steps(
+            [LoadStep("a", lambda: None, ["b"]), LoadStep("b", lambda: None, ["a"])]
+        )